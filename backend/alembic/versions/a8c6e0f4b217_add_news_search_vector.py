@@ -0,0 +1,49 @@
+"""add_news_search_vector
+
+Revision ID: a8c6e0f4b217
+Revises: f3b9c1d7a2e4
+Create Date: 2025-07-20 14:03:25.861047
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c6e0f4b217'
+down_revision: Union[str, None] = 'f3b9c1d7a2e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 10000
+
+
+def upgrade() -> None:
+    op.add_column('news', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # Backfill existing rows in id ranges so no single statement holds the whole table
+    # Must match news_store.news_search_vector
+    conn = op.get_bind()
+    low, high = conn.execute(sa.text("SELECT min(id), max(id) FROM news")).first()
+    if low is not None:
+        for start in range(low, high + 1, BACKFILL_BATCH):
+            conn.execute(
+                sa.text(
+                    "UPDATE news SET search_vector = "
+                    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                    "setweight(to_tsvector('english', coalesce(summary, '')), 'B') "
+                    "WHERE id >= :start AND id < :end"
+                ),
+                {'start': start, 'end': start + BACKFILL_BATCH}
+            )
+
+    # Build the GIN index after the backfill rather than maintaining it row by row
+    op.create_index('idx_news_search_vector', 'news', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('idx_news_search_vector', table_name='news', postgresql_using='gin')
+    op.drop_column('news', 'search_vector')
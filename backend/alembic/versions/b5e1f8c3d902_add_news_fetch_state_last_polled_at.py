@@ -0,0 +1,28 @@
+"""add_news_fetch_state_last_polled_at
+
+Revision ID: b5e1f8c3d902
+Revises: a8c6e0f4b217
+Create Date: 2025-07-21 10:26:41.193702
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e1f8c3d902'
+down_revision: Union[str, None] = 'a8c6e0f4b217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('news_fetch_state', sa.Column('last_polled_at', sa.DateTime(), nullable=True))
+    # Until the next poll, the last stored article is the best guess
+    op.execute("UPDATE news_fetch_state SET last_polled_at = updated_at")
+
+
+def downgrade() -> None:
+    op.drop_column('news_fetch_state', 'last_polled_at')
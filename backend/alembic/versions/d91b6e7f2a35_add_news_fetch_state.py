@@ -0,0 +1,43 @@
+"""add_news_fetch_state
+
+Revision ID: d91b6e7f2a35
+Revises: c4d8f3a1e9b2
+Create Date: 2025-07-16 09:47:12.306518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91b6e7f2a35'
+down_revision: Union[str, None] = 'c4d8f3a1e9b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('news_fetch_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('symbol', sa.String(), nullable=False),
+    sa.Column('last_published_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source', 'symbol', name='uq_news_fetch_state_source_symbol')
+    )
+    op.create_index(op.f('ix_news_fetch_state_id'), 'news_fetch_state', ['id'], unique=False)
+    # Seed marks from the news already stored
+    op.execute(
+        "INSERT INTO news_fetch_state (source, symbol, last_published_at, updated_at) "
+        "SELECT source, upper(symbol), max(published_at), now() FROM news "
+        "WHERE source IS NOT NULL AND source <> '' AND symbol IS NOT NULL AND published_at IS NOT NULL "
+        "GROUP BY source, upper(symbol)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_news_fetch_state_id'), table_name='news_fetch_state')
+    op.drop_table('news_fetch_state')
@@ -0,0 +1,27 @@
+"""add_news_symbol_published_index
+
+Revision ID: f3b9c1d7a2e4
+Revises: e5a0c2d8b613
+Create Date: 2025-07-19 09:12:47.530916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b9c1d7a2e4'
+down_revision: Union[str, None] = 'e5a0c2d8b613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Composite index for keyset pagination of /news/{symbol}
+    op.create_index('idx_news_symbol_published_id', 'news', ['symbol', 'published_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_news_symbol_published_id', table_name='news')
@@ -0,0 +1,148 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for one upstream provider.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail immediately with CircuitOpenError. Once ``recovery_seconds``
+    have passed one trial call is let through (half-open): success closes
+    the circuit, failure opens it again for another recovery period.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = None, recovery_seconds: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5))
+        self.recovery_seconds = recovery_seconds or float(os.getenv('CIRCUIT_BREAKER_RECOVERY_SECONDS', 30))
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_failure: Optional[str] = None
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        if self.state != OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.recovery_seconds - (time.monotonic() - self.opened_at))
+
+    def allow_request(self) -> bool:
+        """Return whether a call may go out now; half-open admits a single trial call"""
+        with self._lock:
+            if self.state == OPEN:
+                if self.retry_after() > 0:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                logger.info(f"Circuit for {self.name} is half-open, sending a trial request")
+            if self.state == HALF_OPEN:
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = CLOSED
+            self.opened_at = None
+
+    def record_failure(self, error: Any = None):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if error is not None:
+                self.last_failure = str(error)
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} consecutive failures: {self.last_failure}")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn through the breaker, raising CircuitOpenError while the circuit is open"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'failure_threshold': self.failure_threshold,
+            'recovery_seconds': self.recovery_seconds,
+            'retry_after': round(self.retry_after(), 1),
+            'successes': self.successes,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'times_opened': self.times_opened,
+            'last_failure': self.last_failure
+        }
+
+class CircuitBreakerRegistry:
+    """One lazily created circuit breaker per provider name"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name)
+            return breaker
+
+    def reset(self, name: str) -> bool:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            return False
+        breaker.reset()
+        return True
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.get_status() for name, breaker in sorted(self._breakers.items())}
+
+# Global circuit breaker registry shared by all market data providers
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,116 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+class HostMetrics:
+    """Request counters and a rolling latency window for one upstream host"""
+
+    def __init__(self, window: int = 200):
+        self.requests = 0
+        self.errors = 0
+        self.status_codes: Dict[int, int] = {}
+        self.latencies_ms = deque(maxlen=window)
+
+    def get_stats(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies_ms)
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 1) if ordered else None
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'status_codes': dict(self.status_codes),
+            'p50_ms': pct(50),
+            'p95_ms': pct(95)
+        }
+
+class HttpClient:
+    """Shared keep-alive HTTP client for the market data providers.
+
+    One requests.Session holds a connection pool per host, so repeat calls
+    to the same provider reuse warm TCP/TLS connections. GETs get a default
+    (connect, read) timeout and are retried with capped exponential backoff
+    on connection errors and 5xx. 429 is returned to the caller rather than
+    retried, and Retry-After is not slept on, so a quota response cannot
+    park a worker thread. Metered GETs, for providers whose every request
+    is charged against a quota ledger, are only retried when the connection
+    failed before the request was sent. Latency and status codes are
+    tracked per host.
+    """
+
+    def __init__(self):
+        self.timeout = (
+            float(os.getenv('MARKET_DATA_CONNECT_TIMEOUT', 3)),
+            float(os.getenv('MARKET_DATA_READ_TIMEOUT', 10))
+        )
+        retries = int(os.getenv('HTTP_CLIENT_RETRIES', 2))
+        backoff = dict(
+            backoff_factor=float(os.getenv('HTTP_CLIENT_BACKOFF', 0.5)),
+            backoff_max=float(os.getenv('HTTP_CLIENT_BACKOFF_MAX', 4)),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        # Read errors are not retried: the request reached the provider and may already be charged
+        self.session = self._session(Retry(
+            total=retries, connect=retries, read=0, status=retries,
+            status_forcelist=(500, 502, 503, 504), **backoff
+        ))
+        self.metered_session = self._session(Retry(
+            total=retries, connect=retries, read=0, status=0, other=0, **backoff
+        ))
+        self._metrics: Dict[str, HostMetrics] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _session(retry: Retry) -> requests.Session:
+        adapter = HTTPAdapter(
+            pool_connections=int(os.getenv('HTTP_CLIENT_POOL_HOSTS', 10)),
+            pool_maxsize=int(os.getenv('HTTP_CLIENT_POOL_SIZE', 10)),
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _record(self, host: str, latency_ms: float, status_code: int = None):
+        with self._lock:
+            metrics = self._metrics.get(host)
+            if metrics is None:
+                metrics = self._metrics[host] = HostMetrics()
+            metrics.requests += 1
+            metrics.latencies_ms.append(latency_ms)
+            if status_code is None or status_code >= 400:
+                metrics.errors += 1
+            if status_code is not None:
+                metrics.status_codes[status_code] = metrics.status_codes.get(status_code, 0) + 1
+
+    def get(self, url: str, timeout=None, metered: bool = False, **kwargs) -> requests.Response:
+        """GET with pooling and retries; metered requests are never re-sent once delivered"""
+        host = urlsplit(url).netloc
+        session = self.metered_session if metered else self.session
+        started = time.monotonic()
+        try:
+            response = session.get(url, timeout=timeout or self.timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(host, (time.monotonic() - started) * 1000)
+            raise
+        self._record(host, (time.monotonic() - started) * 1000, response.status_code)
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {host: metrics.get_stats() for host, metrics in sorted(self._metrics.items())}
+
+# Global HTTP client shared by all market data providers
+http_client = HttpClient()
@@ -1,7 +1,14 @@
 from ib_insync import *
 import asyncio
 import os
-from typing import Dict, List, Optional
+import json
+import time
+import random
+from datetime import datetime
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 import logging
 import nest_asyncio
 
@@ -11,99 +18,722 @@ nest_asyncio.apply()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def safe_float(value):
+    """Convert an IB tick value to float, mapping None/NaN/inf to None"""
+    if value is None:
+        return None
+    try:
+        float_val = float(value)
+        if float_val in [float('inf'), float('-inf')] or float_val != float_val:
+            return None
+        return float_val
+    except (ValueError, TypeError):
+        return None
+
+class QuoteSubscriptionManager:
+    """Keeps one streaming ticker per symbol and mirrors its latest quote in memory.
+
+    Quotes are updated from ib_insync's pendingTickersEvent, so reads are plain
+    dict lookups. Subscriptions are kept in LRU order and the least recently
+    used one is cancelled when the market data line limit is reached or when
+    it has not been read for longer than the idle timeout. Held symbols (those
+    pushed to websocket clients) are never evicted as idle, and listeners are
+    called with every new quote as it arrives.
+    """
+
+    def __init__(self, ib: IB, contract_factory: Callable[[str], Contract]):
+        self.ib = ib
+        self.contract_factory = contract_factory
+        self.max_lines = int(os.getenv('IBKR_MAX_MARKET_DATA_LINES', '90'))
+        self.idle_seconds = float(os.getenv('IBKR_QUOTE_IDLE_SECONDS', '900'))
+        self.first_tick_timeout = float(os.getenv('IBKR_FIRST_TICK_TIMEOUT', '5'))
+        self.tickers: "OrderedDict[str, Ticker]" = OrderedDict()
+        self.quotes: Dict[str, Dict] = {}
+        self.last_access: Dict[str, float] = {}
+        self._first_tick: Dict[str, asyncio.Event] = {}
+        self.held: Set[str] = set()
+        self.listeners: List[Callable[[str, Dict], None]] = []
+        self.evictions = 0
+        self.ib.pendingTickersEvent += self._on_pending_tickers
+
+    def _on_pending_tickers(self, tickers):
+        for ticker in tickers:
+            symbol = ticker.contract.symbol.upper()
+            if symbol not in self.tickers:
+                continue
+            quote = self._ticker_to_quote(symbol, ticker)
+            if quote is None:
+                continue
+            self.quotes[symbol] = quote
+            event = self._first_tick.get(symbol)
+            if event is not None and not event.is_set():
+                event.set()
+            for listener in self.listeners:
+                try:
+                    listener(symbol, dict(quote))
+                except Exception as e:
+                    logger.warning(f"Quote listener failed for {symbol}: {e}")
+
+    @staticmethod
+    def _ticker_to_quote(symbol: str, ticker: Ticker) -> Optional[Dict]:
+        price = safe_float(ticker.marketPrice())
+        if not price:
+            return None
+        return {
+            'symbol': symbol,
+            'price': price,
+            'bid': safe_float(ticker.bid),
+            'ask': safe_float(ticker.ask),
+            'high': safe_float(ticker.high),
+            'low': safe_float(ticker.low),
+            'volume': safe_float(ticker.volume),
+            'timestamp': ticker.time.isoformat() if ticker.time else None,
+            'open': safe_float(getattr(ticker, 'open', None))
+        }
+
+    def subscribe(self, symbol: str):
+        """Open a streaming market data line for symbol if not already open"""
+        symbol = symbol.upper()
+        if symbol in self.tickers:
+            self.tickers.move_to_end(symbol)
+            return
+        self._evict_idle()
+        while len(self.tickers) >= self.max_lines:
+            oldest = next((s for s in self.tickers if s not in self.held), next(iter(self.tickers)))
+            self.unsubscribe(oldest)
+            self.evictions += 1
+            logger.info(f"Evicted LRU market data subscription for {oldest}")
+        contract = self.contract_factory(symbol)
+        self._first_tick[symbol] = asyncio.Event()
+        self.tickers[symbol] = self.ib.reqMktData(contract)
+        logger.info(f"Subscribed to streaming market data for {symbol} ({len(self.tickers)}/{self.max_lines} lines)")
+
+    def unsubscribe(self, symbol: str):
+        """Cancel the market data line for symbol and drop its cached quote"""
+        symbol = symbol.upper()
+        ticker = self.tickers.pop(symbol, None)
+        if ticker is not None and self.ib.isConnected():
+            try:
+                self.ib.cancelMktData(ticker.contract)
+            except Exception as e:
+                logger.warning(f"Error cancelling market data for {symbol}: {e}")
+        self.quotes.pop(symbol, None)
+        self.last_access.pop(symbol, None)
+        self._first_tick.pop(symbol, None)
+
+    def _evict_idle(self):
+        if self.idle_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_seconds
+        for symbol in [s for s in self.tickers if s not in self.held and self.last_access.get(s, 0) < cutoff]:
+            self.unsubscribe(symbol)
+            self.evictions += 1
+            logger.info(f"Evicted idle market data subscription for {symbol}")
+
+    async def get_quote(self, symbol: str) -> Optional[Dict]:
+        """Return the latest streamed quote, subscribing on first use"""
+        symbol = symbol.upper()
+        self.subscribe(symbol)
+        self.last_access[symbol] = time.monotonic()
+        quote = self.quotes.get(symbol)
+        if quote is None:
+            event = self._first_tick.get(symbol)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=self.first_tick_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"No market data tick for {symbol} within {self.first_tick_timeout}s")
+            quote = self.quotes.get(symbol)
+        return dict(quote) if quote else None
+
+    def hold(self, symbol: str):
+        """Keep a streaming line open for symbol until released, subscribing if needed"""
+        symbol = symbol.upper()
+        self.held.add(symbol)
+        self.subscribe(symbol)
+
+    def release(self, symbol: str):
+        """Let a held symbol age out through the idle timeout again"""
+        symbol = symbol.upper()
+        if symbol in self.held:
+            self.held.discard(symbol)
+            self.last_access[symbol] = time.monotonic()
+
+    def resubscribe_all(self):
+        """Re-open every subscription after a reconnect; old tickers died with the socket.
+
+        Quotes from before the disconnect are dropped, so readers wait for the
+        first fresh tick instead of being served an old price as live.
+        """
+        symbols = list(self.tickers.keys())
+        self.tickers.clear()
+        self.quotes.clear()
+        self._first_tick.clear()
+        for symbol in symbols:
+            self.subscribe(symbol)
+        if symbols:
+            logger.info(f"Re-established {len(symbols)} streaming market data subscriptions")
+
+    def clear(self):
+        """Forget all subscriptions without cancelling them (used after disconnect)"""
+        self.tickers.clear()
+        self.quotes.clear()
+        self.last_access.clear()
+        self._first_tick.clear()
+
+    def get_stats(self) -> Dict:
+        return {
+            'active_lines': len(self.tickers),
+            'max_lines': self.max_lines,
+            'quoted_symbols': len(self.quotes),
+            'evictions': self.evictions,
+            'held': len(self.held),
+            'symbols': list(self.tickers.keys())
+        }
+
+class ContractRegistry:
+    """Caches qualified stock contracts per symbol so IB does not resolve them on every call.
+
+    The conId and primary exchange of each qualified symbol are persisted to
+    a JSON file, so a restart starts warm. Symbols registered for warm-up are
+    qualified in one bulk qualifyContractsAsync call once connected.
+    """
+
+    def __init__(self, ib: IB):
+        self.ib = ib
+        self.cache_path = os.getenv('IBKR_CONTRACT_CACHE_PATH', 'data/ibkr_contracts.json')
+        self.warm_symbols: List[str] = []
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            logger.info(f"Loaded {len(entries)} qualified contracts from {self.cache_path}")
+            return entries
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Could not load contract cache {self.cache_path}: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Could not persist contract cache {self.cache_path}: {e}")
+
+    def is_qualified(self, symbol: str) -> bool:
+        return symbol.upper() in self._entries
+
+    def get(self, symbol: str) -> Contract:
+        """Return the cached qualified contract, or an unqualified SMART/USD stock"""
+        symbol = symbol.upper()
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return Stock(symbol, 'SMART', 'USD')
+        return Stock(
+            symbol,
+            'SMART',
+            entry.get('currency', 'USD'),
+            conId=entry['conId'],
+            primaryExchange=entry.get('primaryExchange', '')
+        )
+
+    async def qualify(self, symbols: List[str]) -> Dict[str, Contract]:
+        """Qualify all uncached symbols in one bulk request and cache the results"""
+        missing = list(dict.fromkeys(s.upper() for s in symbols if s and not self.is_qualified(s)))
+        if missing and self.ib.isConnected():
+            contracts = [Stock(symbol, 'SMART', 'USD') for symbol in missing]
+            try:
+                qualified = await self.ib.qualifyContractsAsync(*contracts)
+            except Exception as e:
+                logger.error(f"Error qualifying contracts for {missing}: {e}")
+                qualified = []
+            for contract in qualified:
+                if contract.conId:
+                    self._entries[contract.symbol.upper()] = {
+                        'conId': contract.conId,
+                        'primaryExchange': contract.primaryExchange,
+                        'currency': contract.currency or 'USD',
+                        'localSymbol': contract.localSymbol
+                    }
+            if qualified:
+                self._save()
+                logger.info(f"Qualified {len(qualified)}/{len(missing)} contracts")
+        return {s.upper(): self.get(s) for s in symbols if s}
+
+    async def warm(self, symbols: Optional[List[str]] = None):
+        """Register symbols for warm-up and qualify them if connected"""
+        if symbols is not None:
+            self.warm_symbols = [s.upper() for s in symbols if s]
+        if self.warm_symbols and self.ib.isConnected():
+            await self.qualify(self.warm_symbols)
+
+    def get_stats(self) -> Dict:
+        return {
+            'cached_contracts': len(self._entries),
+            'warm_symbols': len(self.warm_symbols),
+            'cache_path': self.cache_path
+        }
+
+class AccountStateMirror:
+    """Live in-memory mirror of account values, portfolio items and positions.
+
+    The mirror subscribes once with reqAccountUpdates and is then kept current
+    by ib_insync's accountValueEvent, updatePortfolioEvent and positionEvent,
+    so account and position reads are dict lookups instead of gateway round
+    trips. Every update refreshes last_updated.
+    """
+
+    SUMMARY_TAGS = {
+        'NetLiquidation': 'net_liquidation_value',
+        'TotalCashValue': 'total_cash_value',
+        'AvailableFunds': 'available_funds',
+        'BuyingPower': 'buying_power',
+        'MaintMarginReq': 'maint_margin_req',
+        'InitMarginReq': 'init_margin_req',
+        'ExcessLiquidity': 'excess_liquidity',
+        'RealizedPnL': 'realized_pnl',
+    }
+
+    def __init__(self, ib: IB):
+        self.ib = ib
+        self.account: Optional[str] = None
+        self.values: Dict[Tuple[str, str], str] = {}
+        self.portfolio: Dict[int, PortfolioItem] = {}
+        self.positions: Dict[int, Position] = {}
+        self.last_updated: Optional[datetime] = None
+        self.started = False
+        self.ib.accountValueEvent += self._on_account_value
+        self.ib.updatePortfolioEvent += self._on_portfolio_item
+        self.ib.positionEvent += self._on_position
+
+    def _touch(self):
+        self.last_updated = datetime.now()
+
+    def _on_account_value(self, value: AccountValue):
+        if self.account and value.account != self.account:
+            return
+        self.values[(value.tag, value.currency)] = value.value
+        self._touch()
+
+    def _on_portfolio_item(self, item: PortfolioItem):
+        if self.account and item.account != self.account:
+            return
+        if item.position == 0:
+            self.portfolio.pop(item.contract.conId, None)
+        else:
+            self.portfolio[item.contract.conId] = item
+        self._touch()
+
+    def _on_position(self, position: Position):
+        if self.account and position.account != self.account:
+            return
+        if position.position == 0:
+            self.positions.pop(position.contract.conId, None)
+        else:
+            self.positions[position.contract.conId] = position
+        self._touch()
+
+    async def start(self):
+        """Subscribe to account updates and seed the mirror from ib_insync's state"""
+        accounts = self.ib.managedAccounts()
+        self.account = accounts[0] if accounts else None
+        timeout = float(os.getenv('IBKR_ACCOUNT_SYNC_TIMEOUT', '10'))
+        try:
+            await asyncio.wait_for(self.ib.reqAccountUpdatesAsync(self.account or ''), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Account updates subscription timed out, mirror will fill from events")
+        for value in self.ib.accountValues(self.account or ''):
+            self._on_account_value(value)
+        for item in self.ib.portfolio():
+            self._on_portfolio_item(item)
+        for position in self.ib.positions(self.account or ''):
+            self._on_position(position)
+        self.started = True
+        logger.info(f"Account mirror started for {self.account}: {len(self.portfolio)} portfolio items")
+
+    def reset(self):
+        self.values.clear()
+        self.portfolio.clear()
+        self.positions.clear()
+        self.last_updated = None
+        self.started = False
+
+    def _value(self, tag: str) -> float:
+        for currency in ('BASE', 'USD'):
+            value = safe_float(self.values.get((tag, currency)))
+            if value is not None:
+                return value
+        for (value_tag, _), value in self.values.items():
+            if value_tag == tag and safe_float(value) is not None:
+                return safe_float(value)
+        return 0.0
+
+    def get_summary(self) -> Dict:
+        items = list(self.portfolio.values())
+        summary = {
+            'account': self.account,
+            'account_display_name': self.account,
+            'gross_position_value': sum(item.marketValue for item in items),
+            'unrealized_pnl': sum(item.unrealizedPNL for item in items),
+        }
+        for tag, key in self.SUMMARY_TAGS.items():
+            summary[key] = self._value(tag)
+        summary['last_updated'] = self.last_updated.isoformat() if self.last_updated else None
+        return summary
+
+@dataclass
+class PooledConnection:
+    ib: IB
+    client_id: int
+    workload: str
+    healthy: bool = True
+    in_flight: int = 0
+    requests: int = 0
+    last_latency_ms: Optional[float] = None
+    last_error: Optional[str] = None
+
+class IBKRConnectionPool:
+    """Small pool of IB connections with distinct client IDs, routed by workload class.
+
+    Live quotes and snapshots, historical requests and account/order traffic
+    each get their own sockets, so a historical backfill that hits pacing
+    limits does not stall streaming quotes. Within a class, requests go to
+    the healthy connection with the fewest requests in flight, falling back
+    to the least used one on ties.
+    """
+
+    WORKLOADS = ('streaming', 'historical', 'account')
+
+    def __init__(self, host: str, port: int, base_client_id: int):
+        self.host = host
+        self.port = port
+        self.health_interval = float(os.getenv('IBKR_POOL_HEALTH_INTERVAL', '30'))
+        self.connections: Dict[str, List[PooledConnection]] = {}
+        client_id = base_client_id
+        for workload in self.WORKLOADS:
+            size = max(1, int(os.getenv(f'IBKR_POOL_{workload.upper()}', '1')))
+            self.connections[workload] = []
+            for _ in range(size):
+                self.connections[workload].append(PooledConnection(ib=IB(), client_id=client_id, workload=workload))
+                client_id += 1
+        self._health_task: Optional[asyncio.Task] = None
+        # Reconnect supervisor state
+        self.connect_timeout = float(os.getenv('IBKR_CONNECT_TIMEOUT', '10'))
+        self.backoff_base = float(os.getenv('IBKR_RECONNECT_BASE_SECONDS', '1'))
+        self.backoff_max = float(os.getenv('IBKR_RECONNECT_MAX_SECONDS', '60'))
+        self.closing = False
+        self.reconnects = 0
+        # Streaming and account are up. The event for waiters is created on the running
+        # loop, since asyncio primitives made at import bind to the wrong loop on Python 3.9
+        self.ready = False
+        self._ready_event: Optional[asyncio.Event] = None
+        self.on_reconnected: Optional[Callable[[PooledConnection], Awaitable[None]]] = None
+        self._reconnect_tasks: Dict[int, asyncio.Task] = {}
+        for conn in self.all():
+            conn.ib.disconnectedEvent += lambda conn=conn: self._on_disconnected(conn)
+
+    def _update_ready(self):
+        self.ready = self.is_connected('streaming') and self.is_connected('account')
+        if self._ready_event is not None:
+            if self.ready:
+                self._ready_event.set()
+            else:
+                self._ready_event.clear()
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for the pool to become ready; raises asyncio.TimeoutError"""
+        if self._ready_event is None:
+            self._ready_event = asyncio.Event()
+            self._update_ready()
+        await asyncio.wait_for(self._ready_event.wait(), timeout=timeout)
+        return self.ready
+
+    def _on_disconnected(self, conn: PooledConnection):
+        conn.healthy = False
+        self._update_ready()
+        if self.closing:
+            return
+        logger.warning(f"IBKR {conn.workload} connection (client id {conn.client_id}) dropped, starting reconnect supervisor")
+        self._supervise(conn)
+
+    def _supervise(self, conn: PooledConnection):
+        task = self._reconnect_tasks.get(conn.client_id)
+        if task is None or task.done():
+            self._reconnect_tasks[conn.client_id] = asyncio.ensure_future(self._reconnect(conn))
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter, so pooled clients do not reconnect in lockstep"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    async def _reconnect(self, conn: PooledConnection):
+        attempt = 0
+        while not self.closing and not conn.ib.isConnected():
+            await asyncio.sleep(self.backoff_delay(attempt))
+            if self.closing:
+                return
+            try:
+                await conn.ib.connectAsync(self.host, self.port, clientId=conn.client_id, timeout=self.connect_timeout)
+            except Exception as e:
+                attempt += 1
+                conn.last_error = str(e)
+                logger.warning(f"IBKR {conn.workload} reconnect attempt {attempt} failed: {e}")
+                continue
+            conn.healthy = True
+            conn.last_error = None
+            self.reconnects += 1
+            self._update_ready()
+            logger.info(f"Reconnected IBKR {conn.workload} connection (client id {conn.client_id})")
+            if self.on_reconnected is not None:
+                try:
+                    await self.on_reconnected(conn)
+                except Exception as e:
+                    logger.error(f"Error restoring IBKR {conn.workload} state after reconnect: {e}")
+
+    @property
+    def reconnecting(self) -> bool:
+        return any(not task.done() for task in self._reconnect_tasks.values())
+
+    def get(self, workload: str) -> IB:
+        """Primary connection of a workload class, for components that hold subscriptions"""
+        return self.connections[workload][0].ib
+
+    def all(self) -> List[PooledConnection]:
+        return [conn for conns in self.connections.values() for conn in conns]
+
+    def is_connected(self, workload: str) -> bool:
+        return any(conn.ib.isConnected() for conn in self.connections[workload])
+
+    async def connect_all(self) -> bool:
+        """Connect every pooled connection concurrently; True when streaming and account are up.
+
+        Once the pool is ready, connections that failed (historical, or extra
+        streaming/account sockets) are handed to the reconnect supervisor
+        rather than waiting for a disconnect event that will never come.
+        """
+        self.closing = False
+
+        async def connect_one(conn: PooledConnection):
+            if conn.ib.isConnected():
+                return
+            try:
+                await conn.ib.connectAsync(self.host, self.port, clientId=conn.client_id, timeout=self.connect_timeout)
+                conn.healthy = True
+                conn.last_error = None
+                logger.info(f"Connected IBKR {conn.workload} connection (client id {conn.client_id})")
+            except Exception as e:
+                conn.healthy = False
+                conn.last_error = str(e)
+                logger.error(f"Failed to connect IBKR {conn.workload} connection (client id {conn.client_id}): {e}")
+
+        await asyncio.gather(*(connect_one(conn) for conn in self.all()))
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.ensure_future(self._health_loop())
+        self._update_ready()
+        if self.ready:
+            for conn in self.all():
+                if not conn.ib.isConnected():
+                    self._supervise(conn)
+        return self.ready
+
+    def disconnect_all(self):
+        self.closing = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for task in self._reconnect_tasks.values():
+            task.cancel()
+        self._reconnect_tasks.clear()
+        for conn in self.all():
+            if conn.ib.isConnected():
+                conn.ib.disconnect()
+        self._update_ready()
+
+    @asynccontextmanager
+    async def acquire(self, workload: str):
+        """Borrow the least busy healthy connection of a workload class"""
+        conns = [c for c in self.connections[workload] if c.ib.isConnected()]
+        healthy = [c for c in conns if c.healthy] or conns
+        if not healthy:
+            raise ConnectionError(f"No IBKR connection available for {workload} requests")
+        conn = min(healthy, key=lambda c: (c.in_flight, c.requests))
+        conn.in_flight += 1
+        conn.requests += 1
+        try:
+            yield conn.ib
+        except Exception as e:
+            conn.last_error = str(e)
+            raise
+        finally:
+            conn.in_flight -= 1
+
+    async def health_check(self):
+        """Ping every connected socket and mark slow or dead ones unhealthy"""
+        timeout = float(os.getenv('IBKR_POOL_HEALTH_TIMEOUT', '5'))
+        for conn in self.all():
+            if not conn.ib.isConnected():
+                conn.healthy = False
+                continue
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(conn.ib.reqCurrentTimeAsync(), timeout=timeout)
+                conn.healthy = True
+                conn.last_latency_ms = round((time.monotonic() - started) * 1000, 1)
+            except Exception as e:
+                conn.healthy = False
+                conn.last_error = f"Health check failed: {e}"
+                logger.warning(f"IBKR {conn.workload} connection (client id {conn.client_id}) failed health check: {e}")
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.error(f"IBKR pool health check error: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            'ready': self.ready,
+            'reconnecting': self.reconnecting,
+            'reconnects': self.reconnects,
+            'connections': {
+                workload: [{
+                    'client_id': conn.client_id,
+                    'connected': conn.ib.isConnected(),
+                    'healthy': conn.healthy,
+                    'in_flight': conn.in_flight,
+                    'requests': conn.requests,
+                    'last_latency_ms': conn.last_latency_ms,
+                    'last_error': conn.last_error
+                } for conn in conns]
+                for workload, conns in self.connections.items()
+            }
+        }
+
 class IBKRService:
     def __init__(self):
-        self.ib = IB()
-        self.connected = False
         self.host = os.getenv('IBKR_HOST', 'host.docker.internal')
         self.port = int(os.getenv('IBKR_PORT', '4002'))
         self.client_id = int(os.getenv('IBKR_CLIENT_ID', '12345'))
+        # How long a call waits for an in-progress reconnect before failing fast
+        self.connect_wait = float(os.getenv('IBKR_CONNECT_WAIT_SECONDS', '3'))
+        self.pool = IBKRConnectionPool(self.host, self.port, self.client_id)
+        self.pool.on_reconnected = self._restore_after_reconnect
+        # Subscriptions and contract lookups live on the primary streaming connection;
+        # snapshots are spread over every streaming connection
+        self.ib = self.pool.get('streaming')
+        self.contracts = ContractRegistry(self.ib)
+        self.quote_manager = QuoteSubscriptionManager(self.ib, self.get_stock_contract)
+        self.account_mirror = AccountStateMirror(self.pool.get('account'))
+        # Created on first connect, inside the running loop
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._connect_attempts = 0
+        self._next_connect_at = 0.0
+        self._connect_task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self.pool.ready
         
     async def connect(self):
         """Connect to IBKR Gateway"""
-        try:
-            if not self.connected:
-                self.ib.connect(
-                    host=self.host,
-                    port=self.port,
-                    clientId=self.client_id,
-                    timeout=20
-                )
-                self.connected = True
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            try:
+                if not await self.pool.connect_all():
+                    raise ConnectionError("streaming or account connection failed")
+                self._connect_attempts = 0
+                self._next_connect_at = 0.0
                 logger.info(f"Connected to IBKR Gateway at {self.host}:{self.port}")
+                await self.contracts.warm()
+                await self.account_mirror.start()
+                return True
+            except Exception as e:
+                self._next_connect_at = time.monotonic() + self.pool.backoff_delay(self._connect_attempts)
+                self._connect_attempts += 1
+                logger.error(f"Failed to connect to IBKR Gateway: {e}")
+                return False
+
+    async def ensure_connected(self) -> bool:
+        """Make sure the gateway is reachable before a call, within a bounded wait.
+
+        While the supervisor is reconnecting, callers wait up to
+        IBKR_CONNECT_WAIT_SECONDS for it instead of opening their own
+        connections. After a failed connect, calls fail fast until the
+        backoff delay has passed.
+        """
+        if self.connected:
             return True
-        except Exception as e:
-            logger.error(f"Failed to connect to IBKR Gateway: {e}")
-            self.connected = False
+        if self.pool.reconnecting:
+            try:
+                await self.pool.wait_ready(self.connect_wait)
+            except asyncio.TimeoutError:
+                logger.warning(f"IBKR still reconnecting after {self.connect_wait}s, failing fast")
+            return self.connected
+        if time.monotonic() < self._next_connect_at:
             return False
+        # One shared attempt, shielded so a cancelled caller (e.g. a hedged
+        # quote that lost) does not abort it before the backoff is recorded
+        if self._connect_task is None or self._connect_task.done():
+            logger.info(f"Not connected, attempting to connect...")
+            self._connect_task = asyncio.ensure_future(self.connect())
+        return await asyncio.shield(self._connect_task)
+
+    async def _restore_after_reconnect(self, conn: PooledConnection):
+        # Only the primary connections hold subscriptions worth restoring
+        if conn.ib is self.ib:
+            self.quote_manager.resubscribe_all()
+        elif conn.ib is self.account_mirror.ib:
+            self.account_mirror.reset()
+            await self.account_mirror.start()
     
-    def disconnect(self):
+    async def disconnect(self):
         """Disconnect from IBKR Gateway"""
-        if self.connected:
-            self.ib.disconnect()
-            self.connected = False
-            logger.info("Disconnected from IBKR Gateway")
+        self.pool.disconnect_all()
+        self.quote_manager.clear()
+        self.account_mirror.reset()
+        logger.info("Disconnected from IBKR Gateway")
     
     def get_stock_contract(self, symbol: str) -> Contract:
-        """Create a stock contract for the given symbol"""
-        contract = Stock(symbol, 'SMART', 'USD')
-        return contract
+        """Get the stock contract for the given symbol, qualified if cached"""
+        return self.contracts.get(symbol)
     
     async def get_market_data(self, symbol: str) -> Optional[Dict]:
-        """Get real-time market data for a symbol"""
+        """Get real-time market data for a symbol from the streaming quote table"""
         try:
-            if not self.connected:
-                logger.info(f"Not connected, attempting to connect...")
-                await self.connect()
-            try:
-                contract = self.get_stock_contract(symbol)
-                logger.info(f"Requesting market data for {symbol}...")
-                ticker = self.ib.reqMktData(contract)
-                logger.info(f"Waiting for market data...")
-                await asyncio.sleep(5)  # Wait longer for data
-                def safe_float(value):
-                    if value is None:
-                        return None
-                    try:
-                        float_val = float(value)
-                        if float_val in [float('inf'), float('-inf')] or float_val != float_val:
-                            return None
-                        return float_val
-                    except (ValueError, TypeError):
-                        return None
-                market_price = ticker.marketPrice()
-                open_price = safe_float(getattr(ticker, 'open', None))
-                logger.info(f"IBKR {symbol}: price={market_price}, open={open_price}, ticker={ticker.__dict__}")
-                logger.info(f"Market price for {symbol}: {market_price}")
-                if market_price:
-                    return {
-                        'symbol': symbol,
-                        'price': safe_float(market_price),
-                        'bid': safe_float(ticker.bid),
-                        'ask': safe_float(ticker.ask),
-                        'high': safe_float(ticker.high),
-                        'low': safe_float(ticker.low),
-                        'volume': safe_float(ticker.volume),
-                        'timestamp': ticker.time.isoformat() if ticker.time else None,
-                        'open': open_price
-                    }
-                else:
-                    logger.warning(f"No market data available for {symbol}")
-                    return None
-            except Exception as e:
-                logger.error(f"Error getting market data for {symbol}: {e}")
+            if not await self.ensure_connected():
+                logger.warning(f"IBKR not connected, no market data for {symbol}")
                 return None
+            if not self.contracts.is_qualified(symbol):
+                await self.contracts.qualify([symbol])
+            quote = await self.quote_manager.get_quote(symbol)
+            if quote is None:
+                logger.warning(f"No market data available for {symbol}")
+            return quote
         except Exception as e:
-            logger.error(f"Fatal error in get_market_data for {symbol}: {e}")
+            logger.error(f"Error getting market data for {symbol}: {e}")
             return None
     
     async def get_portfolio(self) -> List[Dict]:
         """Get current portfolio positions"""
-        if not self.connected:
-            await self.connect()
+        if not await self.ensure_connected():
+            return []
         
         try:
-            positions = self.ib.positions()
+            positions = self.pool.get('account').positions()
             portfolio = []
             
             for position in positions:
@@ -122,10 +752,13 @@ class IBKRService:
     
     async def place_order(self, symbol: str, action: str, quantity: int, order_type: str = 'MKT') -> Optional[str]:
         """Place a trading order"""
-        if not self.connected:
-            await self.connect()
+        if not await self.ensure_connected():
+            logger.error(f"Cannot place order for {symbol}: IBKR not connected")
+            return None
         
         try:
+            if not self.contracts.is_qualified(symbol):
+                await self.contracts.qualify([symbol])
             contract = self.get_stock_contract(symbol)
             
             if action.upper() == 'BUY':
@@ -135,8 +768,9 @@ class IBKRService:
             else:
                 raise ValueError(f"Invalid action: {action}")
             
-            trade = self.ib.placeOrder(contract, order)
-            self.ib.sleep(1)  # Wait for order to be processed
+            async with self.pool.acquire('account') as ib:
+                trade = ib.placeOrder(contract, order)
+                await asyncio.sleep(1)  # Wait for order to be processed
             
             if trade.orderStatus.status == 'Submitted':
                 return trade.order.orderId
@@ -148,144 +782,131 @@ class IBKRService:
             logger.error(f"Error placing order: {e}")
             return None
 
+    async def get_historical_data(self, symbol: str, duration: str = '1 Y', bar_size: str = '1 day', what_to_show: str = 'TRADES') -> List[Dict]:
+        """Get historical bars on the dedicated historical connection"""
+        if not await self.ensure_connected():
+            return []
+        
+        try:
+            if not self.contracts.is_qualified(symbol):
+                await self.contracts.qualify([symbol])
+            contract = self.get_stock_contract(symbol)
+            async with self.pool.acquire('historical') as ib:
+                bars = await ib.reqHistoricalDataAsync(
+                    contract,
+                    endDateTime='',
+                    durationStr=duration,
+                    barSizeSetting=bar_size,
+                    whatToShow=what_to_show,
+                    useRTH=True,
+                    formatDate=1
+                )
+            return [{
+                'date': bar.date.isoformat(),
+                'open': bar.open,
+                'high': bar.high,
+                'low': bar.low,
+                'close': bar.close,
+                'volume': bar.volume
+            } for bar in bars]
+        except Exception as e:
+            logger.error(f"Error getting historical data for {symbol}: {e}")
+            return []
+
+    async def _ensure_account_mirror(self):
+        if not await self.ensure_connected():
+            raise ConnectionError("IBKR not connected")
+        if not self.account_mirror.started:
+            await self.account_mirror.start()
+
     async def get_account_summary(self) -> Dict:
         """Get account summary including cash balance, net liquidation value, etc."""
-        if not self.connected:
-            logger.info(f"Not connected, attempting to connect...")
-            await self.connect()
-        
         try:
-            # Get account details
-            accounts = self.ib.managedAccounts()
-            account = accounts[0] if accounts else None
-            
-            # Try to get account display name (if available)
-            account_display_name = account
-            try:
-                # Try to get more detailed account information
-                if hasattr(self.ib, 'reqManagedAccts'):
-                    # Request managed accounts which might include display names
-                    managed_accts = self.ib.reqManagedAccts()
-                    if managed_accts and len(managed_accts) > 0:
-                        # Sometimes managed accounts include display names
-                        account_display_name = managed_accts[0]
-                        logger.info(f"Got managed account info: {account_display_name}")
-                
-                # Try to get account summary which might include account name
-                try:
-                    account_summary = self.ib.accountSummary()
-                    for summary_item in account_summary:
-                        if summary_item.tag == 'AccountType' and summary_item.value:
-                            # This might give us more info about the account
-                            logger.info(f"Account type: {summary_item.value}")
-                except Exception as summary_error:
-                    logger.debug(f"Could not get account summary for display name: {summary_error}")
-                    
-            except Exception as e:
-                logger.debug(f"Could not get account display name: {e}")
-            
-            # Request account updates with timeout
-            try:
-                await asyncio.wait_for(self.ib.reqAccountUpdatesAsync(account), timeout=5.0)
-            except asyncio.TimeoutError:
-                logger.warning("Account updates request timed out, continuing with available data")
-            
-            # Get portfolio
-            portfolio = self.ib.portfolio()
-            
-            # Calculate total values
-            total_value = sum(item.marketValue for item in portfolio if hasattr(item, 'marketValue'))
-            unrealized_pnl = sum(item.unrealizedPNL for item in portfolio if hasattr(item, 'unrealizedPNL'))
-            
-            # Get account values with timeout
-            try:
-                values = await asyncio.wait_for(self.ib.accountSummaryAsync(), timeout=10.0)
-            except asyncio.TimeoutError:
-                logger.warning("Account summary request timed out, using cached values")
-                # Use cached account values if available
-                values = self.ib.accountValues()
-                if not values:
-                    # Return basic account info if no cached values
-                    return {
-                        'account': account,
-                        'account_display_name': account_display_name,
-                        'net_liquidation_value': 0.0,
-                        'total_cash_value': 0.0,
-                        'available_funds': 0.0,
-                        'buying_power': 0.0,
-                        'gross_position_value': total_value,
-                        'realized_pnl': 0.0,
-                        'unrealized_pnl': unrealized_pnl,
-                        'maint_margin_req': 0.0,
-                        'init_margin_req': 0.0,
-                        'excess_liquidity': 0.0
-                    }
-            
-            # Create summary dictionary
-            summary_dict = {
-                'account': account,
-                'account_display_name': account_display_name,
-                'net_liquidation_value': 0.0,
-                'total_cash_value': 0.0,
-                'available_funds': 0.0,
-                'buying_power': 0.0,
-                'gross_position_value': total_value,
-                'realized_pnl': 0.0,
-                'unrealized_pnl': unrealized_pnl,
-                'maint_margin_req': 0.0,
-                'init_margin_req': 0.0,
-                'excess_liquidity': 0.0
-            }
-            
-            # Update values from account summary
-            for v in values:
-                if v.tag == 'NetLiquidation':
-                    summary_dict['net_liquidation_value'] = float(v.value)
-                elif v.tag == 'TotalCashValue':
-                    summary_dict['total_cash_value'] = float(v.value)
-                elif v.tag == 'AvailableFunds':
-                    summary_dict['available_funds'] = float(v.value)
-                elif v.tag == 'BuyingPower':
-                    summary_dict['buying_power'] = float(v.value)
-                elif v.tag == 'MaintMarginReq':
-                    summary_dict['maint_margin_req'] = float(v.value)
-                elif v.tag == 'InitMarginReq':
-                    summary_dict['init_margin_req'] = float(v.value)
-                elif v.tag == 'ExcessLiquidity':
-                    summary_dict['excess_liquidity'] = float(v.value)
-            
-            logger.info(f"Account summary: {summary_dict}")
-            return summary_dict
+            await self._ensure_account_mirror()
+            return self.account_mirror.get_summary()
         except Exception as e:
             logger.error(f"Error getting account summary: {e}")
             return {}
 
-    async def get_positions(self) -> List[Dict]:
-        """Get detailed position information for all holdings"""
-        if not self.connected:
-            logger.info(f"Not connected, attempting to connect...")
-            await self.connect()
+    def get_streaming_prices(self, portfolio) -> Dict[int, float]:
+        """Get prices for portfolio stocks that already have a streaming quote, keyed by conId"""
+        prices = {}
+        for item in portfolio:
+            contract = item.contract
+            if contract.secType != 'STK':
+                continue
+            quote = self.quote_manager.quotes.get(contract.symbol.upper())
+            if quote and quote.get('price'):
+                prices[contract.conId] = quote['price']
+        return prices
+
+    async def get_snapshot_prices(self, portfolio) -> Dict[int, float]:
+        """Get current prices for portfolio items keyed by conId.
+
+        Stocks that already have a streaming quote are answered from the quote
+        table. Everything else is requested as one batch of snapshots on the
+        least busy streaming connection, awaited on its ticker updates under a
+        single timeout and cancelled afterwards.
+        """
+        prices = self.get_streaming_prices(portfolio)
+        pending = [item.contract for item in portfolio if item.contract.conId not in prices]
+        if not pending:
+            return prices
         
-        try:
-            # Get account details
-            account = self.ib.managedAccounts()[0]  # Get the first account
-            
-            # Request account updates to get fresh position data with timeout
+        timeout = float(os.getenv('IBKR_SNAPSHOT_TIMEOUT', '3'))
+        if not self.pool.is_connected('streaming'):
+            logger.warning(f"No streaming connection, skipping snapshots for {len(pending)} positions")
+            return prices
+        tickers = []
+        priced = asyncio.Event()
+
+        def on_pending_tickers(updated):
+            if all(safe_float(t.marketPrice()) is not None for t in tickers):
+                priced.set()
+
+        async with self.pool.acquire('streaming') as ib:
+            ib.pendingTickersEvent += on_pending_tickers
             try:
-                await asyncio.wait_for(self.ib.reqAccountUpdatesAsync(account), timeout=5.0)
-            except asyncio.TimeoutError:
-                logger.warning("Account updates request timed out for positions, continuing with available data")
-            
-            # Get portfolio data
-            portfolio = self.ib.portfolio()
+                for contract in pending:
+                    snapshot_contract = Contract(conId=contract.conId, exchange=contract.exchange or 'SMART')
+                    tickers.append(ib.reqMktData(snapshot_contract, '', True, False))
+                
+                # Woken by ticker updates; the deadline covers contracts that never get a price
+                try:
+                    await asyncio.wait_for(priced.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                ib.pendingTickersEvent -= on_pending_tickers
+                for ticker in tickers:
+                    price = safe_float(ticker.marketPrice())
+                    if price is not None:
+                        prices[ticker.contract.conId] = price
+                    try:
+                        ib.cancelMktData(ticker.contract)
+                    except Exception as e:
+                        logger.debug(f"Error cancelling snapshot for {ticker.contract.conId}: {e}")
+        
+        missing = len(pending) - sum(1 for t in tickers if t.contract.conId in prices)
+        if missing:
+            logger.warning(f"No snapshot price for {missing}/{len(pending)} positions within {timeout}s")
+        return prices
+
+    async def get_positions(self, refresh_prices: bool = False) -> List[Dict]:
+        """Get detailed position information for all holdings from the account mirror.
+
+        Prices come from the streaming quote table when available. With
+        refresh_prices the remaining positions are priced with one batched
+        snapshot request.
+        """
+        try:
+            await self._ensure_account_mirror()
+            account = self.account_mirror.account
+            portfolio = list(self.account_mirror.portfolio.values())
             result = []
             
             for item in portfolio:
                 contract = item.contract
-                # Request market data for current price
-                ticker = self.ib.reqMktData(contract)
-                await asyncio.sleep(0.1)  # Small delay to allow market data to arrive
-                
                 position_data = {
                     'account': account,
                     'symbol': contract.symbol,
@@ -303,6 +924,19 @@ class IBKRService:
                 }
                 result.append(position_data)
             
+            if refresh_prices:
+                prices = await self.get_snapshot_prices(portfolio)
+            else:
+                prices = self.get_streaming_prices(portfolio)
+            for item, position_data in zip(portfolio, result):
+                price = prices.get(item.contract.conId)
+                if price is None:
+                    continue
+                multiplier = safe_float(item.contract.multiplier) or 1.0
+                position_data['market_price'] = price
+                position_data['market_value'] = price * item.position * multiplier
+                position_data['unrealized_pnl'] = position_data['market_value'] - item.averageCost * item.position
+            
             logger.info(f"Found {len(result)} positions")
             return result
         except Exception as e:
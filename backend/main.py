@@ -1,27 +1,34 @@
 # Requires: python-dotenv
-from fastapi import FastAPI, HTTPException, Request, Body, Depends
+from fastapi import FastAPI, HTTPException, Request, Body, Depends, WebSocket, WebSocketDisconnect, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from ibkr_service import ibkr_service
-from market_data import get_market_data, get_current_source, set_current_source, MARKET_DATA_SOURCES, get_all_news
-from sentiment_analyzer import sentiment_analyzer
+from market_data import get_market_data, get_market_data_many, get_current_source, set_current_source, MARKET_DATA_SOURCES, get_all_news, get_all_news_batch, quote_router
 from news_scheduler import news_scheduler, get_quota_status
 from stock_data_service import stock_data_service
 from stock_data_scheduler import stock_data_scheduler
 from i18n_service import i18n_service
+from quote_cache import quote_cache
+from singleflight import single_flight
+from quote_stream import quote_stream_hub
+from circuit_breaker import circuit_breakers
+from http_client import http_client
+from news_store import store_news_items, load_fetch_marks, record_polls, query_news_page, search_news
+from news_dedupe import news_dedupe_index
+from news_allocator import news_poll_allocator
+from news_pipeline import news_pipeline
 import asyncio
 from pydantic import BaseModel
 import os
 from dotenv import load_dotenv
 from typing import Dict, Any, List, Optional
 import logging
-from apscheduler.schedulers.background import BackgroundScheduler
 from sqlalchemy.orm import Session
 from database import get_db
 from models import News, TargetSymbol, StockDaily, StockIntraday, TechnicalIndicators, TradingSignals
 from sqlalchemy import func, and_
 import pytz
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import openai
 import json
 
@@ -66,11 +73,6 @@ class AIAnalysisRequest(BaseModel):
 selected_market_data_source = os.getenv('MARKET_DATA_SOURCE', 'yahoo')
 selected_news_source = os.getenv('NEWS_SOURCE', 'yahoo')
 
-NEWS_FETCH_INTERVAL_HOURS = float(os.getenv('NEWS_FETCH_INTERVAL_HOURS', 2))
-NEWS_FETCH_INTERVAL_MINUTES = int(NEWS_FETCH_INTERVAL_HOURS * 60)
-
-scheduler = BackgroundScheduler()
-
 logger = logging.getLogger(__name__)
 
 async def get_request_body(request: Request) -> Dict[str, Any]:
@@ -80,12 +82,20 @@ async def get_request_body(request: Request) -> Dict[str, Any]:
 async def root():
     return {"message": "IBKR Trading API"}
 
+@app.get("/singleflight/stats")
+async def singleflight_stats():
+    """Get how many upstream calls were coalesced per operation"""
+    return single_flight.get_stats()
+
 @app.get("/connect")
 async def connect():
     """Connect to IBKR"""
     try:
-        await ibkr_service.connect()
+        if not await ibkr_service.connect():
+            raise HTTPException(status_code=503, detail="Could not connect to IBKR Gateway")
         return {"message": "Connected to IBKR"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error connecting to IBKR: {str(e)}")
 
@@ -98,6 +108,11 @@ async def disconnect():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error disconnecting from IBKR: {str(e)}")
 
+@app.get("/ibkr/pool")
+async def get_ibkr_pool_status():
+    """Get the state of each pooled IBKR connection by workload class"""
+    return ibkr_service.pool.get_stats()
+
 @app.get("/account/summary")
 async def get_account_summary():
     """Get account summary including cash balance and portfolio value"""
@@ -108,11 +123,19 @@ async def get_account_summary():
         raise HTTPException(status_code=500, detail=f"Error getting account summary: {str(e)}")
 
 @app.get("/account/positions")
-async def get_positions():
-    """Get detailed information about current positions"""
+async def get_positions(refresh_prices: bool = True):
+    """Get detailed information about current positions.
+
+    Positions without a streaming quote are priced with one batched snapshot
+    request; pass refresh_prices=false to serve the quote table only.
+    """
     try:
-        positions = await ibkr_service.get_positions()
-        return {"positions": positions}
+        positions = await ibkr_service.get_positions(refresh_prices=refresh_prices)
+        last_updated = ibkr_service.account_mirror.last_updated
+        return {
+            "positions": positions,
+            "last_updated": last_updated.isoformat() if last_updated else None
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting positions: {str(e)}")
 
@@ -123,10 +146,93 @@ async def get_data_source():
 
 @app.post("/market-data-source")
 async def set_data_source(req: DataSourceRequest):
-    """Set the current market data source (e.g., yahoo, ibkr)"""
+    """Set the preferred market data source (yahoo, ibkr, finnhub, or auto)"""
     set_current_source(req.source)
     return {"source": get_current_source()}
 
+@app.get("/market-data/batch")
+async def market_data_batch_endpoint(symbols: str, timeout: Optional[float] = None):
+    """Get market data for a comma-separated list of symbols in one request"""
+    symbol_list = [s for s in symbols.split(',') if s.strip()]
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    try:
+        result = await get_market_data_many(symbol_list, timeout=timeout)
+        result['source'] = get_current_source()
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting batch market data: {str(e)}")
+
+@app.get("/market-data/router/stats")
+async def market_data_router_stats():
+    """Get rolling latency and error rate per quote source"""
+    return quote_router.get_stats()
+
+@app.get("/market-data/circuit-breakers")
+async def market_data_circuit_breakers():
+    """Get circuit breaker state per market data provider"""
+    return circuit_breakers.get_status()
+
+@app.post("/market-data/circuit-breakers/{name}/reset")
+async def reset_market_data_circuit_breaker(name: str):
+    """Close a provider's circuit breaker so its next call goes out"""
+    if not circuit_breakers.reset(name):
+        raise HTTPException(status_code=404, detail=f"No circuit breaker for {name}")
+    return circuit_breakers.get(name).get_status()
+
+@app.get("/market-data/http/stats")
+async def market_data_http_stats():
+    """Get request counts, status codes and latency per upstream host"""
+    return http_client.get_stats()
+
+@app.get("/market-data/cache/stats")
+async def market_data_cache_stats():
+    """Get hit/miss/eviction counters for the in-process quote cache"""
+    return quote_cache.get_stats()
+
+@app.get("/market-data/stream/stats")
+async def market_data_stream_stats():
+    """Get client and upstream counts for the /ws/quotes stream"""
+    return quote_stream_hub.get_stats()
+
+@app.websocket("/ws/quotes")
+async def quotes_websocket(websocket: WebSocket):
+    """Stream quote deltas for the symbols a client subscribes to.
+
+    Clients send {"action": "subscribe" | "unsubscribe", "symbols": [...]}
+    and receive {"type": "quotes", "data": {symbol: changed_fields}}.
+    """
+    await websocket.accept()
+    client = quote_stream_hub.connect(websocket)
+    try:
+        while True:
+            message = await websocket.receive_json()
+            action = message.get('action') if isinstance(message, dict) else None
+            symbols = message.get('symbols', []) if isinstance(message, dict) else []
+            if isinstance(symbols, str):
+                symbols = symbols.split(',')
+            if action == 'subscribe':
+                subscribed = quote_stream_hub.subscribe(client, symbols)
+            elif action == 'unsubscribe':
+                subscribed = quote_stream_hub.unsubscribe(client, symbols)
+            else:
+                await websocket.send_json({'type': 'error', 'message': f"Unknown action: {action}"})
+                continue
+            await websocket.send_json({'type': 'subscribed', 'symbols': sorted(subscribed)})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"Quote websocket closed with error: {e}")
+    finally:
+        quote_stream_hub.disconnect(client)
+
+@app.get("/market-data/subscriptions")
+async def market_data_subscriptions():
+    """Get the IBKR streaming market data subscriptions currently held open"""
+    stats = ibkr_service.quote_manager.get_stats()
+    stats['contracts'] = ibkr_service.contracts.get_stats()
+    return stats
+
 @app.get("/market-data/{symbol}")
 async def market_data_endpoint(symbol: str):
     """Get real-time market data for a symbol from the selected data source"""
@@ -257,13 +363,18 @@ async def get_news_stats(db: Session = Depends(get_db)):
         avg_score = db.query(func.avg(News.score)).scalar()
         avg_score = round(avg_score, 2) if avg_score else 0
         
+        # Near-duplicate stories stored from several providers share a cluster
+        news_clusters = db.query(News.cluster_id).distinct().count()
+        
         return {
             "totalNews": total_news,
             "symbolsWithNews": symbols_with_news,
             "latestNewsDate": latest_news_date,
             "newsSources": sources,
             "sentimentCounts": sentiment_counts,
-            "averageSentimentScore": avg_score
+            "averageSentimentScore": avg_score,
+            "newsClusters": news_clusters,
+            "dedupeIndex": news_dedupe_index.get_stats()
         }
     except Exception as e:
         logger.error(f"Error getting news stats: {e}")
@@ -318,26 +429,120 @@ async def get_news_sentiment(symbol: str, db: Session = Depends(get_db)):
         logger.error(f"Error getting sentiment analysis for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting sentiment analysis: {str(e)}")
 
+@app.get('/news/search')
+async def search_news_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    symbol: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over stored news, best match first.
+
+    q accepts web search syntax: "quoted phrase", or, -excluded. symbol
+    takes comma-separated values; start_date and end_date are inclusive.
+    """
+    symbols = [s.strip().upper() for s in symbol.split(',') if s.strip()] if symbol else None
+    try:
+        matches = search_news(db, q, symbols, start_date, end_date, limit, offset)
+        results = [{
+            'id': match['news'].id,
+            'symbol': match['news'].symbol,
+            'title': match['news'].title,
+            'title_highlight': match['title_highlight'],
+            'snippet': match['snippet'],
+            'link': match['news'].link,
+            'publisher': match['news'].publisher,
+            'published_at': match['news'].published_at.isoformat() if match['news'].published_at else None,
+            'source': match['news'].source,
+            'score': match['news'].score,
+            'sentiment': match['news'].sentiment_label,
+            'rank': round(match['rank'], 4)
+        } for match in matches]
+        return {
+            'query': q,
+            'results': results,
+            'offset': offset,
+            'next_offset': offset + limit if len(results) == limit else None
+        }
+    except Exception as e:
+        logger.error(f"Error searching news for '{q}': {e}")
+        raise HTTPException(status_code=500, detail=f"Error searching news: {str(e)}")
+
+# Symbols with a background refresh running outside the ingestion pipeline
+_news_refreshing = set()
+
+async def refresh_news_in_background(symbol: str):
+    """Fetch and store a symbol's news after the response, with its own session"""
+    db = next(get_db())
+    try:
+        await fetch_and_store_news_for_symbol(symbol, db)
+    except Exception as e:
+        logger.warning(f"Background news refresh failed for {symbol}: {e}")
+    finally:
+        db.close()
+        _news_refreshing.discard(symbol)
+
 @app.get('/news/{symbol}')
-async def get_news(symbol: str):
-    """Get news for a symbol from the selected news source"""
+async def get_news(
+    symbol: str,
+    background_tasks: BackgroundTasks,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    source: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    refresh: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Get stored news for a symbol, newest first.
+
+    Pass next_cursor back as cursor for the following page. source and
+    sentiment take comma-separated values. refresh=true also fetches fresh
+    news in the background without waiting for it; the refresh field says
+    whether that fetch was queued, is already pending, or was rejected
+    because the ingestion queue is full.
+    """
+    symbol = symbol.upper()
+    sources = [s.strip().lower() for s in source.split(',') if s.strip()] if source else None
+    sentiments = [s.strip().lower() for s in sentiment.split(',') if s.strip()] if sentiment else None
     try:
-        source = MARKET_DATA_SOURCES.get(selected_news_source)
-        if not source:
-            # Fallback to Yahoo if selected source not found
-            source = MARKET_DATA_SOURCES['yahoo']
-            
-        # Run the news fetch in a thread pool since it's a blocking operation
-        loop = asyncio.get_event_loop()
-        news = await loop.run_in_executor(None, lambda: source.get_news(symbol))
-        
-        if not news:
-            return {'symbol': symbol, 'news': [], 'message': 'No news found for this symbol'}
-            
-        return {'symbol': symbol, 'news': news}
+        rows, next_cursor = query_news_page(db, symbol, limit, cursor, sources, sentiments)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting news for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting news for {symbol}: {str(e)}")
+    
+    refresh_status = None
+    if refresh:
+        if news_pipeline.running:
+            refresh_status = (await news_pipeline.submit([symbol]))[symbol]
+        elif symbol in _news_refreshing:
+            refresh_status = 'pending'
+        else:
+            _news_refreshing.add(symbol)
+            background_tasks.add_task(refresh_news_in_background, symbol)
+            refresh_status = 'queued'
+    
+    news = [{
+        'id': row.id,
+        'title': row.title,
+        'summary': row.summary,
+        'link': row.link,
+        'publisher': row.publisher,
+        'published_at': row.published_at.isoformat() if row.published_at else None,
+        'source': row.source,
+        'score': row.score,
+        'sentiment': row.sentiment_label,
+        'confidence': row.confidence,
+        'cluster_id': row.cluster_id
+    } for row in rows]
+    result = {'symbol': symbol, 'news': news, 'next_cursor': next_cursor, 'refresh': refresh_status}
+    if not news and cursor is None:
+        result['message'] = 'No news found for this symbol'
+    return result
 
 @app.get('/market-data-source/news')
 def get_news_source():
@@ -380,6 +585,7 @@ async def get_scheduler_status():
     """Get the current status of the news scheduler"""
     try:
         status = news_scheduler.get_status()
+        status['allocator'] = news_poll_allocator.get_status()
         return status
     except Exception as e:
         logger.error(f"Error getting scheduler status: {e}")
@@ -436,11 +642,15 @@ async def fetch_news_for_all_targets(db: Session = Depends(get_db)):
         if not symbols:
             return {"message": "No target symbols found"}
         
-        # Fetch news for each symbol
+        # Fetch news newer than what is stored, in batched provider requests
+        since = load_fetch_marks(db, symbols)
+        loop = asyncio.get_event_loop()
+        news_by_symbol = await loop.run_in_executor(None, lambda: get_all_news_batch(symbols, since))
+        
         results = []
         for symbol in symbols:
             try:
-                await fetch_and_store_news_for_symbol(symbol, db)
+                await fetch_and_store_news_for_symbol(symbol, db, news_by_symbol.get(symbol.upper(), []))
                 results.append({"symbol": symbol, "status": "success"})
             except Exception as e:
                 logger.error(f"Error fetching news for {symbol}: {e}")
@@ -466,161 +676,38 @@ async def clear_all_news(db: Session = Depends(get_db)):
         logger.error(f"Error clearing all news: {e}")
         raise HTTPException(status_code=500, detail=f"Error clearing all news: {str(e)}")
 
-async def fetch_and_store_news_for_symbol(symbol: str, db: Session):
-    """Helper function to fetch and store news for a specific symbol"""
+async def fetch_and_store_news_for_symbol(symbol: str, db: Session, all_news: Optional[List[Dict]] = None):
+    """Helper function to fetch and store news for a specific symbol.
+
+    Pass all_news to store news that was already fetched, e.g. by a batched fetch.
+    """
     try:
-        # Get news from all available sources
-        loop = asyncio.get_event_loop()
-        all_news = await loop.run_in_executor(None, lambda: get_all_news(symbol))
+        if all_news is None:
+            # Get news newer than what is stored from all available sources
+            loop = asyncio.get_event_loop()
+            marks = await loop.run_in_executor(None, lambda: load_fetch_marks(db, [symbol]))
+            since = {source: by_symbol[symbol.upper()] for source, by_symbol in marks.items() if symbol.upper() in by_symbol}
+            all_news = await loop.run_in_executor(None, lambda: get_all_news(symbol, since))
+            # Count the poll even when nothing new came back, so the allocator sees the symbol as fresh
+            def record_poll():
+                record_polls(db, {symbol: list(MARKET_DATA_SOURCES)})
+                db.commit()
+            await loop.run_in_executor(None, record_poll)
         
         if not all_news:
             logger.info(f"No news found for {symbol}")
             return
         
-        # Store news in database with sentiment analysis
-        stored_count = 0
-        for news_item in all_news:
-            try:
-                # Check if news already exists
-                existing_news = db.query(News).filter(
-                    News.title == news_item['title'],
-                    News.symbol == symbol.upper(),
-                    News.source == news_item['source']
-                ).first()
-                
-                if existing_news:
-                    continue
-                
-                # Perform sentiment analysis
-                sentiment_result = sentiment_analyzer.analyze_sentiment(
-                    text=news_item['summary'],
-                    title=news_item['title']
-                )
-                
-                # Create news record
-                news_record = News(
-                    symbol=symbol.upper(),
-                    title=news_item['title'],
-                    summary=news_item['summary'],
-                    link=news_item['link'],
-                    published_at=news_item['published_at'],
-                    source=news_item['source'],
-                    publisher=news_item.get('publisher', ''),
-                    score=sentiment_result.get('score'),
-                    sentiment_label=sentiment_result.get('sentiment'),
-                    confidence=sentiment_result.get('confidence'),
-                    analysis_method=sentiment_result.get('method', 'combined')
-                )
-                
-                db.add(news_record)
-                stored_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error storing news item for {symbol}: {e}")
-                continue
-        
-        db.commit()
-        logger.info(f"Stored {stored_count} new news articles for {symbol}")
+        # Score and store only the articles not already in the database, off the event loop
+        loop = asyncio.get_event_loop()
+        inserted_ids = await loop.run_in_executor(None, lambda: store_news_items(db, symbol, all_news))
+        logger.info(f"Stored {len(inserted_ids)} new news articles for {symbol}")
         
     except Exception as e:
         db.rollback()
         logger.error(f"Error in fetch_and_store_news_for_symbol for {symbol}: {e}")
         raise
 
-def fetch_and_store_news():
-    """Fetch news for target symbols and store in database"""
-    start_time = datetime.now(tz)
-    logger.info(f"🕐 SCHEDULER RUN STARTED at {start_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-    
-    try:
-        # Get target symbols from database
-        db = next(get_db())
-        target_symbols = db.query(TargetSymbol).all()
-        
-        if not target_symbols:
-            logger.info("No target symbols found, skipping news fetch")
-            return
-        
-        symbols = [symbol.symbol for symbol in target_symbols]
-        logger.info(f"📋 Processing {len(symbols)} target symbols: {symbols}")
-        
-        total_processed = 0
-        total_stored = 0
-        
-        for symbol in symbols:
-            try:
-                # Get news from all sources
-                news_data = get_all_news(symbol)
-                total_processed += 1
-                
-                if news_data:
-                    stored_count = 0
-                    for news_item in news_data:
-                        try:
-                            # Check if news already exists
-                            existing_news = db.query(News).filter(
-                                News.title == news_item.get('title'),
-                                News.source == news_item.get('source'),
-                                News.published_at == news_item.get('published_at')
-                            ).first()
-                            
-                            if not existing_news:
-                                # Perform sentiment analysis
-                                sentiment_result = sentiment_analyzer.analyze_sentiment(
-                                    text=news_item.get('summary', ''),
-                                    title=news_item.get('title', '')
-                                )
-                                
-                                # Create new news record
-                                news_record = News(
-                                    title=news_item.get('title', ''),
-                                    publisher=news_item.get('publisher', ''),
-                                    link=news_item.get('link', ''),
-                                    published_at=news_item.get('published_at'),
-                                    source=news_item.get('source', ''),
-                                    summary=news_item.get('summary', ''),
-                                    score=sentiment_result['score'],
-                                    sentiment_label=sentiment_result['sentiment'],
-                                    confidence=sentiment_result['confidence'],
-                                    analysis_method=sentiment_result['method'],
-                                    textblob_score=sentiment_result.get('textblob_score'),
-                                    openai_score=sentiment_result.get('openai_score'),
-                                    raw_json=news_item.get('raw_json', ''),
-                                    symbol=symbol
-                                )
-                                db.add(news_record)
-                                stored_count += 1
-                        except Exception as e:
-                            logger.error(f"Error storing news item for {symbol}: {e}")
-                            continue
-                    
-                    db.commit()
-                    total_stored += stored_count
-                    logger.info(f"💾 Stored {stored_count} new news items for {symbol}")
-                else:
-                    logger.info(f"📭 No news data received for {symbol}")
-                    
-            except Exception as e:
-                logger.error(f"❌ Error fetching news for {symbol}: {e}")
-                continue
-        
-        # Calculate duration and log summary
-        end_time = datetime.now(tz)
-        duration = (end_time - start_time).total_seconds()
-        
-        logger.info(f"🕐 SCHEDULER RUN COMPLETED at {end_time.strftime('%Y-%m-%d %H:%M:%S %Z')} (Duration: {duration:.2f}s)")
-        logger.info(f"📊 SUMMARY: Processed {total_processed} symbols, stored {total_stored} new articles")
-        logger.info(f"🔄 Next scheduled run in {NEWS_FETCH_INTERVAL_MINUTES} minutes")
-                
-    except Exception as e:
-        end_time = datetime.now(tz)
-        duration = (end_time - start_time).total_seconds()
-        logger.error(f"❌ SCHEDULER RUN FAILED at {end_time.strftime('%Y-%m-%d %H:%M:%S %Z')} (Duration: {duration:.2f}s)")
-        logger.error(f"Error in fetch_and_store_news: {e}")
-
-scheduler.add_job(fetch_and_store_news, 'interval', minutes=NEWS_FETCH_INTERVAL_MINUTES, next_run_time=None)
-scheduler.start()
-
 @app.get('/target-symbols')
 async def get_target_symbols(db: Session = Depends(get_db)):
     """Get the current list of target stock symbols"""
@@ -645,6 +732,7 @@ async def set_target_symbols(symbols: list[str], db: Session = Depends(get_db)):
                 db.add(target_symbol)
         
         db.commit()
+        await ibkr_service.contracts.warm([s.strip().upper() for s in symbols if s.strip()])
         return {"message": f"Successfully set {len(symbols)} target symbols", "symbols": symbols}
     except Exception as e:
         db.rollback()
@@ -836,7 +924,7 @@ async def initialize_stock_data(symbol: str, db: Session = Depends(get_db)):
         start_date = end_date - timedelta(days=5*365)
         
         # 抓取日線數據
-        daily_data = stock_data_service.fetch_daily_data(
+        daily_data = await stock_data_service.fetch_daily_data_async(
             symbol=symbol,
             start_date=start_date.strftime('%Y-%m-%d'),
             end_date=end_date.strftime('%Y-%m-%d')
@@ -867,6 +955,18 @@ async def startup_event():
     stock_data_scheduler.start()
     
     logger.info("Both news and stock data schedulers started")
+    
+    # 預熱IBKR合約緩存（連線後批量確認所有目標股票合約）
+    try:
+        db = next(get_db())
+        try:
+            symbols = [ts.symbol for ts in db.query(TargetSymbol).all()]
+        finally:
+            db.close()
+        await ibkr_service.contracts.warm(symbols)
+        logger.info(f"Registered {len(symbols)} target symbols for IBKR contract warm-up")
+    except Exception as e:
+        logger.warning(f"Could not warm IBKR contract registry: {e}")
 
 @app.post('/ai/analyze')
 async def analyze_with_ai(request: AIAnalysisRequest):
@@ -878,12 +978,30 @@ async def analyze_with_ai(request: AIAnalysisRequest):
         if not openai.api_key:
             raise HTTPException(status_code=500, detail="OpenAI API key not configured")
         
+        # 請求未附帶賬戶數據時，使用IBKR賬戶鏡像
+        account_last_updated = None
+        request_portfolio = request.portfolio
+        account_values = request.accountSummary
+        if ibkr_service.account_mirror.started:
+            mirror_summary = ibkr_service.account_mirror.get_summary()
+            account_last_updated = mirror_summary['last_updated']
+            if not request_portfolio:
+                request_portfolio = await ibkr_service.get_positions()
+            if not account_values:
+                account_values = {
+                    'netLiquidationValue': mirror_summary['net_liquidation_value'],
+                    'totalCashValue': mirror_summary['total_cash_value'],
+                    'availableFunds': mirror_summary['available_funds'],
+                    'buyingPower': mirror_summary['buying_power'],
+                    'unrealizedPnl': mirror_summary['unrealized_pnl']
+                }
+        
         # 準備投資組合摘要
         portfolio_summary = []
         total_value = 0
         total_pnl = 0
         
-        for position in request.portfolio:
+        for position in request_portfolio:
             pnl = position.get('unrealized_pnl', 0)
             market_value = position.get('market_value', 0)
             total_value += market_value
@@ -927,15 +1045,16 @@ async def analyze_with_ai(request: AIAnalysisRequest):
         # 準備上下文信息
         context = {
             'account_summary': {
-                'total_value': request.accountSummary.get('netLiquidationValue', 0),
-                'cash_balance': request.accountSummary.get('totalCashValue', 0),
-                'available_funds': request.accountSummary.get('availableFunds', 0),
-                'buying_power': request.accountSummary.get('buyingPower', 0),
-                'unrealized_pnl': request.accountSummary.get('unrealizedPnl', 0)
+                'total_value': account_values.get('netLiquidationValue', 0),
+                'cash_balance': account_values.get('totalCashValue', 0),
+                'available_funds': account_values.get('availableFunds', 0),
+                'buying_power': account_values.get('buyingPower', 0),
+                'unrealized_pnl': account_values.get('unrealizedPnl', 0)
             },
+            'account_last_updated': account_last_updated,
             'portfolio': portfolio_summary,
             'portfolio_metrics': {
-                'total_positions': len(request.portfolio),
+                'total_positions': len(request_portfolio),
                 'total_market_value': total_value,
                 'total_unrealized_pnl': total_pnl,
                 'portfolio_pnl_percentage': (total_pnl / total_value) * 100 if total_value > 0 else 0
@@ -1089,6 +1208,7 @@ async def analyze_ibkr_with_ai(request: AIAnalysisRequest):
                 'buying_power': account_summary.get('buying_power', 0),
                 'unrealized_pnl': account_summary.get('unrealized_pnl', 0)
             },
+            'account_last_updated': account_summary.get('last_updated'),
             'portfolio': portfolio_summary,
             'portfolio_metrics': {
                 'total_positions': len(positions),
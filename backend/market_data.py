@@ -1,13 +1,25 @@
 import os
 import logging
 import yfinance as yf
+import pandas as pd
 from ibkr_service import ibkr_service
 import asyncio
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+from urllib.parse import quote_plus
 from dotenv import load_dotenv
 import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from news_scheduler import news_scheduler
+from quote_cache import quote_cache
+from singleflight import single_flight
+from quote_router import QuoteRouter
+from circuit_breaker import circuit_breakers, CircuitOpenError
+from http_client import http_client
+from news_store import parse_published_at
 import pytz
 
 # Load environment variables
@@ -36,16 +48,92 @@ def set_current_source(source: str):
 
 # Base class for market data sources
 class MarketDataSource:
+    name = None
+    supports_batch_news = False
+    # Requests are charged against the news quota ledger, so delivered requests are not retried
+    quota_metered = False
+
+    @property
+    def symbols_per_request(self) -> int:
+        """Symbols packed into one batched news request"""
+        return max(1, getattr(self, 'batch_size', 1))
+
+    @property
+    def breaker(self):
+        return circuit_breakers.get(self.name)
+
+    def _get(self, url: str, timeout=None):
+        """GET through the shared HTTP client and this provider's circuit breaker.
+
+        Connection errors, timeouts, and 429 or 5xx responses left after the
+        client's retries count as failures; any other response is returned
+        for the caller to handle.
+        """
+        def send():
+            r = http_client.get(url, timeout=timeout, metered=self.quota_metered)
+            if r.status_code == 429 or r.status_code >= 500:
+                r.raise_for_status()
+            return r
+        return self.breaker.call(send)
+
     def get_market_data(self, symbol: str):
         raise NotImplementedError
-    def get_news(self, symbol: str):
+    def get_news(self, symbol: str, since: Optional[datetime] = None):
+        """Get news for a symbol; with since (naive UTC), only articles published after it"""
         raise NotImplementedError
 
+    def get_news_batch(self, symbols, since: Optional[Dict[str, datetime]] = None) -> Dict[str, List[Dict]]:
+        """Get news for many symbols, keyed by upper-case symbol.
+
+        since maps symbols to their high-water mark. Sources without a
+        multi-symbol API query one symbol at a time.
+        """
+        since = since or {}
+        return {symbol: self.get_news(symbol, since.get(symbol)) for symbol in _normalize_symbols(symbols)}
+
+def _normalize_symbols(symbols) -> List[str]:
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+def _chunks(items: List[str], size: int):
+    for i in range(0, len(items), max(1, size)):
+        yield items[i:i + size]
+
+def _is_newer(published_at, since: Optional[datetime]) -> bool:
+    """Whether an article is past the high-water mark; undated articles are kept"""
+    if since is None:
+        return True
+    published = parse_published_at(published_at)
+    return published is None or published > since
+
+def _chunk_since(chunk: List[str], since: Dict[str, datetime]) -> Optional[datetime]:
+    """Upstream lower bound for a multi-symbol request: the oldest mark, or none if any symbol has none"""
+    marks = [since.get(symbol) for symbol in chunk]
+    if not marks or any(mark is None for mark in marks):
+        return None
+    return min(marks)
+
+def _assign_to_symbols(result: Dict[str, List[Dict]], chunk: List[str], item: Dict, matched: Set[str], since: Optional[Dict[str, datetime]] = None):
+    """File an article under each requested symbol it mentions.
+
+    A single-symbol request owns every article it returns; in a multi-symbol
+    request articles that match none of the symbols are dropped, as are
+    articles not newer than a symbol's high-water mark.
+    """
+    targets = [symbol for symbol in chunk if symbol in matched]
+    if not targets and len(chunk) == 1:
+        targets = chunk
+    for symbol in targets:
+        if since and not _is_newer(item.get('published_at'), since.get(symbol)):
+            continue
+        result[symbol].append(dict(item))
+
 # Yahoo Finance implementation
 class YahooFinanceSource(MarketDataSource):
+    name = 'yahoo'
+
     def get_market_data(self, symbol: str):
         ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = self.breaker.call(lambda: ticker.info)
         price = info.get('regularMarketPrice')
         # Use previous close as the 'open' reference for price change, matching Yahoo's main display
         open_price = info.get('regularMarketPreviousClose')
@@ -66,10 +154,58 @@ class YahooFinanceSource(MarketDataSource):
             'timestamp': timestamp,
             'open': open_price if open_price is not None else None
         }
-    def get_news(self, symbol: str):
+    def get_market_data_bulk(self, symbols):
+        """Get quotes for many symbols with a single yf.download call.
+
+        Only the fields we expose are derived from the last two daily bars,
+        which avoids pulling the full .info blob once per symbol. Symbols
+        without data are left out of the result.
+        """
+        if not symbols:
+            return {}
+        df = self.breaker.call(
+            yf.download,
+            tickers=list(symbols),
+            period='5d',
+            interval='1d',
+            group_by='ticker',
+            auto_adjust=False,
+            progress=False,
+            threads=True
+        )
+        if df is None or df.empty:
+            return {}
+        
+        quotes = {}
+        for symbol in symbols:
+            if isinstance(df.columns, pd.MultiIndex):
+                if symbol not in df.columns.get_level_values(0):
+                    continue
+                frame = df[symbol]
+            else:
+                frame = df
+            frame = frame.dropna(subset=['Close'])
+            if frame.empty:
+                continue
+            last = frame.iloc[-1]
+            # Previous close is the 'open' reference, matching get_market_data
+            previous_close = frame['Close'].iloc[-2] if len(frame) > 1 else None
+            quotes[symbol] = {
+                'symbol': symbol,
+                'price': float(last['Close']),
+                'bid': None,
+                'ask': None,
+                'high': float(last['High']) if pd.notna(last['High']) else None,
+                'low': float(last['Low']) if pd.notna(last['Low']) else None,
+                'volume': float(last['Volume']) if pd.notna(last['Volume']) else None,
+                'timestamp': int(frame.index[-1].timestamp()),
+                'open': float(previous_close) if previous_close is not None else None
+            }
+        return quotes
+    def get_news(self, symbol: str, since: Optional[datetime] = None):
         # Yahoo Finance news via yfinance
         ticker = yf.Ticker(symbol)
-        news = ticker.news
+        news = self.breaker.call(lambda: ticker.news)
         result = []
         for n in news:
             # Parse the nested content structure
@@ -100,6 +236,10 @@ class YahooFinanceSource(MarketDataSource):
                 except Exception:
                     published_at = None
             
+            # The feed is newest first, so stop at the first article we already have
+            if not _is_newer(published_at, since):
+                break
+            
             # Extract summary
             summary = content.get('summary', '') or content.get('description', '')
             
@@ -116,6 +256,9 @@ class YahooFinanceSource(MarketDataSource):
 
 # Finnhub implementation (free tier)
 class FinnhubSource(MarketDataSource):
+    name = 'finnhub'
+    quota_metered = True
+
     def __init__(self, api_key):
         if not api_key or len(api_key.strip()) < 10:  # Finnhub API keys are typically longer
             raise ValueError("Invalid Finnhub API key. Please check your .env file.")
@@ -125,7 +268,7 @@ class FinnhubSource(MarketDataSource):
     def get_market_data(self, symbol: str):
         url = f'https://finnhub.io/api/v1/quote?symbol={symbol}&token={self.api_key}'
         try:
-            r = requests.get(url)
+            r = self._get(url)
             r.raise_for_status()
             data = r.json()
             logger.info(f"Finnhub market data response for {symbol}: {data}")
@@ -145,11 +288,14 @@ class FinnhubSource(MarketDataSource):
                 'volume': None,
                 'timestamp': None
             }
+        except CircuitOpenError as e:
+            logger.debug(f"Skipping Finnhub quote for {symbol} - {e}")
+            return None
         except requests.exceptions.RequestException as e:
             logger.error(f"Finnhub request error for {symbol}: {e}")
             return None
             
-    def get_news(self, symbol: str):
+    def get_news(self, symbol: str, since: Optional[datetime] = None):
         # Check if we can make a request using the scheduler
         if not news_scheduler.can_make_request('finnhub'):
             logger.info(f"Skipping Finnhub news for {symbol} - request limit reached")
@@ -161,21 +307,26 @@ class FinnhubSource(MarketDataSource):
             logger.info(f"Skipping Finnhub news for {symbol} - no remaining quota")
             return []
         
-        # Use last 7 days for news
-        end_date = datetime.now()
+        # Use last 7 days for news, or only since the last article we stored.
+        # since is naive UTC, so the window is built in UTC and never starts after it ends
+        end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=7)
+        if since is not None and since > start_date:
+            start_date = min(since, end_date)
         
         url = f'https://finnhub.io/api/v1/company-news?symbol={symbol}&from={start_date.strftime("%Y-%m-%d")}&to={end_date.strftime("%Y-%m-%d")}&token={self.api_key}'
         logger.info(f"Fetching Finnhub news for {symbol} from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
         
+        # Reserve the request in the shared quota ledger before sending it
+        if not news_scheduler.acquire_request('finnhub'):
+            logger.info(f"Skipping Finnhub news for {symbol} - request limit reached")
+            return []
+        
         try:
-            r = requests.get(url)
+            r = self._get(url)
             r.raise_for_status()
             news = r.json()
             
-            # Record the request
-            news_scheduler.record_request('finnhub')
-            
             # Log the raw response for debugging
             logger.debug(f"Raw Finnhub news response for {symbol}: {news[:2]}")
             
@@ -194,6 +345,8 @@ class FinnhubSource(MarketDataSource):
                 'summary': ['summary', 'description']
             }
             for n in news:
+                if since is not None and isinstance(n.get('datetime'), (int, float)) and n['datetime'] <= since.replace(tzinfo=timezone.utc).timestamp():
+                    continue
                 news_item = {}
                 valid = True
                 for our_field, possible_fields in required_fields.items():
@@ -213,12 +366,18 @@ class FinnhubSource(MarketDataSource):
                         'link': n.get('url', ''),
                         'providerPublishTime': news_item['datetime'],
                         'type': 'news',
-                        'summary': news_item['summary']
+                        'summary': news_item['summary'],
+                        'source': 'finnhub'
                     }
                     if isinstance(formatted_item['providerPublishTime'], (int, float)):
+                        formatted_item['published_at'] = datetime.fromtimestamp(
+                            formatted_item['providerPublishTime'], tz=timezone.utc
+                        ).isoformat()
                         formatted_item['providerPublishTime'] = datetime.fromtimestamp(
                             formatted_item['providerPublishTime']
                         ).isoformat()
+                    else:
+                        formatted_item['published_at'] = formatted_item['providerPublishTime']
                     valid_news.append(formatted_item)
             
             logger.info(f"Found {len(valid_news)} valid news items for {symbol}")
@@ -229,6 +388,10 @@ class FinnhubSource(MarketDataSource):
             logger.info(f"Finnhub: Retrieved {len(limited_news)} articles for {symbol} (limit: {articles_limit})")
             return limited_news
             
+        except CircuitOpenError as e:
+            news_scheduler.release_request('finnhub')
+            logger.info(f"Skipping Finnhub news for {symbol} - {e}")
+            return []
         except requests.exceptions.RequestException as e:
             logger.error(f"Finnhub news request error for {symbol}: {e}")
             return []
@@ -238,6 +401,18 @@ class FinnhubSource(MarketDataSource):
 
 # Marketaux implementation
 class MarketauxSource(MarketDataSource):
+    name = 'marketaux'
+    supports_batch_news = True
+    quota_metered = True
+    batch_size = int(os.getenv('MARKETAUX_BATCH_SYMBOLS', 10))
+
+    @property
+    def symbols_per_request(self) -> int:
+        """Batch size capped by the articles one request returns, so symbols are not starved"""
+        source = news_scheduler.sources.get(self.name)
+        articles = source.limits.articles_per_request if source else self.batch_size
+        return max(1, min(self.batch_size, articles))
+
     def __init__(self, api_key):
         self.api_key = api_key
         # Test if we have access to news endpoint
@@ -249,7 +424,7 @@ class MarketauxSource(MarketDataSource):
             return False
         try:
             url = f'https://api.marketaux.com/v1/news/all?symbols=AAPL&filter_entities=true&language=en&api_token={self.api_key}'
-            r = requests.get(url, timeout=5)
+            r = self._get(url, timeout=5)
             if r.status_code == 200:
                 logger.info("Marketaux news endpoint is accessible")
                 return True
@@ -263,53 +438,81 @@ class MarketauxSource(MarketDataSource):
             logger.warning(f"Marketaux news endpoint test failed: {e}")
             return False
             
-    def get_news(self, symbol: str):
+    def get_news(self, symbol: str, since: Optional[datetime] = None):
+        return self.get_news_batch([symbol], {symbol.upper(): since} if since else None).get(symbol.upper(), [])
+
+    def get_news_batch(self, symbols, since: Optional[Dict[str, datetime]] = None):
+        """Get news for many symbols, packing up to symbols_per_request symbols into each request.
+
+        A request returns only a few articles (MARKETAUX_MAX_NEWS_PER_REQUEST),
+        so a request never carries more symbols than articles. Articles are
+        mapped back to the requested symbols through their entities, and each
+        request is charged to the quota once.
+        """
+        symbols = _normalize_symbols(symbols)
+        since = since or {}
+        result = {symbol: [] for symbol in symbols}
         if not self._has_news_access:
-            logger.debug(f"Skipping Marketaux news for {symbol} - no access to news endpoint")
-            return []
-        
-        # Check if we can make a request using the scheduler
-        if not news_scheduler.can_make_request('marketaux'):
-            logger.info(f"Skipping Marketaux news for {symbol} - request limit reached or outside trading hours")
-            return []
+            logger.debug(f"Skipping Marketaux news for {','.join(symbols)} - no access to news endpoint")
+            return result
         
-        # Get optimal number of articles to request
-        articles_limit = news_scheduler.get_optimal_articles_per_request('marketaux')
-        if articles_limit <= 0:
-            logger.info(f"Skipping Marketaux news for {symbol} - no remaining quota")
-            return []
-            
-        url = f'https://api.marketaux.com/v1/news/all?symbols={symbol}&filter_entities=true&language=en&limit={articles_limit}&api_token={self.api_key}'
-        try:
-            r = requests.get(url)
-            r.raise_for_status()
-            data = r.json()
-            news = data.get('data', [])
+        for chunk in _chunks(symbols, self.symbols_per_request):
+            label = ','.join(chunk)
+            # Check if we can make a request using the scheduler
+            if not news_scheduler.can_make_request('marketaux'):
+                logger.info(f"Skipping Marketaux news for {label} - request limit reached or outside trading hours")
+                break
             
-            # Record the request
-            news_scheduler.record_request('marketaux')
-            
-            result = []
-            for n in news:
-                result.append({
-                    'title': n.get('title'),
-                    'summary': n.get('description', ''),
-                    'link': n.get('url'),
-                    'publisher': n.get('source', {}).get('name', ''),
-                    'published_at': n.get('published_at'),
-                    'source': 'marketaux',
-                    'score': n.get('score'),
-                    'raw_json': json.dumps(n)
-                })
+            # Get optimal number of articles to request
+            articles_limit = news_scheduler.get_optimal_articles_per_request('marketaux')
+            if articles_limit <= 0:
+                logger.info(f"Skipping Marketaux news for {label} - no remaining quota")
+                break
             
-            logger.info(f"Marketaux: Retrieved {len(result)} articles for {symbol} (limit: {articles_limit})")
-            return result
-        except Exception as e:
-            logger.error(f"Marketaux error for {symbol}: {e}")
-            return []
+            url = f'https://api.marketaux.com/v1/news/all?symbols={label}&filter_entities=true&language=en&limit={articles_limit}&api_token={self.api_key}'
+            published_after = _chunk_since(chunk, since)
+            if published_after is not None:
+                url += f"&published_after={published_after.strftime('%Y-%m-%dT%H:%M:%S')}"
+            # Reserve the request in the shared quota ledger before sending it
+            if not news_scheduler.acquire_request('marketaux'):
+                logger.info(f"Skipping Marketaux news for {label} - request limit reached")
+                break
+            try:
+                r = self._get(url)
+                r.raise_for_status()
+                data = r.json()
+                news = data.get('data', [])
+                
+                for n in news:
+                    item = {
+                        'title': n.get('title'),
+                        'summary': n.get('description', ''),
+                        'link': n.get('url'),
+                        'publisher': n.get('source', {}).get('name', ''),
+                        'published_at': n.get('published_at'),
+                        'source': 'marketaux',
+                        'score': n.get('score'),
+                        'raw_json': json.dumps(n)
+                    }
+                    entity_symbols = {(e.get('symbol') or '').upper() for e in n.get('entities') or []}
+                    _assign_to_symbols(result, chunk, item, entity_symbols, since)
+                
+                logger.info(f"Marketaux: Retrieved {len(news)} articles for {label} (limit: {articles_limit})")
+            except CircuitOpenError as e:
+                news_scheduler.release_request('marketaux')
+                logger.info(f"Skipping Marketaux news for {label} - {e}")
+                break
+            except Exception as e:
+                logger.error(f"Marketaux error for {label}: {e}")
+        return result
 
 # Financial Modeling Prep implementation
 class FMPSource(MarketDataSource):
+    name = 'fmp'
+    supports_batch_news = True
+    quota_metered = True
+    batch_size = int(os.getenv('FMP_BATCH_SYMBOLS', 20))
+
     def __init__(self, api_key):
         self.api_key = api_key
         # Test if we have access to news endpoint
@@ -321,7 +524,7 @@ class FMPSource(MarketDataSource):
             return False
         try:
             url = f'https://financialmodelingprep.com/api/v3/stock_news?tickers=AAPL&limit=1&apikey={self.api_key}'
-            r = requests.get(url, timeout=5)
+            r = self._get(url, timeout=5)
             if r.status_code == 200:
                 logger.info("FMP news endpoint is accessible")
                 return True
@@ -335,94 +538,145 @@ class FMPSource(MarketDataSource):
             logger.warning(f"FMP news endpoint test failed: {e}")
             return False
             
-    def get_news(self, symbol: str):
+    def get_news(self, symbol: str, since: Optional[datetime] = None):
+        return self.get_news_batch([symbol], {symbol.upper(): since} if since else None).get(symbol.upper(), [])
+
+    def get_news_batch(self, symbols, since: Optional[Dict[str, datetime]] = None):
+        """Get news for many symbols, packing up to symbols_per_request tickers into each request.
+
+        Articles are mapped back through their symbol field, and each
+        request is charged to the quota once.
+        """
+        symbols = _normalize_symbols(symbols)
+        since = since or {}
+        result = {symbol: [] for symbol in symbols}
         if not self._has_news_access:
-            logger.debug(f"Skipping FMP news for {symbol} - no access to news endpoint")
-            return []
-        
-        # Check if we can make a request using the scheduler
-        if not news_scheduler.can_make_request('fmp'):
-            logger.info(f"Skipping FMP news for {symbol} - request limit reached")
-            return []
+            logger.debug(f"Skipping FMP news for {','.join(symbols)} - no access to news endpoint")
+            return result
         
-        # Get optimal number of articles to request
-        articles_limit = news_scheduler.get_optimal_articles_per_request('fmp')
-        if articles_limit <= 0:
-            logger.info(f"Skipping FMP news for {symbol} - no remaining quota")
-            return []
+        for chunk in _chunks(symbols, self.symbols_per_request):
+            label = ','.join(chunk)
+            # Check if we can make a request using the scheduler
+            if not news_scheduler.can_make_request('fmp'):
+                logger.info(f"Skipping FMP news for {label} - request limit reached")
+                break
             
-        url = f'https://financialmodelingprep.com/api/v3/stock_news?tickers={symbol}&limit={articles_limit}&apikey={self.api_key}'
-        try:
-            r = requests.get(url)
-            r.raise_for_status()
-            news = r.json()
-            
-            # Record the request
-            news_scheduler.record_request('fmp')
-            
-            result = []
-            for n in news:
-                result.append({
-                    'title': n.get('title'),
-                    'summary': n.get('text', ''),
-                    'link': n.get('url'),
-                    'publisher': n.get('site', ''),
-                    'published_at': n.get('publishedDate'),
-                    'source': 'fmp',
-                    'score': None,
-                    'raw_json': json.dumps(n)
-                })
+            # Get optimal number of articles to request
+            articles_limit = news_scheduler.get_optimal_articles_per_request('fmp')
+            if articles_limit <= 0:
+                logger.info(f"Skipping FMP news for {label} - no remaining quota")
+                break
             
-            logger.info(f"FMP: Retrieved {len(result)} articles for {symbol} (limit: {articles_limit})")
-            return result
-        except Exception as e:
-            logger.error(f"FMP error for {symbol}: {e}")
-            return []
+            url = f'https://financialmodelingprep.com/api/v3/stock_news?tickers={label}&limit={articles_limit}&apikey={self.api_key}'
+            from_date = _chunk_since(chunk, since)
+            if from_date is not None:
+                # FMP filters by day; _assign_to_symbols drops the rest
+                url += f"&from={from_date.strftime('%Y-%m-%d')}"
+            # Reserve the request in the shared quota ledger before sending it
+            if not news_scheduler.acquire_request('fmp'):
+                logger.info(f"Skipping FMP news for {label} - request limit reached")
+                break
+            try:
+                r = self._get(url)
+                r.raise_for_status()
+                news = r.json()
+                
+                for n in news:
+                    item = {
+                        'title': n.get('title'),
+                        'summary': n.get('text', ''),
+                        'link': n.get('url'),
+                        'publisher': n.get('site', ''),
+                        'published_at': n.get('publishedDate'),
+                        'source': 'fmp',
+                        'score': None,
+                        'raw_json': json.dumps(n)
+                    }
+                    _assign_to_symbols(result, chunk, item, {(n.get('symbol') or '').upper()}, since)
+                
+                logger.info(f"FMP: Retrieved {len(news)} articles for {label} (limit: {articles_limit})")
+            except CircuitOpenError as e:
+                news_scheduler.release_request('fmp')
+                logger.info(f"Skipping FMP news for {label} - {e}")
+                break
+            except Exception as e:
+                logger.error(f"FMP error for {label}: {e}")
+        return result
 
 # NewsAPI implementation
 class NewsAPISource(MarketDataSource):
+    name = 'newsapi'
+    supports_batch_news = True
+    quota_metered = True
+    batch_size = int(os.getenv('NEWSAPI_BATCH_SYMBOLS', 10))
+
     def __init__(self, api_key):
         self.api_key = api_key
-    def get_news(self, symbol: str):
-        # Check if we can make a request using the scheduler
-        if not news_scheduler.can_make_request('newsapi'):
-            logger.info(f"Skipping NewsAPI news for {symbol} - request limit reached")
-            return []
-        
-        # Get optimal number of articles to request
-        articles_limit = news_scheduler.get_optimal_articles_per_request('newsapi')
-        if articles_limit <= 0:
-            logger.info(f"Skipping NewsAPI news for {symbol} - no remaining quota")
-            return []
+    def get_news(self, symbol: str, since: Optional[datetime] = None):
+        return self.get_news_batch([symbol], {symbol.upper(): since} if since else None).get(symbol.upper(), [])
+
+    def get_news_batch(self, symbols, since: Optional[Dict[str, datetime]] = None):
+        """Get news for many symbols with one OR query per symbols_per_request symbols.
+
+        NewsAPI has no ticker field, so articles are mapped back by the
+        ticker appearing as a word in the title or description. Each
+        request is charged to the quota once.
+        """
+        symbols = _normalize_symbols(symbols)
+        since = since or {}
+        result = {symbol: [] for symbol in symbols}
         
-        url = f'https://newsapi.org/v2/everything?q={symbol}&sortBy=publishedAt&language=en&pageSize={articles_limit}&apiKey={self.api_key}'
-        try:
-            r = requests.get(url)
-            r.raise_for_status()
-            data = r.json()
-            news = data.get('articles', [])
+        for chunk in _chunks(symbols, self.symbols_per_request):
+            label = ','.join(chunk)
+            # Check if we can make a request using the scheduler
+            if not news_scheduler.can_make_request('newsapi'):
+                logger.info(f"Skipping NewsAPI news for {label} - request limit reached")
+                break
             
-            # Record the request
-            news_scheduler.record_request('newsapi')
+            # Get optimal number of articles to request
+            articles_limit = news_scheduler.get_optimal_articles_per_request('newsapi')
+            if articles_limit <= 0:
+                logger.info(f"Skipping NewsAPI news for {label} - no remaining quota")
+                break
             
-            result = []
-            for n in news:
-                result.append({
-                    'title': n.get('title'),
-                    'summary': n.get('description', ''),
-                    'link': n.get('url'),
-                    'publisher': n.get('source', {}).get('name', ''),
-                    'published_at': n.get('publishedAt'),
-                    'source': 'newsapi',
-                    'score': None,
-                    'raw_json': json.dumps(n)
-                })
-            
-            logger.info(f"NewsAPI: Retrieved {len(result)} articles for {symbol} (limit: {articles_limit})")
-            return result
-        except Exception as e:
-            logger.error(f"NewsAPI error for {symbol}: {e}")
-            return []
+            query = quote_plus(' OR '.join(f'"{symbol}"' for symbol in chunk))
+            url = f'https://newsapi.org/v2/everything?q={query}&sortBy=publishedAt&language=en&pageSize={articles_limit}&apiKey={self.api_key}'
+            from_time = _chunk_since(chunk, since)
+            if from_time is not None:
+                url += f"&from={from_time.strftime('%Y-%m-%dT%H:%M:%S')}"
+            # Reserve the request in the shared quota ledger before sending it
+            if not news_scheduler.acquire_request('newsapi'):
+                logger.info(f"Skipping NewsAPI news for {label} - request limit reached")
+                break
+            try:
+                r = self._get(url)
+                r.raise_for_status()
+                data = r.json()
+                news = data.get('articles', [])
+                
+                for n in news:
+                    item = {
+                        'title': n.get('title'),
+                        'summary': n.get('description', ''),
+                        'link': n.get('url'),
+                        'publisher': n.get('source', {}).get('name', ''),
+                        'published_at': n.get('publishedAt'),
+                        'source': 'newsapi',
+                        'score': None,
+                        'raw_json': json.dumps(n)
+                    }
+                    text = f"{n.get('title') or ''} {n.get('description') or ''}"
+                    mentioned = {symbol for symbol in chunk if re.search(rf'\b{re.escape(symbol)}\b', text)}
+                    _assign_to_symbols(result, chunk, item, mentioned, since)
+                
+                logger.info(f"NewsAPI: Retrieved {len(news)} articles for {label} (limit: {articles_limit})")
+            except CircuitOpenError as e:
+                news_scheduler.release_request('newsapi')
+                logger.info(f"Skipping NewsAPI news for {label} - {e}")
+                break
+            except Exception as e:
+                logger.error(f"NewsAPI error for {label}: {e}")
+        return result
 
 MARKETAUX_API_KEY = os.getenv('MARKETAUX_API_KEY', '')
 FMP_API_KEY = os.getenv('FMP_API_KEY', '')
@@ -436,8 +690,7 @@ MARKET_DATA_SOURCES = {
     'newsapi': NewsAPISource(api_key=NEWSAPI_API_KEY),
 }
 
-async def get_market_data(symbol: str):
-    source = get_current_source()
+async def _fetch_market_data(source: str, symbol: str):
     if source == 'yahoo':
         try:
             loop = asyncio.get_event_loop()
@@ -449,34 +702,166 @@ async def get_market_data(symbol: str):
         except Exception as e:
             logger.error(f"Yahoo Finance error for {symbol}: {e}")
             return None
+    elif source == 'finnhub':
+        loop = asyncio.get_event_loop()
+        finnhub_source = MARKET_DATA_SOURCES['finnhub']
+        return await loop.run_in_executor(None, lambda: finnhub_source.get_market_data(symbol))
     else:
         # Default to IBKR
         data = await ibkr_service.get_market_data(symbol)
         if data is not None and 'open' not in data:
             data['open'] = None
-        return data 
+        return data
 
-def get_all_news(symbol: str):
-    start_time = datetime.now(tz)
-    logger.info(f"=== Starting news fetch for {symbol} at {start_time.strftime('%Y-%m-%d %H:%M:%S %Z')} ===")
-    all_news = []
-    successful_sources = []
-    failed_sources = []
+quote_router = QuoteRouter(
+    {name: (lambda symbol, name=name: _fetch_market_data(name, symbol)) for name in ('yahoo', 'ibkr', 'finnhub')},
+    # A source whose circuit is open (and not yet due a trial) is ranked last and never probed
+    is_available=lambda name: circuit_breakers.get(name).retry_after() == 0
+)
+
+async def get_market_data(symbol: str):
+    """Get a quote, preferring the selected source and failing over to the healthiest other one.
+
+    Selecting 'auto' as the source routes purely by latency and error rate.
+    The returned dict's 'source' field names the source that answered.
+    """
+    return await quote_cache.get_or_fetch(get_current_source(), symbol, lambda: fetch_market_data(symbol))
+
+async def fetch_market_data(symbol: str):
+    """Get a fresh quote through the quote router, bypassing the quote cache"""
+    source = get_current_source()
+    preferred = source if source in quote_router.fetchers else None
+    return await single_flight.do('quote', (source, symbol.upper()), lambda: quote_router.get_quote(symbol, preferred))
+
+MARKET_DATA_BATCH_TIMEOUT = float(os.getenv('MARKET_DATA_BATCH_TIMEOUT', 10))
+
+async def get_market_data_many(symbols, timeout: float = None):
+    """Fetch quotes for many symbols concurrently under one shared deadline.
+
+    Returns a dict with the quotes that arrived in time and an error message
+    for every symbol that failed, returned nothing or missed the deadline.
+    """
+    timeout = MARKET_DATA_BATCH_TIMEOUT if timeout is None else timeout
+    unique_symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    quotes = {}
+    errors = {}
+    if not unique_symbols:
+        return {'quotes': quotes, 'errors': errors}
     
-    for name, source in MARKET_DATA_SOURCES.items():
+    if get_current_source() == 'yahoo':
+        # Serve fresh quotes from the cache and bulk-download only the rest
+        for symbol in unique_symbols:
+            cached = quote_cache.get('yahoo', symbol)
+            if cached:
+                quotes[symbol] = cached
+        missing = [s for s in unique_symbols if s not in quotes]
+        if missing:
+            loop = asyncio.get_event_loop()
+            yahoo_source = MARKET_DATA_SOURCES['yahoo']
+            try:
+                fetched = await asyncio.wait_for(
+                    loop.run_in_executor(None, lambda: yahoo_source.get_market_data_bulk(missing)),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                fetched = {}
+                errors.update({s: f"Timed out after {timeout}s" for s in missing})
+            except Exception as e:
+                logger.error(f"Yahoo Finance bulk quote error for {missing}: {e}")
+                fetched = {}
+                errors.update({s: str(e) for s in missing})
+            for symbol, data in fetched.items():
+                data['source'] = 'yahoo'
+                quote_cache.set('yahoo', symbol, data)
+                quotes[symbol] = data
+        for symbol in unique_symbols:
+            if symbol not in quotes and symbol not in errors:
+                errors[symbol] = 'No market data found'
+        logger.info(f"Batch market data (yahoo bulk): {len(quotes)}/{len(unique_symbols)} symbols returned")
+        return {'quotes': quotes, 'errors': errors}
+    
+    tasks = {asyncio.ensure_future(get_market_data(symbol)): symbol for symbol in unique_symbols}
+    done, pending = await asyncio.wait(tasks.keys(), timeout=timeout)
+    
+    for task in pending:
+        task.cancel()
+        errors[tasks[task]] = f"Timed out after {timeout}s"
+    for task in done:
+        symbol = tasks[task]
         try:
-            logger.info(f"Fetching news from {name} for {symbol}...")
-            news = source.get_news(symbol)
-            if news:
-                all_news.extend(news)
-                successful_sources.append(f"{name} ({len(news)} articles)")
-                logger.info(f"✓ {name}: Successfully retrieved {len(news)} articles for {symbol}")
-            else:
-                logger.info(f"○ {name}: No articles found for {symbol}")
+            data = task.result()
         except Exception as e:
-            failed_sources.append(f"{name} (error: {str(e)})")
-            logger.error(f"✗ {name}: Error fetching news for {symbol}: {e}")
+            errors[symbol] = str(e)
+            continue
+        if data:
+            quotes[symbol] = data
+        else:
+            errors[symbol] = 'No market data found'
     
+    logger.info(f"Batch market data: {len(quotes)}/{len(unique_symbols)} symbols returned, {len(errors)} errors")
+    return {'quotes': quotes, 'errors': errors}
+
+NEWS_SOURCE_TIMEOUT = float(os.getenv('NEWS_SOURCE_TIMEOUT', 15))
+NEWS_FETCH_DEADLINE = float(os.getenv('NEWS_FETCH_DEADLINE', 20))
+
+# Worker pool for the per-source news fan-out. Sized for several symbols'
+# fan-outs at once, plus sources still running after their timeout.
+_news_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('NEWS_FANOUT_WORKERS', 16)),
+    thread_name_prefix='news-fanout'
+)
+
+def _source_timeout(name: str) -> float:
+    """Per-source timeout, overridable with NEWS_SOURCE_TIMEOUT_<NAME>"""
+    return float(os.getenv(f'NEWS_SOURCE_TIMEOUT_{name.upper()}', NEWS_SOURCE_TIMEOUT))
+
+def _fan_out(calls: Dict, label: str, deadline_seconds: float):
+    """Run {key: (source name, fn)} concurrently on the news pool.
+
+    Each call gets its source's timeout from the moment it starts running,
+    and all calls share one overall deadline. Returns the results of the
+    calls that finished in time plus a description of each failure;
+    timed-out calls are abandoned and finish in the background.
+    """
+    started = time.monotonic()
+    deadline = started + deadline_seconds
+    started_at = {}
+
+    def run(key, fn):
+        started_at[key] = time.monotonic()
+        return fn()
+
+    pending = {_news_executor.submit(run, key, fn): (key, name) for key, (name, fn) in calls.items()}
+    results = {}
+    failures = []
+
+    def expires(key, name):
+        if key not in started_at:
+            return deadline
+        return min(started_at[key] + _source_timeout(name), deadline)
+
+    while pending:
+        next_expiry = min(expires(key, name) for key, name in pending.values())
+        done, _ = wait(pending, timeout=max(0.0, next_expiry - time.monotonic()), return_when=FIRST_COMPLETED)
+        for future in done:
+            key, name = pending.pop(future)
+            try:
+                results[key] = future.result()
+            except CircuitOpenError as e:
+                logger.info(f"○ {name}: Skipped for {label} - {e}")
+            except Exception as e:
+                failures.append(f"{name} (error: {str(e)})")
+                logger.error(f"✗ {name}: Error fetching news for {label}: {e}")
+        now = time.monotonic()
+        for future, (key, name) in list(pending.items()):
+            if now >= expires(key, name):
+                del pending[future]
+                future.cancel()
+                failures.append(f"{name} (timed out after {now - started:.1f}s)")
+                logger.error(f"✗ {name}: Timed out fetching news for {label}")
+    return results, failures
+
+def _merge_news(all_news: List[Dict]) -> List[Dict]:
     # Deduplicate by link
     seen = set()
     deduped = []
@@ -486,7 +871,44 @@ def get_all_news(symbol: str):
             seen.add(n['link'])
     
     # Sort by published_at desc
-    deduped.sort(key=lambda x: x.get('published_at', ''), reverse=True)
+    deduped.sort(key=lambda x: x.get('published_at') or '', reverse=True)
+    return deduped
+
+def get_all_news(symbol: str, since: Optional[Dict[str, datetime]] = None):
+    """Get merged news for a symbol, sharing one fetch between concurrent callers.
+
+    since maps source names to a high-water mark; those sources only return
+    articles published after it.
+    """
+    key = (symbol.upper(), tuple(sorted((since or {}).items())))
+    return single_flight.do_sync('news', key, lambda: _get_all_news(symbol, since))
+
+def _get_all_news(symbol: str, since: Optional[Dict[str, datetime]] = None):
+    """Query every source concurrently and merge the results.
+
+    Each source has its own timeout and the whole fetch has a deadline, so
+    the call takes as long as the slowest source that answers in time.
+    """
+    start_time = datetime.now(tz)
+    logger.info(f"=== Starting news fetch for {symbol} at {start_time.strftime('%Y-%m-%d %H:%M:%S %Z')} ===")
+    all_news = []
+    successful_sources = []
+    
+    calls = {}
+    for name, source in MARKET_DATA_SOURCES.items():
+        logger.info(f"Fetching news from {name} for {symbol}...")
+        calls[name] = (name, lambda source=source, name=name: source.get_news(symbol, (since or {}).get(name)))
+    results, failed_sources = _fan_out(calls, symbol, NEWS_FETCH_DEADLINE)
+    
+    for name, news in results.items():
+        if news:
+            all_news.extend(news)
+            successful_sources.append(f"{name} ({len(news)} articles)")
+            logger.info(f"✓ {name}: Successfully retrieved {len(news)} articles for {symbol}")
+        else:
+            logger.info(f"○ {name}: No articles found for {symbol}")
+    
+    deduped = _merge_news(all_news)
     
     # Calculate duration
     end_time = datetime.now(tz)
@@ -502,4 +924,58 @@ def get_all_news(symbol: str):
         logger.warning(f"Failed sources: {', '.join(failed_sources)}")
     logger.info(f"=== End news fetch for {symbol} ===")
     
-    return deduped 
\ No newline at end of file
+    return deduped
+
+NEWS_BATCH_DEADLINE = float(os.getenv('NEWS_BATCH_DEADLINE', 60))
+
+def get_all_news_batch(symbols, since: Optional[Dict[str, Dict[str, datetime]]] = None,
+                       plan: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[Dict]]:
+    """Get merged news for many symbols, keyed by upper-case symbol.
+
+    Sources with a multi-symbol API (Marketaux, FMP, NewsAPI) are queried
+    once per batch of symbols, which charges their quota once per batch
+    instead of once per symbol. Other sources are queried per symbol. All
+    calls run concurrently under NEWS_BATCH_DEADLINE.
+
+    since maps source names to {symbol: high-water mark}, as returned by
+    news_store.load_fetch_marks. plan optionally limits a source to a subset
+    of the symbols, as returned by news_allocator.NewsPollAllocator.plan;
+    sources not in plan are queried for every symbol.
+    """
+    symbols = _normalize_symbols(symbols)
+    if not symbols:
+        return {}
+    start_time = datetime.now(tz)
+    logger.info(f"=== Starting batched news fetch for {len(symbols)} symbols at {start_time.strftime('%Y-%m-%d %H:%M:%S %Z')} ===")
+    
+    since = since or {}
+    plan = plan or {}
+    calls = {}
+    for name, source in MARKET_DATA_SOURCES.items():
+        marks = since.get(name, {})
+        source_symbols = [s for s in _normalize_symbols(plan[name]) if s in symbols] if name in plan else symbols
+        if not source_symbols:
+            continue
+        if source.supports_batch_news:
+            calls[(name, None)] = (name, lambda source=source, marks=marks, source_symbols=source_symbols: source.get_news_batch(source_symbols, marks))
+        else:
+            for symbol in source_symbols:
+                calls[(name, symbol)] = (name, lambda source=source, symbol=symbol, mark=marks.get(symbol): {symbol: source.get_news(symbol, mark)})
+    results, failed_sources = _fan_out(calls, f"{len(symbols)} symbols", NEWS_BATCH_DEADLINE)
+    
+    per_symbol = {symbol: [] for symbol in symbols}
+    per_source = {}
+    for (name, _), by_symbol in results.items():
+        for symbol, news in (by_symbol or {}).items():
+            if symbol in per_symbol and news:
+                per_symbol[symbol].extend(news)
+                per_source[name] = per_source.get(name, 0) + len(news)
+    merged = {symbol: _merge_news(news) for symbol, news in per_symbol.items()}
+    
+    duration = (datetime.now(tz) - start_time).total_seconds()
+    logger.info(f"=== Batched news fetch completed (Duration: {duration:.2f}s): {sum(len(n) for n in merged.values())} articles for {len(symbols)} symbols ===")
+    if per_source:
+        logger.info(f"Successful sources: {', '.join(f'{name} ({count} articles)' for name, count in per_source.items())}")
+    if failed_sources:
+        logger.warning(f"Failed sources: {', '.join(failed_sources)}")
+    return merged
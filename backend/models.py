@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 Base = declarative_base()
@@ -91,8 +92,48 @@ class News(Base):
     textblob_score = Column(Float)
     openai_score = Column(Float)
     raw_json = Column(Text)
+    content_hash = Column(String, unique=True, index=True)  # md5 of symbol|source|normalized title
+    cluster_id = Column(String, index=True)  # content_hash of the near-duplicate cluster's representative
+    # Weighted title (A) + summary (B), filled at insert for full-text search; not loaded with rows
+    search_vector = deferred(Column(TSVECTOR))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Keyset pagination of a symbol's news by (published_at, id), and full-text search
+    __table_args__ = (
+        Index('idx_news_symbol_published_id', 'symbol', 'published_at', 'id'),
+        Index('idx_news_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
+class NewsFetchState(Base):
+    """Latest published_at stored per news source and symbol, for incremental fetches"""
+    __tablename__ = "news_fetch_state"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, nullable=False)
+    symbol = Column(String, nullable=False)
+    last_published_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    # Last time the source was asked for the symbol's news, even if it returned nothing
+    last_polled_at = Column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint('source', 'symbol', name='uq_news_fetch_state_source_symbol'),
+    )
+
+class NewsQuotaUsage(Base):
+    """Requests made per news source in one daily quota window"""
+    __tablename__ = "news_quota_usage"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, nullable=False)
+    window_start = Column(Date, nullable=False)  # Quota day in the source's timezone
+    request_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('source', 'window_start', name='uq_news_quota_usage_source_window'),
+    )
+
 class TargetSymbol(Base):
     __tablename__ = "target_symbols"
     
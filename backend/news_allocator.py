@@ -0,0 +1,206 @@
+import os
+import math
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import News, NewsFetchState, StockDaily
+from news_scheduler import news_scheduler
+
+logger = logging.getLogger(__name__)
+
+class NewsPollAllocator:
+    """Spreads each news source's remaining daily quota across symbols by priority.
+
+    A symbol's priority is a weighted mix of its portfolio weight, recent
+    article arrival rate, recent daily-close volatility and time since it
+    was last fetched, each scaled to 0..1 across the target symbols. Every
+    run, each source's budget for the run (remaining requests over the runs
+    left in its quota day, times symbols per request) is handed out to
+    symbols as credit in proportion to priority; a symbol is polled from a
+    source once it has a full credit. Active symbols are polled most runs
+    and quiet ones every few runs, without spending more than the quota.
+    Sources with enough budget for every symbol poll them all.
+    """
+
+    def __init__(self):
+        self.weights = {
+            'portfolio': float(os.getenv('NEWS_PRIORITY_WEIGHT_PORTFOLIO', 0.35)),
+            'activity': float(os.getenv('NEWS_PRIORITY_WEIGHT_ACTIVITY', 0.25)),
+            'volatility': float(os.getenv('NEWS_PRIORITY_WEIGHT_VOLATILITY', 0.2)),
+            'staleness': float(os.getenv('NEWS_PRIORITY_WEIGHT_STALENESS', 0.2))
+        }
+        # Every symbol keeps a small share so quiet names are still polled now and then
+        self.floor = float(os.getenv('NEWS_PRIORITY_FLOOR', 0.05))
+        self.activity_hours = float(os.getenv('NEWS_PRIORITY_ACTIVITY_HOURS', 24))
+        self.volatility_days = int(os.getenv('NEWS_PRIORITY_VOLATILITY_DAYS', 20))
+        # Time since last fetch at which the staleness factor saturates
+        self.stale_minutes = float(os.getenv('NEWS_PRIORITY_STALE_MINUTES', 240))
+        # Credit cap, so a symbol cannot bank more than a couple of polls
+        self.max_credit = 2.0
+        self._credits: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self.last_scores: Dict[str, Dict[str, float]] = {}
+        self.last_plan: Dict[str, List[str]] = {}
+        self.last_run: Optional[datetime] = None
+
+    def portfolio_weights(self, symbols: List[str]) -> Dict[str, float]:
+        """Share of gross portfolio market value per symbol, from the IBKR account mirror"""
+        try:
+            from ibkr_service import ibkr_service
+            items = list(ibkr_service.account_mirror.portfolio.values())
+        except Exception as e:
+            logger.debug(f"Portfolio weights unavailable: {e}")
+            return {}
+        values: Dict[str, float] = {}
+        for item in items:
+            symbol = (item.contract.symbol or '').upper()
+            if symbol in symbols:
+                values[symbol] = values.get(symbol, 0.0) + abs(item.marketValue or 0.0)
+        total = sum(abs(item.marketValue or 0.0) for item in items)
+        return {symbol: value / total for symbol, value in values.items()} if total else {}
+
+    def arrival_rates(self, db: Session, symbols: List[str]) -> Dict[str, float]:
+        """Articles per hour published for each symbol over the activity window"""
+        cutoff = datetime.utcnow() - timedelta(hours=self.activity_hours)
+        rows = (
+            db.query(News.symbol, func.count(News.id))
+            .filter(News.symbol.in_(symbols), News.published_at >= cutoff)
+            .group_by(News.symbol)
+        )
+        return {symbol: count / self.activity_hours for symbol, count in rows}
+
+    def volatilities(self, db: Session, symbols: List[str]) -> Dict[str, float]:
+        """Standard deviation of daily log returns over the volatility window"""
+        # Calendar lookback wide enough to cover the trading days asked for
+        cutoff = datetime.utcnow() - timedelta(days=self.volatility_days * 7 // 5 + 7)
+        rows = (
+            db.query(StockDaily.symbol, StockDaily.close_price)
+            .filter(StockDaily.symbol.in_(symbols), StockDaily.date >= cutoff, StockDaily.close_price > 0)
+            .order_by(StockDaily.symbol, StockDaily.date)
+        )
+        closes: Dict[str, List[float]] = {}
+        for symbol, close in rows:
+            closes.setdefault(symbol, []).append(close)
+        result = {}
+        for symbol, series in closes.items():
+            series = series[-(self.volatility_days + 1):]
+            if len(series) >= 3:
+                result[symbol] = float(np.std(np.diff(np.log(series))))
+        return result
+
+    def minutes_since_fetch(self, db: Session, symbols: List[str]) -> Dict[str, float]:
+        """Minutes since a rationed source last polled each symbol, whether or not it found news.
+
+        Sources with over 1000 requests a day poll every symbol every run, so
+        they are left out or every symbol would always look fresh.
+        """
+        rationed = [name for name, source in news_scheduler.sources.items() if source.limits.daily_requests <= 1000]
+        query = db.query(NewsFetchState.symbol, func.max(NewsFetchState.last_polled_at)).filter(
+            NewsFetchState.symbol.in_(symbols)
+        )
+        if rationed:
+            query = query.filter(NewsFetchState.source.in_(rationed))
+        rows = query.group_by(NewsFetchState.symbol)
+        now = datetime.utcnow()
+        return {symbol: (now - updated).total_seconds() / 60 for symbol, updated in rows if updated}
+
+    def score(self, db: Session, symbols: List[str]) -> Dict[str, Dict[str, float]]:
+        """Priority factors and combined score per symbol"""
+        def scaled(values: Dict[str, float]) -> Dict[str, float]:
+            top = max(values.values(), default=0.0)
+            return {symbol: (values.get(symbol, 0.0) / top if top > 0 else 0.0) for symbol in symbols}
+
+        staleness_minutes = self.minutes_since_fetch(db, symbols)
+        factors = {
+            'portfolio': scaled(self.portfolio_weights(symbols)),
+            'activity': scaled(self.arrival_rates(db, symbols)),
+            'volatility': scaled(self.volatilities(db, symbols)),
+            # Never-fetched symbols count as fully stale
+            'staleness': {
+                symbol: min(1.0, staleness_minutes.get(symbol, self.stale_minutes) / self.stale_minutes)
+                for symbol in symbols
+            }
+        }
+        scores = {}
+        for symbol in symbols:
+            entry = {name: round(values[symbol], 4) for name, values in factors.items()}
+            entry['score'] = round(self.floor + sum(self.weights[name] * values[symbol] for name, values in factors.items()), 4)
+            scores[symbol] = entry
+        return scores
+
+    def _runs_left(self, source_name: str, interval_minutes: float) -> float:
+        """Scheduler runs left in the source's current quota window"""
+        source = news_scheduler.sources[source_name]
+        if source.limits.trading_hours_only:
+            minutes = news_scheduler.get_trading_hours_remaining() * 60
+        else:
+            now = datetime.now(news_scheduler.ledger.timezone_for(source_name))
+            midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            minutes = (midnight - now).total_seconds() / 60
+        return max(1.0, minutes / interval_minutes) if minutes > 0 else 0.0
+
+    def run_budget(self, source_name: str, interval_minutes: float, symbols_per_request: int = 1) -> float:
+        """Symbol polls the source can afford this run without running dry before its window resets"""
+        source = news_scheduler.sources[source_name]
+        remaining = source.limits.daily_requests - news_scheduler.ledger.used(source_name)
+        runs_left = self._runs_left(source_name, interval_minutes)
+        if remaining <= 0 or runs_left <= 0:
+            return 0.0
+        return remaining / runs_left * max(1, symbols_per_request)
+
+    def plan(self, db: Session, symbols: List[str], interval_minutes: float,
+             symbols_per_request: Optional[Dict[str, int]] = None) -> Dict[str, List[str]]:
+        """Symbols to poll from each quota-limited source this run, highest priority first.
+
+        Sources not in the result have no daily limit to spread and should
+        poll every symbol.
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        symbols_per_request = symbols_per_request or {}
+        scores = self.score(db, symbols)
+        ranked = sorted(symbols, key=lambda s: scores[s]['score'], reverse=True)
+        total = sum(entry['score'] for entry in scores.values())
+        plan: Dict[str, List[str]] = {}
+        with self._lock:
+            for source_name in news_scheduler.sources:
+                budget = self.run_budget(source_name, interval_minutes, symbols_per_request.get(source_name, 1))
+                if budget >= len(symbols):
+                    plan[source_name] = ranked
+                    self._credits.pop(source_name, None)
+                    continue
+                credits = self._credits.setdefault(source_name, {})
+                for symbol in list(credits):
+                    if symbol not in scores:
+                        del credits[symbol]
+                for symbol in symbols:
+                    share = budget * scores[symbol]['score'] / total if total else 0.0
+                    credits[symbol] = min(self.max_credit, credits.get(symbol, 0.0) + share)
+                selected = [symbol for symbol in ranked if credits[symbol] >= 1.0][:math.ceil(budget)]
+                for symbol in selected:
+                    credits[symbol] -= 1.0
+                plan[source_name] = selected
+            self.last_scores = scores
+            self.last_plan = plan
+            self.last_run = datetime.now()
+        logger.info(f"News poll plan: {', '.join(f'{name} {len(chosen)}/{len(symbols)}' for name, chosen in plan.items()) or 'no quota-limited sources'}")
+        return plan
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            return {
+                'weights': dict(self.weights),
+                'floor': self.floor,
+                'last_run': self.last_run.strftime("%Y-%m-%d %H:%M:%S") if self.last_run else None,
+                'scores': dict(self.last_scores),
+                'plan': {name: list(chosen) for name, chosen in self.last_plan.items()},
+                'credits': {name: {s: round(c, 3) for s, c in credits.items()} for name, credits in self._credits.items()}
+            }
+
+# Global allocator used by the scheduled news fetch
+news_poll_allocator = NewsPollAllocator()
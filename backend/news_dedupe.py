@@ -0,0 +1,199 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Wire services and outlets whose names providers append to or embed in headlines
+WIRE_NAMES = {
+    'reuters', 'bloomberg', 'cnbc', 'yahoo finance', 'marketwatch', 'barron s', 'barrons',
+    'wsj', 'the wall street journal', 'wall street journal', 'associated press', 'ap',
+    'benzinga', 'seeking alpha', 'investing com', 'the motley fool', 'motley fool', 'zacks',
+    'forbes', 'business insider', 'financial times', 'ft', 'investor s business daily',
+    'thestreet', 'fox business', 'cnn', 'cnn business', 'axios', 'source', 'sources'
+}
+
+# Editorial tags in front of syndicated headlines, e.g. "Exclusive-", "UPDATE 2-", "BREAKING:"
+_PREFIX_TAGS = re.compile(
+    r'^\s*(?:(?:exclusive|breaking|update\s*\d*|corrected|refile|analysis|factbox|explainer|insight)\s*[-:–—]\s*)+',
+    re.IGNORECASE
+)
+# " - Publisher", " | Publisher" or " -sources" at the end of a headline
+_SEPARATED_SUFFIX = re.compile(r'\s*(?:\s[-|–—]\s|\s-)\s*([^-|–—]{1,40})$')
+# ", Reuters reports" / ", Bloomberg says" at the end of a headline
+_ATTRIBUTION_SUFFIX = re.compile(r',\s*([\w .\']{1,30}?)\s+(?:reports|reported|says|said)$', re.IGNORECASE)
+# Ticker tag such as "(AMZN)" or "(NASDAQ:AMZN)"
+_TICKER_SUFFIX = re.compile(r'\s*\((?:[A-Z]+:)?[A-Z.]{1,6}\)$')
+
+def _normalize(text: str) -> str:
+    return re.sub(r'[\W_]+', ' ', (text or '').lower()).strip()
+
+def clean_title(title: Optional[str], publisher: Optional[str] = None) -> str:
+    """Headline with provider decorations removed, normalized to lower-case words.
+
+    Trailing publisher names are only removed when they are the article's
+    own publisher or a known wire, so a real " - what to expect" tail is kept.
+    """
+    title = _PREFIX_TAGS.sub('', title or '').strip()
+    names = set(WIRE_NAMES)
+    if publisher:
+        names.add(_normalize(publisher))
+    for _ in range(3):
+        before = title
+        title = _TICKER_SUFFIX.sub('', title).strip()
+        for pattern in (_SEPARATED_SUFFIX, _ATTRIBUTION_SUFFIX):
+            match = pattern.search(title)
+            if match and _normalize(match.group(1)) in names:
+                title = title[:match.start()].strip()
+        if title == before:
+            break
+    return _normalize(title)
+
+def title_shingles(title: Optional[str], publisher: Optional[str] = None) -> FrozenSet[int]:
+    """Hashed word unigrams and bigrams of the cleaned headline"""
+    words = clean_title(title, publisher).split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return frozenset(
+        int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'big')
+        for f in features
+    )
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+@dataclass
+class ClusterEntry:
+    key: str
+    symbol: str
+    shingles: FrozenSet[int]
+    cluster_id: str
+    sentiment: Dict[str, Any]
+
+class NearDuplicateIndex:
+    """Bounded index of recent headlines for near-duplicate lookup.
+
+    Headlines are compared as sets of word unigrams and bigrams after
+    stripping provider decorations (wire prefixes, " - Publisher" suffixes,
+    ticker tags), so the same story syndicated through Yahoo, Finnhub and
+    NewsAPI lines up even when summaries differ or are missing. MinHash
+    signatures split into LSH bands pick candidates sharing a band with the
+    same symbol; a candidate matches if the exact Jaccard similarity of the
+    headlines reaches the threshold. The oldest entries are evicted once the
+    window is full.
+    """
+
+    def __init__(self, max_entries: int = None, threshold: float = None, bands: int = None, rows: int = None):
+        self.max_entries = max_entries or int(os.getenv('NEWS_DEDUPE_WINDOW', 5000))
+        self.threshold = threshold if threshold is not None else float(os.getenv('NEWS_DEDUPE_JACCARD', 0.75))
+        # 16 bands of 4 rows make pairs above ~0.5 Jaccard very likely to share a band
+        self.bands = bands or int(os.getenv('NEWS_DEDUPE_BANDS', 16))
+        self.rows = rows or int(os.getenv('NEWS_DEDUPE_BAND_ROWS', 4))
+        rng = np.random.RandomState(20250714)
+        permutations = self.bands * self.rows
+        self._mult = rng.randint(1, 2 ** 62, size=permutations, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        self._add = rng.randint(0, 2 ** 62, size=permutations, dtype=np.int64).astype(np.uint64)
+        self._entries: "OrderedDict[str, ClusterEntry]" = OrderedDict()
+        self._entry_bands: Dict[str, List[Tuple[str, int, bytes]]] = {}
+        self._buckets: Dict[Tuple[str, int, bytes], Set[str]] = {}
+        self._lock = threading.Lock()
+        self.warmed = False
+        self.lookups = 0
+        self.matches = 0
+
+    def _band_keys(self, symbol: str, shingles: FrozenSet[int]) -> List[Tuple[str, int, bytes]]:
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        # Multiply-shift hashing; uint64 arithmetic wraps, which is what we want
+        with np.errstate(over='ignore'):
+            hashed = (values[:, None] * self._mult[None, :] + self._add[None, :]) >> np.uint64(16)
+        signature = hashed.min(axis=0)
+        return [
+            (symbol, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _find_locked(self, shingles: FrozenSet[int], band_keys: List[Tuple[str, int, bytes]]) -> Optional[ClusterEntry]:
+        candidates: Set[str] = set()
+        for band_key in band_keys:
+            candidates |= self._buckets.get(band_key, set())
+        best, best_similarity = None, self.threshold
+        for key in candidates:
+            entry = self._entries[key]
+            similarity = jaccard(shingles, entry.shingles)
+            if similarity >= best_similarity:
+                best, best_similarity = entry, similarity
+        return best
+
+    def _add_locked(self, entry: ClusterEntry, band_keys: List[Tuple[str, int, bytes]]):
+        self._entries[entry.key] = entry
+        self._entry_bands[entry.key] = band_keys
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, set()).add(entry.key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            for band_key in self._entry_bands.pop(evicted_key):
+                bucket = self._buckets.get(band_key)
+                if bucket is not None:
+                    bucket.discard(evicted_key)
+                    if not bucket:
+                        del self._buckets[band_key]
+
+    def find(self, symbol: str, shingles: FrozenSet[int]) -> Optional[ClusterEntry]:
+        """Return the most similar indexed headline for the symbol at or above the threshold"""
+        if not shingles:
+            return None
+        band_keys = self._band_keys(symbol.upper(), shingles)
+        with self._lock:
+            self.lookups += 1
+            best = self._find_locked(shingles, band_keys)
+            if best is not None:
+                self.matches += 1
+            return best
+
+    def add(self, key: str, symbol: str, shingles: FrozenSet[int], cluster_id: str, sentiment: Dict[str, Any]):
+        if not shingles:
+            return
+        symbol = symbol.upper()
+        band_keys = self._band_keys(symbol, shingles)
+        with self._lock:
+            if key not in self._entries:
+                self._add_locked(ClusterEntry(key, symbol, shingles, cluster_id, sentiment), band_keys)
+
+    def find_or_add(self, key: str, symbol: str, shingles: FrozenSet[int], cluster_id: str,
+                    sentiment: Dict[str, Any]) -> Optional[ClusterEntry]:
+        """Add a headline unless it or a near-duplicate is already indexed, under one lock.
+
+        Returns the entry that was already there, or None if this one was added.
+        """
+        if not shingles:
+            return None
+        symbol = symbol.upper()
+        band_keys = self._band_keys(symbol, shingles)
+        with self._lock:
+            existing = self._entries.get(key) or self._find_locked(shingles, band_keys)
+            if existing is None:
+                self._add_locked(ClusterEntry(key, symbol, shingles, cluster_id, sentiment), band_keys)
+            return existing
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+            'bands': self.bands,
+            'rows': self.rows,
+            'lookups': self.lookups,
+            'matches': self.matches,
+            'warmed': self.warmed
+        }
+
+# Global near-duplicate index shared by all news ingestion paths
+news_dedupe_index = NearDuplicateIndex()
@@ -0,0 +1,391 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from database import SessionLocal
+from models import TargetSymbol
+from market_data import MARKET_DATA_SOURCES, get_all_news_batch
+from news_store import (
+    load_fetch_marks, prepare_news_rows, insert_news_rows, index_news_rows,
+    update_fetch_marks, latest_published_by_source, record_polls
+)
+from news_allocator import news_poll_allocator
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class NewsJob:
+    """One symbol's trip through the pipeline"""
+    symbol: str
+    enqueued_at: float
+    since: Dict[str, datetime] = field(default_factory=dict)
+    # Quota-limited sources the allocator left this symbol out of this cycle
+    excluded_sources: Set[str] = field(default_factory=set)
+    items: List[Dict] = field(default_factory=list)
+    rows: List[Dict] = field(default_factory=list)
+    marks: Dict[str, datetime] = field(default_factory=dict)
+
+class StageMetrics:
+    """Counters, throughput and enqueue-to-done lag for one pipeline stage"""
+
+    def __init__(self, window_seconds: float = 300, lag_window: int = 500):
+        self.window_seconds = window_seconds
+        self.processed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.items = 0
+        self.lags = deque(maxlen=lag_window)
+        self._completions = deque()
+
+    def record(self, lag: float, items: int = 0):
+        now = time.monotonic()
+        self.processed += 1
+        self.items += items
+        self.lags.append(lag)
+        self._completions.append((now, items))
+        while self._completions and now - self._completions[0][0] > self.window_seconds:
+            self._completions.popleft()
+
+    def get_stats(self, queue: Optional[asyncio.Queue] = None) -> Dict[str, Any]:
+        now = time.monotonic()
+        recent = [(t, n) for t, n in self._completions if now - t <= self.window_seconds]
+        minutes = self.window_seconds / 60
+        ordered = sorted(self.lags)
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3) if ordered else None
+        return {
+            'queue_depth': queue.qsize() if queue is not None else None,
+            'queue_capacity': queue.maxsize if queue is not None else None,
+            'in_flight': self.in_flight,
+            'processed': self.processed,
+            'failed': self.failed,
+            'items': self.items,
+            'jobs_per_minute': round(len(recent) / minutes, 2),
+            'items_per_minute': round(sum(n for _, n in recent) / minutes, 2),
+            'lag_p50_seconds': pct(50),
+            'lag_p95_seconds': pct(95)
+        }
+
+class NewsIngestionPipeline:
+    """Scheduled news ingestion as a chain of bounded asyncio queues.
+
+    Every fetch interval the scheduler stage ranks the target symbols with
+    the poll allocator and puts one job per symbol on the fetch queue. Fetch
+    workers take up to NEWS_PIPELINE_FETCH_GROUP queued jobs at a time so
+    providers still get batched multi-symbol requests; process workers
+    dedupe and score each symbol's articles; a single writer inserts the
+    rows of several symbols per transaction. All blocking work runs in
+    threads. Queues are bounded, so a slow stage holds up the one before it
+    instead of growing memory, and a symbol still in flight from an earlier
+    cycle is not queued again.
+    """
+
+    def __init__(self):
+        self.interval_minutes = float(os.getenv('NEWS_FETCH_INTERVAL_HOURS', 2)) * 60
+        self.queue_size = int(os.getenv('NEWS_PIPELINE_QUEUE_SIZE', 100))
+        self.fetch_workers = int(os.getenv('NEWS_PIPELINE_FETCH_WORKERS', 2))
+        self.process_workers = int(os.getenv('NEWS_PIPELINE_PROCESS_WORKERS', 2))
+        self.fetch_group_size = int(os.getenv('NEWS_PIPELINE_FETCH_GROUP', 10))
+        self.write_batch_rows = int(os.getenv('NEWS_PIPELINE_WRITE_BATCH', 200))
+        self.write_flush_seconds = float(os.getenv('NEWS_PIPELINE_WRITE_FLUSH_SECONDS', 2))
+        self.metrics = {stage: StageMetrics() for stage in ('schedule', 'fetch', 'process', 'write')}
+        self.running = False
+        self.cycles = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.inserted = 0
+        self.last_cycle: Optional[datetime] = None
+        self.next_cycle: Optional[datetime] = None
+        self._pending: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._fetch_queue: Optional[asyncio.Queue] = None
+        self._process_queue: Optional[asyncio.Queue] = None
+        self._write_queue: Optional[asyncio.Queue] = None
+
+    def start(self):
+        """Start the scheduler, workers and writer on the running event loop"""
+        if self.running:
+            return
+        self._fetch_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._process_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._write_queue = asyncio.Queue(maxsize=self.queue_size)
+        self._pending.clear()
+        self._tasks = [asyncio.ensure_future(self._schedule_loop())]
+        self._tasks += [asyncio.ensure_future(self._fetch_worker()) for _ in range(self.fetch_workers)]
+        self._tasks += [asyncio.ensure_future(self._process_worker()) for _ in range(self.process_workers)]
+        self._tasks.append(asyncio.ensure_future(self._writer()))
+        self.running = True
+        logger.info(f"News pipeline started: every {self.interval_minutes:g} minutes, {self.fetch_workers} fetch and {self.process_workers} process workers")
+
+    def stop(self):
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        dropped = sum(q.qsize() for q in (self._fetch_queue, self._process_queue, self._write_queue))
+        self._tasks = []
+        self._pending.clear()
+        self.running = False
+        self.next_cycle = None
+        logger.info(f"News pipeline stopped ({dropped} queued jobs dropped)")
+
+    async def submit(self, symbols: List[str]) -> Dict[str, str]:
+        """Queue symbols for an out-of-cycle fetch without waiting for queue space.
+
+        Jobs carry the stored fetch marks, so providers are only asked for
+        articles newer than what is stored. Returns a status per symbol:
+        'queued', 'pending' when it is already in flight, or 'rejected' when
+        the fetch queue is full.
+        """
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+        if not self.running:
+            return {symbol: 'rejected' for symbol in symbols}
+        wanted = [symbol for symbol in symbols if symbol not in self._pending]
+        marks = {}
+        if wanted:
+            loop = asyncio.get_running_loop()
+            marks = await loop.run_in_executor(None, self._load_marks, wanted)
+        status = {}
+        for symbol in symbols:
+            if symbol in self._pending:
+                self.coalesced += 1
+                status[symbol] = 'pending'
+                continue
+            job = NewsJob(
+                symbol,
+                time.monotonic(),
+                since={source: by_symbol[symbol] for source, by_symbol in marks.items() if symbol in by_symbol}
+            )
+            try:
+                self._fetch_queue.put_nowait(job)
+            except asyncio.QueueFull:
+                self.rejected += 1
+                status[symbol] = 'rejected'
+                continue
+            self._pending.add(symbol)
+            status[symbol] = 'queued'
+        return status
+
+    @staticmethod
+    def _load_marks(symbols: List[str]) -> Dict[str, Dict[str, datetime]]:
+        """Fetch marks for submitted symbols; without them the job fetches everything"""
+        db = SessionLocal()
+        try:
+            return load_fetch_marks(db, symbols)
+        except Exception as e:
+            logger.warning(f"Could not load fetch marks for {', '.join(symbols)}: {e}")
+            return {}
+        finally:
+            db.close()
+
+    def _plan_cycle(self):
+        """Target symbols by priority, the allocator's plan and fetch marks"""
+        db = SessionLocal()
+        try:
+            symbols = list(dict.fromkeys(ts.symbol.upper() for ts in db.query(TargetSymbol).all()))
+            if not symbols:
+                return [], {}, {}
+            plan = news_poll_allocator.plan(
+                db, symbols, self.interval_minutes,
+                {name: source.symbols_per_request for name, source in MARKET_DATA_SOURCES.items()}
+            )
+            scores = news_poll_allocator.last_scores
+            symbols.sort(key=lambda s: scores.get(s, {}).get('score', 0), reverse=True)
+            return symbols, plan, load_fetch_marks(db, symbols)
+        finally:
+            db.close()
+
+    async def run_cycle(self):
+        """Queue one fetch job per target symbol, waiting while the fetch queue is full"""
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        symbols, plan, marks = await loop.run_in_executor(None, self._plan_cycle)
+        plan_sets = {name: set(chosen) for name, chosen in plan.items()}
+        queued = 0
+        for symbol in symbols:
+            if symbol in self._pending:
+                self.coalesced += 1
+                continue
+            self._pending.add(symbol)
+            await self._fetch_queue.put(NewsJob(
+                symbol,
+                time.monotonic(),
+                since={source: by_symbol[symbol] for source, by_symbol in marks.items() if symbol in by_symbol},
+                excluded_sources={name for name, chosen in plan_sets.items() if symbol not in chosen}
+            ))
+            queued += 1
+        self.cycles += 1
+        self.last_cycle = datetime.now()
+        self.metrics['schedule'].record(time.monotonic() - started, queued)
+        logger.info(f"News pipeline cycle {self.cycles}: queued {queued} of {len(symbols)} symbols")
+
+    async def _schedule_loop(self):
+        while True:
+            try:
+                await self.run_cycle()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics['schedule'].failed += 1
+                logger.error(f"News pipeline cycle failed: {e}")
+            self.next_cycle = datetime.now() + timedelta(minutes=self.interval_minutes)
+            await asyncio.sleep(self.interval_minutes * 60)
+
+    def _finish(self, job: NewsJob):
+        self._pending.discard(job.symbol)
+
+    async def _fetch_worker(self):
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics['fetch']
+        while True:
+            jobs = [await self._fetch_queue.get()]
+            while len(jobs) < self.fetch_group_size:
+                try:
+                    jobs.append(self._fetch_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            metrics.in_flight += len(jobs)
+            try:
+                symbols = [job.symbol for job in jobs]
+                since: Dict[str, Dict[str, datetime]] = {}
+                for job in jobs:
+                    for source, mark in job.since.items():
+                        since.setdefault(source, {})[job.symbol] = mark
+                excluded = set().union(*(job.excluded_sources for job in jobs))
+                plan = {name: [job.symbol for job in jobs if name not in job.excluded_sources] for name in excluded}
+                news_by_symbol = await loop.run_in_executor(None, get_all_news_batch, symbols, since, plan)
+                polled = {job.symbol: [name for name in MARKET_DATA_SOURCES if name not in job.excluded_sources] for job in jobs}
+                await loop.run_in_executor(None, self._record_polls, polled)
+                for job in jobs:
+                    job.items = news_by_symbol.get(job.symbol, [])
+                    metrics.record(time.monotonic() - job.enqueued_at, len(job.items))
+                    if job.items:
+                        await self._process_queue.put(job)
+                    else:
+                        self._finish(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.failed += len(jobs)
+                for job in jobs:
+                    self._finish(job)
+                logger.error(f"News pipeline fetch failed for {len(jobs)} symbols: {e}")
+            finally:
+                metrics.in_flight -= len(jobs)
+                for _ in jobs:
+                    self._fetch_queue.task_done()
+
+    @staticmethod
+    def _record_polls(polled: Dict[str, List[str]]):
+        """Record poll times so quiet symbols look fresh to the allocator; failures only cost accuracy"""
+        db = SessionLocal()
+        try:
+            record_polls(db, polled)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not record news poll times for {len(polled)} symbols: {e}")
+        finally:
+            db.close()
+
+    def _prepare(self, job: NewsJob):
+        db = SessionLocal()
+        try:
+            return prepare_news_rows(db, job.symbol, job.items), latest_published_by_source(job.items)
+        finally:
+            db.close()
+
+    async def _process_worker(self):
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics['process']
+        while True:
+            job = await self._process_queue.get()
+            metrics.in_flight += 1
+            try:
+                job.rows, job.marks = await loop.run_in_executor(None, self._prepare, job)
+                metrics.record(time.monotonic() - job.enqueued_at, len(job.rows))
+                await self._write_queue.put(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.failed += 1
+                self._finish(job)
+                logger.error(f"News pipeline processing failed for {job.symbol}: {e}")
+            finally:
+                metrics.in_flight -= 1
+                self._process_queue.task_done()
+
+    def _write(self, batch: List[NewsJob]) -> int:
+        db = SessionLocal()
+        try:
+            for job in batch:
+                update_fetch_marks(db, job.symbol, job.marks)
+            rows = [row for job in batch for row in job.rows]
+            inserted = len(insert_news_rows(db, rows)) if rows else 0
+            db.commit()
+            index_news_rows(rows)
+            logger.info(f"News pipeline wrote {inserted} of {len(rows)} articles for {len(batch)} symbols")
+            return inserted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _writer(self):
+        """Collect jobs until the row batch fills or the flush interval passes, then write them together"""
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics['write']
+        while True:
+            batch = [await self._write_queue.get()]
+            rows = len(batch[0].rows)
+            flush_at = loop.time() + self.write_flush_seconds
+            while rows < self.write_batch_rows:
+                timeout = flush_at - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self._write_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(job)
+                rows += len(job.rows)
+            metrics.in_flight += len(batch)
+            try:
+                self.inserted += await loop.run_in_executor(None, self._write, batch)
+                for job in batch:
+                    metrics.record(time.monotonic() - job.enqueued_at, len(job.rows))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.failed += len(batch)
+                logger.error(f"News pipeline write failed for {len(batch)} symbols: {e}")
+            finally:
+                metrics.in_flight -= len(batch)
+                for job in batch:
+                    self._finish(job)
+                    self._write_queue.task_done()
+
+    def get_status(self) -> Dict[str, Any]:
+        queues = {'schedule': None, 'fetch': self._fetch_queue, 'process': self._process_queue, 'write': self._write_queue}
+        return {
+            'running': self.running,
+            'interval_minutes': self.interval_minutes,
+            'cycles': self.cycles,
+            'last_cycle': self.last_cycle.strftime("%Y-%m-%d %H:%M:%S") if self.last_cycle else None,
+            'next_cycle': self.next_cycle.strftime("%Y-%m-%d %H:%M:%S") if self.next_cycle else None,
+            'workers': {'fetch': self.fetch_workers, 'process': self.process_workers, 'write': 1},
+            'pending_symbols': len(self._pending),
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'inserted': self.inserted,
+            'stages': {stage: metrics.get_stats(queues[stage]) for stage, metrics in self.metrics.items()}
+        }
+
+# Global news ingestion pipeline, started by the news scheduler
+news_pipeline = NewsIngestionPipeline()
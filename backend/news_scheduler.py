@@ -6,6 +6,8 @@ from typing import Dict, List, Optional
 import json
 from dataclasses import dataclass
 from enum import Enum
+from quota_ledger import quota_ledger
+from rate_limiter import rate_limiters
 
 logger = logging.getLogger(__name__)
 
@@ -33,14 +35,12 @@ class NewsScheduler:
         self.trading_start = time(5, 30)  # 5:30 AM
         self.trading_end = time(14, 0)    # 2:00 PM
         self.sources = self._initialize_sources()
-        self.request_counts = {}
-        self.last_request_times = {}
-        # Initialize scheduler state
-        self._running = False
-        self._next_run = "N/A"
-        self._interval = "N/A"
-        self._last_run = "N/A"
-        self._job_count = 0
+        # Daily request counts live in the shared quota ledger
+        self.ledger = quota_ledger
+        # Longest a provider thread waits for a rate limit token before skipping
+        self.rate_max_wait = float(os.getenv('NEWS_RATE_MAX_WAIT_SECONDS', 10))
+        # Ingestion pipeline, created on first start
+        self._pipeline = None
         
     def _initialize_sources(self) -> Dict[str, NewsSourceConfig]:
         """Initialize news sources with their API limits"""
@@ -141,7 +141,7 @@ class NewsScheduler:
             return remaining.total_seconds() / 3600  # Convert to hours
     
     def can_make_request(self, source_name: str) -> bool:
-        """Check if we can make a request for this source"""
+        """Check if we can make a request for this source (read-only, uses the ledger cache)"""
         if source_name not in self.sources:
             return False
         
@@ -155,60 +155,57 @@ class NewsScheduler:
             return False
         
         # Check daily request limit
-        today = datetime.now().date().isoformat()
-        if today not in self.request_counts:
-            self.request_counts[today] = {}
-        
-        if source_name not in self.request_counts[today]:
-            self.request_counts[today][source_name] = 0
-        
-        if self.request_counts[today][source_name] >= source.limits.daily_requests:
-            logger.warning(f"{source_name} daily limit reached: {self.request_counts[today][source_name]}/{source.limits.daily_requests}")
+        requests_made = self.ledger.used(source_name)
+        if requests_made >= source.limits.daily_requests:
+            logger.warning(f"{source_name} daily limit reached: {requests_made}/{source.limits.daily_requests}")
             return False
         
-        # Check rate limiting (for sources with high limits)
-        if source.limits.daily_requests > 1000:  # High limit sources
-            if source_name not in self.last_request_times:
-                self.last_request_times[source_name] = {}
-            
-            if today not in self.last_request_times[source_name]:
-                self.last_request_times[source_name][today] = []
-            
-            # Remove requests older than 1 minute
-            now = datetime.now()
-            self.last_request_times[source_name][today] = [
-                t for t in self.last_request_times[source_name][today]
-                if (now - t).total_seconds() < 60
-            ]
-            
-            # Limit to 1 request per minute for high-volume sources
-            if len(self.last_request_times[source_name][today]) >= 1:
-                return False
-        
         return True
     
-    def record_request(self, source_name: str):
-        """Record that a request was made"""
-        today = datetime.now().date().isoformat()
-        
-        if today not in self.request_counts:
-            self.request_counts[today] = {}
-        
-        if source_name not in self.request_counts[today]:
-            self.request_counts[today][source_name] = 0
-        
-        self.request_counts[today][source_name] += 1
-        
-        # Record timestamp for rate limiting
-        if source_name not in self.last_request_times:
-            self.last_request_times[source_name] = {}
+    def rate_limiter(self, source_name: str):
+        """Token bucket for a source, or None if it is not rate limited.
+
+        High-limit sources default to 60 requests per minute with a burst of
+        5 (Finnhub's free tier); override with NEWS_RATE_PER_MINUTE_<SOURCE>
+        and NEWS_RATE_BURST_<SOURCE>.
+        """
+        source = self.sources.get(source_name)
+        high_limit = source is not None and source.limits.daily_requests > 1000
+        return rate_limiters.get(source_name, default_per_minute=60 if high_limit else None, default_burst=5)
+    
+    async def acquire_rate_token(self, source_name: str, timeout: Optional[float] = None) -> bool:
+        """Wait on the event loop until the source's rate limit allows another request"""
+        bucket = self.rate_limiter(source_name)
+        return True if bucket is None else await bucket.acquire(timeout=timeout)
+    
+    def acquire_request(self, source_name: str, wait: bool = True) -> bool:
+        """Reserve one request from the source's daily quota before sending it.
+
+        With wait, the calling thread waits up to rate_max_wait for a rate
+        limit token instead of skipping. The quota reservation is an atomic
+        increment-and-check in the shared ledger, so workers and processes
+        cannot overshoot the limit together.
+        """
+        if not self.can_make_request(source_name):
+            return False
         
-        if today not in self.last_request_times[source_name]:
-            self.last_request_times[source_name][today] = []
+        bucket = self.rate_limiter(source_name)
+        if bucket is not None:
+            acquired = bucket.acquire_blocking(timeout=self.rate_max_wait) if wait else bucket.try_acquire()
+            if not acquired:
+                logger.info(f"{source_name} rate limited - no token within {self.rate_max_wait if wait else 0}s")
+                return False
         
-        self.last_request_times[source_name][today].append(datetime.now())
+        if not self.ledger.try_acquire(source_name, self.sources[source_name].limits.daily_requests):
+            logger.warning(f"{source_name} daily limit reached")
+            return False
         
-        logger.info(f"Recorded request for {source_name}: {self.request_counts[today][source_name]}")
+        logger.info(f"Recorded request for {source_name}: {self.ledger.used(source_name)}")
+        return True
+    
+    def release_request(self, source_name: str):
+        """Return a reserved request that was never sent"""
+        self.ledger.release(source_name)
     
     def get_optimal_articles_per_request(self, source_name: str) -> int:
         """Calculate optimal number of articles to request based on remaining quota"""
@@ -216,20 +213,15 @@ class NewsScheduler:
             return 10  # Default
         
         source = self.sources[source_name]
-        today = datetime.now().date().isoformat()
-        
-        if today not in self.request_counts:
-            self.request_counts[today] = {}
-        
-        requests_made = self.request_counts[today].get(source_name, 0)
+        requests_made = self.ledger.used(source_name)
         requests_remaining = source.limits.daily_requests - requests_made
         
         if requests_remaining <= 0:
             return 0
         
-        # For Marketaux, always request 3 articles (their limit)
+        # Marketaux caps articles per request by plan, so always ask for the configured limit
         if source_name == 'marketaux':
-            return 3
+            return source.limits.articles_per_request
         
         # For other sources, calculate based on remaining requests
         if source.limits.trading_hours_only:
@@ -258,21 +250,22 @@ class NewsScheduler:
             'trading_session': self.get_trading_session().value,
             'is_trading_hours': self.is_trading_hours(),
             'trading_hours_remaining': self.get_trading_hours_remaining(),
-            'running': hasattr(self, '_running') and self._running,
-            'next_run': getattr(self, '_next_run', 'N/A'),
-            'interval': getattr(self, '_interval', 'N/A'),
-            'last_run': getattr(self, '_last_run', 'N/A'),
-            'job_count': getattr(self, '_job_count', 0),
+            'running': False,
+            'next_run': 'N/A',
+            'interval': 'N/A',
+            'last_run': 'N/A',
+            'job_count': 0,
+            'quota_ledger': self.ledger.get_status(),
+            'pipeline': None,
             'sources': {}
         }
         
-        today = datetime.now().date().isoformat()
-        
         for source_name, source in self.sources.items():
-            requests_made = self.request_counts.get(today, {}).get(source_name, 0)
+            requests_made = self.ledger.used(source_name)
             can_request = self.can_make_request(source_name)
             optimal_articles = self.get_optimal_articles_per_request(source_name)
             
+            bucket = self.rate_limiter(source_name)
             status['sources'][source_name] = {
                 'enabled': source.enabled,
                 'requests_made': requests_made,
@@ -280,45 +273,52 @@ class NewsScheduler:
                 'requests_remaining': source.limits.daily_requests - requests_made,
                 'can_make_request': can_request,
                 'optimal_articles_per_request': optimal_articles,
-                'trading_hours_only': source.limits.trading_hours_only
+                'trading_hours_only': source.limits.trading_hours_only,
+                'rate_limit': bucket.get_stats() if bucket is not None else None
             }
         
+        if self._pipeline is not None:
+            pipeline = self._pipeline.get_status()
+            status.update({
+                'running': pipeline['running'],
+                'next_run': pipeline['next_cycle'] or 'N/A',
+                'interval': f"{pipeline['interval_minutes']:g} minutes",
+                'last_run': pipeline['last_cycle'] or 'N/A',
+                'job_count': pipeline['pending_symbols'],
+                'pipeline': pipeline
+            })
         return status
 
     def get_quota_status(self) -> Dict:
         """Get quota status for all news sources"""
         quota_status = {}
-        today = datetime.now().date().isoformat()
         
         for source_name, source in self.sources.items():
-            requests_made = self.request_counts.get(today, {}).get(source_name, 0)
+            requests_made = self.ledger.used(source_name)
             quota_status[source_name] = {
                 'used': requests_made,
                 'limit': source.limits.daily_requests,
                 'remaining': source.limits.daily_requests - requests_made,
                 'enabled': source.enabled,
-                'trading_hours_only': source.limits.trading_hours_only
+                'trading_hours_only': source.limits.trading_hours_only,
+                'window': self.ledger.window_for(source_name).isoformat()
             }
         
         return quota_status
 
     def start(self):
-        """Start the scheduler (placeholder for future implementation)"""
-        self._running = True
-        self._next_run = "Every 30 minutes"
-        self._interval = "30 minutes"
-        self._last_run = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self._job_count = 1
+        """Start the news ingestion pipeline; must be called from the event loop"""
+        if self._pipeline is None:
+            from news_pipeline import news_pipeline
+            self._pipeline = news_pipeline
+        self._pipeline.start()
         logger.info("News scheduler started")
         return {"status": "running", "message": "Scheduler started"}
 
     def stop(self):
-        """Stop the scheduler (placeholder for future implementation)"""
-        self._running = False
-        self._next_run = "N/A"
-        self._interval = "N/A"
-        self._last_run = "N/A"
-        self._job_count = 0
+        """Stop the news ingestion pipeline"""
+        if self._pipeline is not None:
+            self._pipeline.stop()
         logger.info("News scheduler stopped")
         return {"status": "stopped", "message": "Scheduler stopped"}
 
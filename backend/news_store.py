@@ -0,0 +1,377 @@
+import os
+import re
+import json
+import base64
+import html
+import hashlib
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, tuple_, select, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import News, NewsFetchState
+from sentiment_analyzer import sentiment_analyzer
+from news_dedupe import ClusterEntry, jaccard, news_dedupe_index, title_shingles
+
+logger = logging.getLogger(__name__)
+
+def normalize_title(title: Optional[str]) -> str:
+    """Lower-case a title and collapse punctuation and whitespace"""
+    return re.sub(r'[\W_]+', ' ', (title or '').lower()).strip()
+
+def news_content_hash(symbol: str, source: Optional[str], title: Optional[str]) -> str:
+    """Dedupe key for a stored article: symbol, source and normalized title"""
+    key = f"{symbol.upper()}|{(source or '').lower()}|{normalize_title(title)}"
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+def parse_published_at(value) -> Optional[datetime]:
+    """Parse provider timestamps (ISO strings or epoch seconds) to naive UTC"""
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+        if isinstance(value, datetime):
+            parsed = value
+        else:
+            parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    except (ValueError, OverflowError, OSError):
+        logger.debug(f"Unparseable published_at: {value}")
+        return None
+
+def load_fetch_marks(db: Session, symbols: List[str]) -> Dict[str, Dict[str, datetime]]:
+    """High-water marks for incremental fetches, as {source: {symbol: since}}.
+
+    Marks are moved back by NEWS_FETCH_OVERLAP_MINUTES so articles indexed
+    late by a provider are still picked up; the overlap is absorbed by the
+    content-hash dedupe.
+    """
+    overlap = timedelta(minutes=float(os.getenv('NEWS_FETCH_OVERLAP_MINUTES', 10)))
+    rows = db.query(NewsFetchState).filter(
+        NewsFetchState.symbol.in_([s.upper() for s in symbols]),
+        NewsFetchState.last_published_at.isnot(None)
+    )
+    marks: Dict[str, Dict[str, datetime]] = {}
+    for row in rows:
+        marks.setdefault(row.source, {})[row.symbol] = row.last_published_at - overlap
+    return marks
+
+def latest_published_by_source(items: List[Dict]) -> Dict[str, datetime]:
+    """Newest published_at per source among fetched articles"""
+    latest: Dict[str, datetime] = {}
+    for item in items:
+        source = item.get('source')
+        published = parse_published_at(item.get('published_at'))
+        if source and published is not None and (source not in latest or published > latest[source]):
+            latest[source] = published
+    return latest
+
+def update_fetch_marks(db: Session, symbol: str, latest: Dict[str, datetime]):
+    """Advance each source's mark for the symbol, never moving it backwards"""
+    if not latest:
+        return
+    now = datetime.utcnow()
+    stmt = pg_insert(NewsFetchState).values([
+        {'source': source, 'symbol': symbol, 'last_published_at': published, 'updated_at': now}
+        for source, published in latest.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        constraint='uq_news_fetch_state_source_symbol',
+        set_={
+            'last_published_at': func.greatest(NewsFetchState.last_published_at, stmt.excluded.last_published_at),
+            'updated_at': stmt.excluded.updated_at
+        }
+    )
+    db.execute(stmt)
+
+def record_polls(db: Session, polled: Dict[str, List[str]]):
+    """Stamp last_polled_at for the sources each symbol was fetched from, whether or not they found news"""
+    now = datetime.utcnow()
+    values = [
+        {'source': source, 'symbol': symbol.upper(), 'last_polled_at': now}
+        for symbol, sources in polled.items() for source in sources
+    ]
+    if not values:
+        return
+    stmt = pg_insert(NewsFetchState).values(values)
+    stmt = stmt.on_conflict_do_update(
+        constraint='uq_news_fetch_state_source_symbol',
+        set_={'last_polled_at': stmt.excluded.last_polled_at}
+    )
+    db.execute(stmt)
+
+# Text search configuration for News.search_vector; queries must use the same one
+SEARCH_CONFIG = 'english'
+
+def news_search_vector(title: Optional[str], summary: Optional[str]):
+    """SQL expression for News.search_vector: title weighted A, summary weighted B"""
+    # Weights are rendered as untyped literals so Postgres resolves them to "char"
+    return func.setweight(func.to_tsvector(SEARCH_CONFIG, title or ''), literal_column("'A'")).op('||')(
+        func.setweight(func.to_tsvector(SEARCH_CONFIG, summary or ''), literal_column("'B'"))
+    )
+
+SENTIMENT_FIELDS = ('score', 'sentiment', 'confidence', 'method', 'textblob_score', 'openai_score')
+
+def _warm_dedupe_index(db: Session):
+    """Load recent cluster representatives so clustering survives restarts"""
+    if news_dedupe_index.warmed:
+        return
+    news_dedupe_index.warmed = True
+    limit = int(os.getenv('NEWS_DEDUPE_WARM_ROWS', 1000))
+    rows = (
+        db.query(News)
+        .filter(News.content_hash.isnot(None))
+        .filter(or_(News.cluster_id.is_(None), News.cluster_id == News.content_hash))
+        .order_by(News.id.desc())
+        .limit(limit)
+        .all()
+    )
+    for row in reversed(rows):
+        news_dedupe_index.add(row.content_hash, row.symbol or '', title_shingles(row.title, row.publisher), row.content_hash, {
+            'score': row.score,
+            'sentiment': row.sentiment_label,
+            'confidence': row.confidence,
+            'method': row.analysis_method,
+            'textblob_score': row.textblob_score,
+            'openai_score': row.openai_score
+        })
+    logger.info(f"Warmed news near-duplicate index with {len(rows)} articles")
+
+def prepare_news_rows(db: Session, symbol: str, items: List[Dict]) -> List[Dict]:
+    """Dedupe and score a symbol's fetched articles into News rows.
+
+    Articles whose content hash is already stored are skipped before
+    sentiment analysis. Each remaining article's headline is matched
+    against the symbol's recent headlines: a near-duplicate, such as the
+    same wire story from another provider, joins the existing cluster and
+    copies its representative's sentiment without raw_json, and only new
+    stories are scored and become representatives. Near-duplicates within
+    the batch cluster with each other too. Nothing is added to the shared
+    index here; call index_news_rows once the rows are committed.
+    """
+    symbol = symbol.upper()
+    by_hash: Dict[str, Dict] = {}
+    for item in items:
+        if not item.get('title'):
+            continue
+        by_hash.setdefault(news_content_hash(symbol, item.get('source'), item.get('title')), item)
+    if not by_hash:
+        return []
+
+    existing = {
+        content_hash for (content_hash,) in
+        db.query(News.content_hash).filter(News.content_hash.in_(list(by_hash)))
+    }
+    _warm_dedupe_index(db)
+    rows = []
+    batch: List[ClusterEntry] = []
+    clustered = 0
+    for content_hash, item in by_hash.items():
+        if content_hash in existing:
+            continue
+        shingles = title_shingles(item.get('title'), item.get('publisher'))
+        match = news_dedupe_index.find(symbol, shingles)
+        if match is None and shingles:
+            best_similarity = news_dedupe_index.threshold
+            for entry in batch:
+                similarity = jaccard(shingles, entry.shingles)
+                if similarity >= best_similarity:
+                    match, best_similarity = entry, similarity
+        if match is not None:
+            cluster_id = match.cluster_id
+            sentiment_result = match.sentiment
+            clustered += 1
+        else:
+            cluster_id = content_hash
+            sentiment_result = sentiment_analyzer.analyze_sentiment(
+                text=item.get('summary') or '',
+                title=item.get('title') or ''
+            )
+            sentiment_result = {field: sentiment_result.get(field) for field in SENTIMENT_FIELDS}
+            batch.append(ClusterEntry(content_hash, symbol, shingles, cluster_id, sentiment_result))
+        rows.append({
+            'symbol': symbol,
+            'title': item.get('title'),
+            'summary': item.get('summary') or '',
+            'link': item.get('link') or '',
+            'publisher': item.get('publisher') or '',
+            'published_at': parse_published_at(item.get('published_at')),
+            'source': item.get('source') or '',
+            'score': sentiment_result.get('score'),
+            'sentiment_label': sentiment_result.get('sentiment'),
+            'confidence': sentiment_result.get('confidence'),
+            'analysis_method': sentiment_result.get('method') or 'combined',
+            'textblob_score': sentiment_result.get('textblob_score'),
+            'openai_score': sentiment_result.get('openai_score'),
+            # Cluster members keep their own link and text but not the raw payload
+            'raw_json': (item.get('raw_json') or '') if cluster_id == content_hash else '',
+            'content_hash': content_hash,
+            'cluster_id': cluster_id,
+            'created_at': datetime.utcnow()
+        })
+    logger.info(f"Prepared {len(rows)} new articles for {symbol} ({len(existing)} already stored, {clustered} near-duplicates clustered)")
+    return rows
+
+def index_news_rows(rows: List[Dict]):
+    """Add committed cluster representatives to the near-duplicate index.
+
+    A representative that a concurrent writer's near-duplicate beat into
+    the index is left out, so each story keeps a single entry.
+    """
+    for row in rows:
+        if row['cluster_id'] != row['content_hash']:
+            continue
+        news_dedupe_index.find_or_add(
+            row['content_hash'], row['symbol'], title_shingles(row['title'], row['publisher']), row['cluster_id'], {
+                'score': row['score'],
+                'sentiment': row['sentiment_label'],
+                'confidence': row['confidence'],
+                'method': row['analysis_method'],
+                'textblob_score': row['textblob_score'],
+                'openai_score': row['openai_score']
+            }
+        )
+
+def insert_news_rows(db: Session, rows: List[Dict], chunk_size: int = 1000) -> List[int]:
+    """INSERT ... ON CONFLICT DO NOTHING on the unique hash, without committing.
+
+    Rows a concurrent writer inserted first are dropped. Large batches are
+    split to stay under Postgres' bind parameter limit. The full-text
+    search vector is computed in the same statement. Returns the ids of
+    the rows actually inserted.
+    """
+    inserted_ids: List[int] = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = [
+            dict(row, search_vector=news_search_vector(row.get('title'), row.get('summary')))
+            for row in rows[start:start + chunk_size]
+        ]
+        stmt = (
+            pg_insert(News)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=['content_hash'])
+            .returning(News.id)
+        )
+        inserted_ids.extend(row[0] for row in db.execute(stmt))
+    return inserted_ids
+
+def store_news_items(db: Session, symbol: str, items: List[Dict]) -> List[int]:
+    """Dedupe, score and insert a symbol's new articles in one statement.
+
+    Each source's fetch mark for the symbol is advanced to the newest
+    article seen. Returns the ids of the rows actually inserted.
+    """
+    symbol = symbol.upper()
+    update_fetch_marks(db, symbol, latest_published_by_source(items))
+    rows = prepare_news_rows(db, symbol, items)
+    inserted_ids = insert_news_rows(db, rows) if rows else []
+    db.commit()
+    index_news_rows(rows)
+    if rows:
+        logger.info(f"Stored {len(inserted_ids)} new articles for {symbol} ({len(rows) - len(inserted_ids)} lost to concurrent inserts)")
+    return inserted_ids
+
+def encode_news_cursor(published_at: Optional[datetime], news_id: int) -> str:
+    """Opaque keyset cursor for the last article on a page"""
+    payload = {'p': published_at.isoformat() if published_at else None, 'i': news_id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def decode_news_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverse of encode_news_cursor; raises ValueError for a malformed cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        published_at = datetime.fromisoformat(payload['p']) if payload['p'] else None
+        return published_at, int(payload['i'])
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def query_news_page(db: Session, symbol: str, limit: int = 20, cursor: Optional[str] = None,
+                    sources: Optional[List[str]] = None,
+                    sentiments: Optional[List[str]] = None) -> Tuple[List[News], Optional[str]]:
+    """One page of a symbol's stored news, newest first, and the cursor for the next page.
+
+    Pages are keyset-paginated on (symbol, published_at, id) so each page is
+    an index range scan however deep it is. Dated articles come first;
+    articles without a published_at follow, newest id first.
+    """
+    base = db.query(News).filter(News.symbol == symbol.upper())
+    if sources:
+        base = base.filter(News.source.in_(sources))
+    if sentiments:
+        base = base.filter(News.sentiment_label.in_(sentiments))
+    after_published, after_id = decode_news_cursor(cursor) if cursor else (None, None)
+
+    rows: List[News] = []
+    if cursor is None or after_published is not None:
+        dated = base.filter(News.published_at.isnot(None))
+        if after_published is not None:
+            dated = dated.filter(tuple_(News.published_at, News.id) < tuple_(after_published, after_id))
+        rows = dated.order_by(News.published_at.desc(), News.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        undated = base.filter(News.published_at.is_(None))
+        if after_id is not None and after_published is None:
+            undated = undated.filter(News.id < after_id)
+        rows += undated.order_by(News.id.desc()).limit(limit + 1 - len(rows)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_news_cursor(last.published_at, last.id)
+    return rows[:limit], next_cursor
+
+# ts_headline marks matches with control characters; the text is HTML-escaped before they become <mark> tags
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+def highlight_to_html(text: Optional[str]) -> Optional[str]:
+    """Escape provider text from ts_headline and turn its match sentinels into <mark> tags"""
+    if text is None:
+        return None
+    return html.escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
+def search_news(db: Session, q: str, symbols: Optional[List[str]] = None,
+                start_date: Optional[date] = None, end_date: Optional[date] = None,
+                limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """Full-text search over stored news, best match first.
+
+    q uses web search syntax ("quoted phrases", or, -excluded). Matching
+    uses the GIN index on search_vector; ranking weights title hits above
+    summary hits, with newer articles first among equal ranks. Highlighted
+    snippets are only built for the rows on the returned page, and are
+    HTML-escaped with matches wrapped in <mark>.
+    """
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank(News.search_vector, query)
+    matches = select(News.id.label('id'), rank.label('rank')).where(News.search_vector.op('@@')(query))
+    if symbols:
+        matches = matches.where(News.symbol.in_([s.upper() for s in symbols]))
+    if start_date:
+        matches = matches.where(News.published_at >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        matches = matches.where(News.published_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    page = (
+        matches.order_by(rank.desc(), News.published_at.desc().nullslast(), News.id.desc())
+        .limit(limit).offset(offset)
+        .subquery()
+    )
+    highlight = f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_STOP}"'
+    stmt = (
+        select(
+            News,
+            page.c.rank,
+            func.ts_headline(SEARCH_CONFIG, func.coalesce(News.title, ''), query, f'{highlight}, HighlightAll=true').label('title_highlight'),
+            func.ts_headline(SEARCH_CONFIG, func.coalesce(News.summary, ''), query, f'{highlight}, MaxWords=35, MinWords=15, MaxFragments=2').label('snippet')
+        )
+        .join(page, page.c.id == News.id)
+        .order_by(page.c.rank.desc(), News.published_at.desc().nullslast(), News.id.desc())
+    )
+    return [
+        {'news': row, 'rank': rank_value, 'title_highlight': highlight_to_html(title_highlight), 'snippet': highlight_to_html(snippet)}
+        for row, rank_value, title_highlight, snippet in db.execute(stmt)
+    ]
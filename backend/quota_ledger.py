@@ -0,0 +1,183 @@
+import os
+import time
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import pytz
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+class QuotaLedger:
+    """Daily request counts per news source, shared through Postgres.
+
+    Each source's window is the calendar day in that source's quota
+    timezone (NEWS_QUOTA_TZ_<SOURCE>, default UTC). ``try_acquire`` is a
+    single atomic INSERT ... ON CONFLICT DO UPDATE ... WHERE count < limit
+    RETURNING, so concurrent workers and processes can never take more
+    than the limit between them. Counts read on the hot path are served
+    from a short-lived local cache. Windows older than the retention period
+    are pruned. If the database is unavailable the ledger falls back to
+    in-process counts until it recovers.
+    """
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+        self.cache_ttl = float(os.getenv('NEWS_QUOTA_CACHE_SECONDS', 5))
+        self.retention_days = int(os.getenv('NEWS_QUOTA_RETENTION_DAYS', 30))
+        self._cache: Dict[str, Tuple[date, int, float]] = {}
+        self._memory: Dict[Tuple[str, date], int] = {}
+        self._lock = threading.Lock()
+        self.db_retry_seconds = float(os.getenv('NEWS_QUOTA_DB_RETRY_SECONDS', 30))
+        self._last_prune: Optional[date] = None
+        self._db_available = True
+        self._db_retry_at = 0.0
+
+    def _session(self):
+        if self._session_factory is None:
+            from database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _db_usable(self) -> bool:
+        """Skip the database for a while after a failure instead of waiting on it every call"""
+        return self._db_available or time.monotonic() >= self._db_retry_at
+
+    def _db_failed(self, action: str, error: Exception):
+        if self._db_available:
+            logger.warning(f"Quota ledger {action} failed, using in-process counts: {error}")
+        self._db_available = False
+        self._db_retry_at = time.monotonic() + self.db_retry_seconds
+
+    def _fallback_count(self, source: str, window: date) -> int:
+        # Carry on from the last count seen in the database
+        cached = self._cache.get(source)
+        return max(self._memory.get((source, window), 0), cached[1] if cached and cached[0] == window else 0)
+
+    def _db_recovered(self):
+        if not self._db_available:
+            logger.info("Quota ledger database available again")
+        self._db_available = True
+
+    @staticmethod
+    def timezone_for(source: str):
+        name = os.getenv(f'NEWS_QUOTA_TZ_{source.upper()}', 'UTC')
+        try:
+            return pytz.timezone(name)
+        except Exception:
+            logger.warning(f"Invalid quota timezone {name} for {source}, using UTC")
+            return pytz.UTC
+
+    def window_for(self, source: str) -> date:
+        """Current quota day for a source in its own timezone"""
+        return datetime.now(self.timezone_for(source)).date()
+
+    def used(self, source: str) -> int:
+        """Requests used in the current window, from the local cache when fresh"""
+        window = self.window_for(source)
+        cached = self._cache.get(source)
+        if cached is not None and cached[0] == window and time.monotonic() - cached[2] < self.cache_ttl:
+            return cached[1]
+        count = self._fallback_count(source, window)
+        if self._db_usable():
+            try:
+                with self._session() as db:
+                    row = db.execute(
+                        text("SELECT request_count FROM news_quota_usage WHERE source = :source AND window_start = :window"),
+                        {'source': source, 'window': window}
+                    ).first()
+                self._db_recovered()
+                count = row[0] if row else 0
+            except Exception as e:
+                self._db_failed('read', e)
+        self._cache[source] = (window, count, time.monotonic())
+        return count
+
+    def try_acquire(self, source: str, limit: int) -> bool:
+        """Atomically take one request from the source's window if it is below limit"""
+        window = self.window_for(source)
+        if self._db_usable():
+            self._maybe_prune(window)
+            try:
+                with self._session() as db:
+                    row = db.execute(
+                        text(
+                            "INSERT INTO news_quota_usage (source, window_start, request_count, updated_at) "
+                            "VALUES (:source, :window, 1, CURRENT_TIMESTAMP) "
+                            "ON CONFLICT (source, window_start) DO UPDATE "
+                            "SET request_count = news_quota_usage.request_count + 1, updated_at = CURRENT_TIMESTAMP "
+                            "WHERE news_quota_usage.request_count < :limit "
+                            "RETURNING request_count"
+                        ),
+                        {'source': source, 'window': window, 'limit': limit}
+                    ).first()
+                    db.commit()
+                self._db_recovered()
+                if row is None:
+                    self._cache[source] = (window, limit, time.monotonic())
+                    return False
+                self._cache[source] = (window, row[0], time.monotonic())
+                return True
+            except Exception as e:
+                self._db_failed('increment', e)
+        with self._lock:
+            count = self._fallback_count(source, window)
+            if count >= limit:
+                return False
+            self._memory[(source, window)] = count + 1
+            self._cache[source] = (window, count + 1, time.monotonic())
+            return True
+
+    def release(self, source: str):
+        """Give back a request that was acquired but never sent"""
+        window = self.window_for(source)
+        if self._db_usable():
+            try:
+                with self._session() as db:
+                    db.execute(
+                        text(
+                            "UPDATE news_quota_usage SET request_count = greatest(request_count - 1, 0), updated_at = CURRENT_TIMESTAMP "
+                            "WHERE source = :source AND window_start = :window"
+                        ),
+                        {'source': source, 'window': window}
+                    )
+                    db.commit()
+                self._db_recovered()
+                self._cache.pop(source, None)
+                return
+            except Exception as e:
+                self._db_failed('release', e)
+        with self._lock:
+            key = (source, window)
+            self._memory[key] = max(0, self._fallback_count(source, window) - 1)
+            self._cache[source] = (window, self._memory[key], time.monotonic())
+
+    def _maybe_prune(self, window: date):
+        """Delete windows past the retention period, at most once per day"""
+        if self._last_prune == window:
+            return
+        self._last_prune = window
+        cutoff = window - timedelta(days=self.retention_days)
+        with self._lock:
+            for key in [k for k in self._memory if k[1] < cutoff]:
+                del self._memory[key]
+        try:
+            with self._session() as db:
+                result = db.execute(text("DELETE FROM news_quota_usage WHERE window_start < :cutoff"), {'cutoff': cutoff})
+                db.commit()
+            if result.rowcount:
+                logger.info(f"Pruned {result.rowcount} quota windows older than {cutoff}")
+        except Exception as e:
+            self._db_failed('prune', e)
+
+    def get_status(self) -> Dict:
+        return {
+            'backend': 'postgres' if self._db_available else 'memory',
+            'cache_seconds': self.cache_ttl,
+            'retention_days': self.retention_days
+        }
+
+# Global quota ledger shared by the news scheduler
+quota_ledger = QuotaLedger()
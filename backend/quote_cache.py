@@ -0,0 +1,117 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class QuoteCache:
+    """Bounded in-process quote cache keyed by (source, symbol).
+
+    Entries younger than the TTL are served directly. Entries older than the
+    TTL but still inside the stale window are served immediately while a
+    single background refresh updates them. Anything older is a miss and is
+    fetched inline. The least recently used entry is evicted once the cache
+    is full.
+    """
+
+    def __init__(self):
+        self.ttl_seconds = float(os.getenv('QUOTE_CACHE_TTL_SECONDS', 5))
+        self.stale_seconds = float(os.getenv('QUOTE_CACHE_STALE_SECONDS', 30))
+        self.max_entries = int(os.getenv('QUOTE_CACHE_MAX_ENTRIES', 1000))
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Dict, float]]" = OrderedDict()
+        self._refreshing: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    @staticmethod
+    def _key(source: str, symbol: str) -> Tuple[str, str]:
+        return (source.lower(), symbol.upper())
+
+    def get(self, source: str, symbol: str) -> Optional[Dict]:
+        """Return a fresh cached quote or None, without fetching"""
+        key = self._key(source, symbol)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl_seconds:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry[0])
+
+    def set(self, source: str, symbol: str, value: Dict):
+        key = self._key(source, symbol)
+        self._entries[key] = (dict(value), time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_fetch(self, source: str, symbol: str, fetch: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """Return a cached quote, refreshing it in the background when stale"""
+        key = self._key(source, symbol)
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(value)
+            if age <= self.ttl_seconds + self.stale_seconds:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._schedule_refresh(key, fetch)
+                return dict(value)
+
+        self.misses += 1
+        value = await fetch()
+        if value:
+            self.set(source, symbol, value)
+        return value
+
+    def _schedule_refresh(self, key: Tuple[str, str], fetch: Callable[[], Awaitable[Optional[Dict]]]):
+        running = self._refreshing.get(key)
+        if running is not None and not running.done():
+            return
+        self._refreshing[key] = asyncio.ensure_future(self._refresh(key, fetch))
+
+    async def _refresh(self, key: Tuple[str, str], fetch: Callable[[], Awaitable[Optional[Dict]]]):
+        try:
+            value = await fetch()
+            self.refreshes += 1
+            if value:
+                self.set(key[0], key[1], value)
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.warning(f"Background quote refresh failed for {key[1]} ({key[0]}): {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'stale_seconds': self.stale_seconds,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'refreshes_in_flight': len(self._refreshing)
+        }
+
+# Global quote cache instance
+quote_cache = QuoteCache()
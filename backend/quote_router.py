@@ -0,0 +1,198 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class SourceStats:
+    """Rolling latency and error window for one quote source"""
+
+    def __init__(self, window: int):
+        self.latencies_ms = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+        self.wins = 0
+        self.hedged = 0
+        self.abandoned = 0
+        self.last_sample_at: Optional[float] = None
+
+    def record(self, latency_ms: float, ok: bool):
+        self.requests += 1
+        self.last_sample_at = time.monotonic()
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies_ms.append(latency_ms)
+
+    def record_abandoned(self, elapsed_ms: float):
+        """A request cancelled after another source answered: a failure at least this slow"""
+        self.requests += 1
+        self.last_sample_at = time.monotonic()
+        self.abandoned += 1
+        self.outcomes.append(False)
+        self.latencies_ms.append(elapsed_ms)
+
+    @property
+    def sampled(self) -> bool:
+        return bool(self.outcomes)
+
+    def needs_probe(self, max_age: float) -> bool:
+        """No samples yet, or none recent enough to trust"""
+        return self.last_sample_at is None or time.monotonic() - self.last_sample_at > max_age
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+class QuoteRouter:
+    """Routes each quote request to the healthiest source, with hedging and failover.
+
+    Sources are ranked by rolling p50 latency penalised by error rate; the
+    configured source gets a bias so it is used while it is healthy, and
+    sources that are unavailable (open circuit breaker) go last. If the
+    first choice has not answered within the hedge delay, one hedge request
+    goes to the next source and whichever answers first wins; the loser is
+    cancelled and recorded as a failure at least as slow as it was when
+    cancelled, so a source that hangs drops down the ranking. Failures fall
+    through to the remaining sources in rank order. Sources with no samples
+    in the last reprobe interval are measured by a background probe after
+    the caller has been answered, never ahead of the ranking.
+    """
+
+    def __init__(self, fetchers: Dict[str, Callable[[str], Awaitable[Optional[Dict]]]],
+                 is_available: Optional[Callable[[str], bool]] = None):
+        self.fetchers = fetchers
+        self.is_available = is_available or (lambda name: True)
+        window = int(os.getenv('QUOTE_ROUTER_WINDOW', 100))
+        self.default_latency_ms = float(os.getenv('QUOTE_ROUTER_DEFAULT_LATENCY_MS', 500))
+        self.min_hedge_ms = float(os.getenv('QUOTE_ROUTER_MIN_HEDGE_MS', 250))
+        self.preferred_bias = float(os.getenv('QUOTE_ROUTER_PREFERRED_BIAS', 0.5))
+        # A source not measured for this long gets a background probe, so a demoted one can recover
+        self.reprobe_seconds = float(os.getenv('QUOTE_ROUTER_REPROBE_SECONDS', 60))
+        self.stats: Dict[str, SourceStats] = {name: SourceStats(window) for name in fetchers}
+        # Background probes that take longer than this are abandoned and count as failures
+        self.probe_timeout_seconds = float(os.getenv('QUOTE_ROUTER_PROBE_TIMEOUT_SECONDS', 10))
+        self._probes: Dict[str, asyncio.Task] = {}
+
+    def score(self, name: str, preferred: Optional[str] = None) -> float:
+        stats = self.stats[name]
+        p50 = stats.percentile(50)
+        score = (p50 if p50 is not None else self.default_latency_ms) * (1 + 4 * stats.error_rate)
+        if name == preferred:
+            score *= self.preferred_bias
+        return score
+
+    def rank(self, preferred: Optional[str] = None) -> List[str]:
+        return sorted(self.fetchers, key=lambda name: (not self.is_available(name), self.score(name, preferred)))
+
+    def _start_probes(self, symbol: str):
+        """Measure stale, available sources in the background, off the caller's path"""
+        for name, stats in self.stats.items():
+            probe = self._probes.get(name)
+            if probe is not None and not probe.done():
+                continue
+            if stats.needs_probe(self.reprobe_seconds) and self.is_available(name):
+                self._probes[name] = asyncio.ensure_future(self._probe(name, symbol))
+
+    async def _probe(self, name: str, symbol: str):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._timed_fetch(name, symbol), self.probe_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.stats[name].record_abandoned((time.monotonic() - started) * 1000)
+
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait for a source before hedging: its p95, but not below the floor"""
+        p95 = self.stats[name].percentile(95)
+        return max(self.min_hedge_ms, p95 if p95 is not None else self.default_latency_ms) / 1000
+
+    async def _timed_fetch(self, name: str, symbol: str) -> Optional[Dict]:
+        started = time.monotonic()
+        try:
+            data = await self.fetchers[name](symbol)
+        except asyncio.CancelledError:
+            # Abandoned requests are recorded by get_quote
+            raise
+        except Exception as e:
+            logger.warning(f"Quote source {name} failed for {symbol}: {e}")
+            data = None
+        self.stats[name].record((time.monotonic() - started) * 1000, bool(data))
+        return data
+
+    async def get_quote(self, symbol: str, preferred: Optional[str] = None) -> Optional[Dict]:
+        """Get a quote from the best available source, tagging it with the source that answered"""
+        candidates = self.rank(preferred)
+        tasks: Dict[asyncio.Task, str] = {}
+        started_at: Dict[asyncio.Task, float] = {}
+        hedged = False
+        answered = False
+
+        def launch_next():
+            if candidates:
+                name = candidates.pop(0)
+                task = asyncio.ensure_future(self._timed_fetch(name, symbol))
+                tasks[task] = name
+                started_at[task] = time.monotonic()
+
+        launch_next()
+        try:
+            while tasks:
+                timeout = None
+                if not hedged and candidates and len(tasks) == 1:
+                    timeout = self.hedge_delay(next(iter(tasks.values())))
+                done, _ = await asyncio.wait(tasks.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.stats[candidates[0]].hedged += 1
+                    launch_next()
+                    continue
+                for task in done:
+                    name = tasks.pop(task)
+                    data = task.result()
+                    if data:
+                        answered = True
+                        self.stats[name].wins += 1
+                        data['source'] = name
+                        return data
+                if not tasks:
+                    launch_next()
+            logger.warning(f"All quote sources failed for {symbol}")
+            return None
+        finally:
+            now = time.monotonic()
+            for task, name in tasks.items():
+                if task.done():
+                    continue
+                task.cancel()
+                # Only penalise losers; a cancelled caller says nothing about the source
+                if answered:
+                    self.stats[name].record_abandoned((now - started_at[task]) * 1000)
+            if answered:
+                self._start_probes(symbol)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                'p50_ms': stats.percentile(50),
+                'p95_ms': stats.percentile(95),
+                'error_rate': round(stats.error_rate, 4),
+                'requests': stats.requests,
+                'wins': stats.wins,
+                'hedged': stats.hedged,
+                'abandoned': stats.abandoned,
+                'available': self.is_available(name),
+                'score': round(self.score(name), 2)
+            }
+            for name, stats in self.stats.items()
+        }
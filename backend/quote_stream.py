@@ -0,0 +1,211 @@
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+from market_data import fetch_market_data, get_current_source
+from ibkr_service import ibkr_service
+
+logger = logging.getLogger(__name__)
+
+class QuoteStreamClient:
+    """One connected websocket and the quote deltas waiting to be sent to it.
+
+    Deltas for the same symbol are merged while the client is busy, so a slow
+    consumer only ever holds the latest value per symbol instead of a backlog.
+    """
+
+    def __init__(self, websocket, send_interval: float):
+        self.websocket = websocket
+        self.send_interval = send_interval
+        self.symbols: Set[str] = set()
+        self.sent_messages = 0
+        self.coalesced_updates = 0
+        self._pending: Dict[str, Dict] = {}
+        self._wakeup = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+
+    def push(self, symbol: str, delta: Dict):
+        pending = self._pending.get(symbol)
+        if pending is None:
+            self._pending[symbol] = dict(delta)
+        else:
+            pending.update(delta)
+            self.coalesced_updates += 1
+        self._wakeup.set()
+
+    async def run_sender(self):
+        """Send pending deltas, at most once per send interval"""
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                batch, self._pending = self._pending, {}
+                if batch:
+                    await self.websocket.send_json({'type': 'quotes', 'data': batch})
+                    self.sent_messages += 1
+                await asyncio.sleep(self.send_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Quote stream sender stopped: {e}")
+
+class IBKRQuoteFeed:
+    """Tick-driven quotes from IBKR's streaming quote table.
+
+    Live while the gateway is connected and IBKR is the selected source (or
+    auto). Held symbols keep their market data line open, and every tick is
+    handed to the registered listeners as it arrives.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def is_live(self) -> bool:
+        return self.service.connected and get_current_source() in ('ibkr', 'auto')
+
+    def add_listener(self, callback: Callable[[str, Dict], None]):
+        self.service.quote_manager.listeners.append(
+            lambda symbol, quote: callback(symbol, dict(quote, source='ibkr'))
+        )
+
+    def hold(self, symbol: str) -> Optional[Dict]:
+        """Keep symbol's line open and return its latest quote, if any"""
+        manager = self.service.quote_manager
+        manager.hold(symbol)
+        quote = manager.quotes.get(symbol.upper())
+        return dict(quote, source='ibkr') if quote else None
+
+    def release(self, symbol: str):
+        self.service.quote_manager.release(symbol)
+
+class QuoteStreamHub:
+    """Shares one upstream quote feed per symbol across all websocket clients.
+
+    While the push feed (IBKR ticks) is live, a subscribed symbol's market
+    data line is held open and each tick is fanned out to its subscribers as
+    it arrives. Otherwise a single upstream task per symbol polls fresh
+    quotes through the quote router, bypassing the quote cache so clients
+    never get re-served cached values. Only changed fields are pushed, and
+    the upstream stops when the last subscriber leaves.
+    """
+
+    def __init__(self, fetch_quote: Callable[[str], Awaitable[Optional[Dict]]], feed=None):
+        self.fetch_quote = fetch_quote
+        self.feed = feed
+        self._held: Set[str] = set()
+        self.poll_interval = float(os.getenv('QUOTE_STREAM_POLL_SECONDS', 1))
+        self.client_send_interval = float(os.getenv('QUOTE_STREAM_CLIENT_INTERVAL', 0.5))
+        self.max_symbols_per_client = int(os.getenv('QUOTE_STREAM_MAX_SYMBOLS', 100))
+        self.clients: Set[QuoteStreamClient] = set()
+        self._subscribers: Dict[str, Set[QuoteStreamClient]] = {}
+        self._upstreams: Dict[str, asyncio.Task] = {}
+        self._last_quotes: Dict[str, Dict] = {}
+        self.upstream_updates = 0
+        if feed is not None:
+            feed.add_listener(self._on_feed_quote)
+
+    def connect(self, websocket) -> QuoteStreamClient:
+        client = QuoteStreamClient(websocket, self.client_send_interval)
+        client._sender = asyncio.ensure_future(client.run_sender())
+        self.clients.add(client)
+        return client
+
+    def disconnect(self, client: QuoteStreamClient):
+        self.unsubscribe(client, list(client.symbols))
+        if client._sender is not None:
+            client._sender.cancel()
+        self.clients.discard(client)
+
+    def subscribe(self, client: QuoteStreamClient, symbols: Iterable[str]) -> Set[str]:
+        """Add symbols to a client, starting upstream feeds as needed"""
+        for symbol in {s.strip().upper() for s in symbols if s and s.strip()}:
+            if symbol in client.symbols:
+                continue
+            if len(client.symbols) >= self.max_symbols_per_client:
+                logger.warning(f"Quote stream client reached {self.max_symbols_per_client} symbols, ignoring {symbol}")
+                break
+            client.symbols.add(symbol)
+            self._subscribers.setdefault(symbol, set()).add(client)
+            if symbol not in self._upstreams:
+                self._upstreams[symbol] = asyncio.ensure_future(self._pump(symbol))
+                logger.info(f"Started upstream quote stream for {symbol}")
+            # New subscribers get the full last quote straight away
+            if symbol in self._last_quotes:
+                client.push(symbol, self._last_quotes[symbol])
+        return client.symbols
+
+    def unsubscribe(self, client: QuoteStreamClient, symbols: Iterable[str]) -> Set[str]:
+        """Remove symbols from a client, stopping feeds nobody listens to"""
+        for symbol in {s.strip().upper() for s in symbols if s and s.strip()}:
+            client.symbols.discard(symbol)
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(client)
+            if not subscribers:
+                del self._subscribers[symbol]
+                upstream = self._upstreams.pop(symbol, None)
+                if upstream is not None:
+                    upstream.cancel()
+                self._last_quotes.pop(symbol, None)
+                logger.info(f"Stopped upstream quote stream for {symbol}")
+        return client.symbols
+
+    def _publish(self, symbol: str, quote: Dict):
+        last = self._last_quotes.get(symbol, {})
+        delta = {k: v for k, v in quote.items() if last.get(k) != v}
+        if delta:
+            delta['symbol'] = symbol
+            self._last_quotes[symbol] = quote
+            self.upstream_updates += 1
+            for client in list(self._subscribers.get(symbol, ())):
+                client.push(symbol, delta)
+
+    def _on_feed_quote(self, symbol: str, quote: Dict):
+        if symbol in self._held:
+            self._publish(symbol, quote)
+
+    def _release(self, symbol: str):
+        if symbol in self._held:
+            self._held.discard(symbol)
+            self.feed.release(symbol)
+
+    async def _pump(self, symbol: str):
+        try:
+            while symbol in self._subscribers:
+                if self.feed is not None and self.feed.is_live():
+                    # Ticks arrive through _on_feed_quote; just keep the line open
+                    if symbol not in self._held:
+                        self._held.add(symbol)
+                        quote = self.feed.hold(symbol)
+                        if quote:
+                            self._publish(symbol, quote)
+                else:
+                    self._release(symbol)
+                    try:
+                        quote = await self.fetch_quote(symbol)
+                    except Exception as e:
+                        logger.warning(f"Quote stream fetch failed for {symbol}: {e}")
+                        quote = None
+                    if quote:
+                        self._publish(symbol, quote)
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            if self.feed is not None:
+                self._release(symbol)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'clients': len(self.clients),
+            'upstream_streams': len(self._upstreams),
+            'symbols': {symbol: len(subs) for symbol, subs in self._subscribers.items()},
+            'upstream_updates': self.upstream_updates,
+            'pushed_symbols': len(self._held),
+            'messages_sent': sum(c.sent_messages for c in self.clients),
+            'coalesced_updates': sum(c.coalesced_updates for c in self.clients),
+            'poll_interval': self.poll_interval,
+            'client_send_interval': self.client_send_interval
+        }
+
+# Global quote stream hub
+quote_stream_hub = QuoteStreamHub(fetch_market_data, IBKRQuoteFeed(ibkr_service))
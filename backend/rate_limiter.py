@@ -0,0 +1,132 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token bucket holding up to ``burst`` tokens, refilled at ``rate`` tokens per second.
+
+    Refill is computed lazily from the time since the last call, so every
+    check is O(1) with no per-request history. ``try_acquire`` never waits;
+    ``acquire`` (async) and ``acquire_blocking`` (threads) wait for the next
+    token, up to an optional timeout.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.rejected = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def time_until_available(self, tokens: float = 1) -> float:
+        """Seconds until the given number of tokens is available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = tokens - self._tokens
+            return 0.0 if missing <= 0 else missing / self.rate
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.granted += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def _reserve_wait(self, tokens: float, timeout: Optional[float]) -> Optional[float]:
+        """Take tokens now or return how long to sleep before retrying; None if the timeout can't be met"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.granted += 1
+                return 0.0
+            wait = (tokens - self._tokens) / self.rate
+            if timeout is not None and wait > timeout:
+                self.rejected += 1
+                return None
+            return wait
+
+    async def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Wait for tokens on the event loop; False if they will not be available within timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            wait = self._reserve_wait(tokens, remaining)
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            self.waited_seconds += wait
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Thread version of acquire, for blocking provider code"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            wait = self._reserve_wait(tokens, remaining)
+            if wait is None:
+                return False
+            if wait == 0:
+                return True
+            self.waited_seconds += wait
+            time.sleep(wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'rate_per_minute': round(self.rate * 60, 3),
+            'burst': self.burst,
+            'tokens': round(self.tokens(), 3),
+            'granted': self.granted,
+            'rejected': self.rejected,
+            'waited_seconds': round(self.waited_seconds, 3)
+        }
+
+class RateLimiterRegistry:
+    """Per-source token buckets configured from the environment.
+
+    NEWS_RATE_PER_MINUTE_<SOURCE> and NEWS_RATE_BURST_<SOURCE> set a
+    source's refill rate and burst. Sources without a configured or default
+    rate are not rate limited.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, source: str, default_per_minute: Optional[float] = None, default_burst: float = 1) -> Optional[TokenBucket]:
+        with self._lock:
+            if source not in self._buckets:
+                per_minute = os.getenv(f'NEWS_RATE_PER_MINUTE_{source.upper()}')
+                per_minute = float(per_minute) if per_minute else default_per_minute
+                burst = float(os.getenv(f'NEWS_RATE_BURST_{source.upper()}', default_burst))
+                self._buckets[source] = TokenBucket(per_minute / 60, burst) if per_minute else None
+                if per_minute:
+                    logger.info(f"Rate limiting {source} to {per_minute}/min with burst {burst}")
+            return self._buckets[source]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {source: bucket.get_stats() for source, bucket in self._buckets.items() if bucket is not None}
+
+# Global per-source rate limiters for the news providers
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Coalesces concurrent identical upstream calls into one execution.
+
+    Calls are keyed by an operation name plus a tuple of arguments. While a
+    call for a key is in flight, later callers with the same key wait for
+    its result instead of starting their own. All waiters share the same
+    result object, so callers must not mutate it.
+
+    ``do`` is for coroutines on the event loop and ``do_sync`` is for
+    blocking functions that run in worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._async_flights: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._sync_flights: Dict[Tuple[str, Hashable], Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, op: str, coalesced: bool):
+        stats = self._stats.setdefault(op, {'calls': 0, 'executions': 0, 'coalesced': 0})
+        stats['calls'] += 1
+        if coalesced:
+            stats['coalesced'] += 1
+        else:
+            stats['executions'] += 1
+
+    async def do(self, op: str, args: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the coroutine returned by fn once per concurrent (op, args)"""
+        key = (op, args)
+        with self._lock:
+            task = self._async_flights.get(key)
+            coalesced = task is not None
+            if not coalesced:
+                task = asyncio.ensure_future(fn())
+                self._async_flights[key] = task
+                task.add_done_callback(lambda _: self._async_flights.pop(key, None))
+            self._count(op, coalesced)
+        # Shield so one cancelled waiter does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def do_sync(self, op: str, args: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run the blocking fn once per concurrent (op, args)"""
+        key = (op, args)
+        with self._lock:
+            future = self._sync_flights.get(key)
+            coalesced = future is not None
+            if not coalesced:
+                future = Future()
+                self._sync_flights[key] = future
+            self._count(op, coalesced)
+        if coalesced:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._sync_flights.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {op: dict(stats) for op, stats in self._stats.items()}
+            in_flight = len(self._async_flights) + len(self._sync_flights)
+        return {
+            'operations': operations,
+            'total_coalesced': sum(s['coalesced'] for s in operations.values()),
+            'in_flight': in_flight
+        }
+
+# Global single-flight instance shared by the quote, news and history paths
+single_flight = SingleFlight()
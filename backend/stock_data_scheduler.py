@@ -99,7 +99,7 @@ class StockDataScheduler:
                 start_date = end_date - timedelta(days=365)
                 
                 # 抓取數據
-                data = stock_data_service.fetch_daily_data(
+                data = await stock_data_service.fetch_daily_data_async(
                     symbol=symbol,
                     start_date=start_date.strftime('%Y-%m-%d'),
                     end_date=end_date.strftime('%Y-%m-%d')
@@ -187,7 +187,7 @@ class StockDataScheduler:
                 start_date = end_date - timedelta(days=5*365)
                 
                 # 抓取日線數據
-                daily_data = stock_data_service.fetch_daily_data(
+                daily_data = await stock_data_service.fetch_daily_data_async(
                     symbol=symbol,
                     start_date=start_date.strftime('%Y-%m-%d'),
                     end_date=end_date.strftime('%Y-%m-%d')
@@ -1,7 +1,10 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
+import os
 import json
+import math
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
@@ -9,18 +12,100 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, desc
 from models import StockDaily, StockIntraday, TechnicalIndicators, FundamentalData, MarketSentiment
 from database import get_db
+from singleflight import single_flight
 
 logger = logging.getLogger(__name__)
 
+# 日線歷史來源：yahoo（預設）、ibkr，或 auto（IBKR 已連線時走其歷史數據專用連線，否則 Yahoo）
+DAILY_HISTORY_SOURCE = os.getenv('STOCK_DAILY_SOURCE', 'yahoo')
+
 class StockDataService:
     def __init__(self):
         self.sources = {
             'yahoo': self.fetch_daily_data,
+            'ibkr': self.fetch_daily_data_async,
             'alpha_vantage': self.fetch_daily_data  # 暫時使用相同的方法
         }
     
     def fetch_daily_data(self, symbol: str, start_date: str = None, end_date: str = None, source: str = 'yahoo') -> pd.DataFrame:
-        """抓取日線數據"""
+        """抓取日線數據（相同參數的並發請求共用一次上游調用）"""
+        return single_flight.do_sync(
+            'daily_history',
+            (symbol.upper(), start_date, end_date, source),
+            lambda: self._fetch_daily_data(symbol, start_date, end_date, source)
+        )
+    
+    async def fetch_daily_data_async(self, symbol: str, start_date: str = None, end_date: str = None, source: str = None) -> pd.DataFrame:
+        """抓取日線數據而不阻塞事件循環。
+
+        預設在線程池中向 Yahoo 抓取。STOCK_DAILY_SOURCE 設為 auto/ibkr 時，
+        IBKR 歷史連線可用則經由 acquire('historical') 取得，大量回補不會
+        佔用串流報價的連線；auto 下 IBKR 無數據時改用 Yahoo。
+        """
+        source = source or DAILY_HISTORY_SOURCE
+        if source in ('auto', 'ibkr'):
+            if self._ibkr_history_available():
+                data = await single_flight.do(
+                    'daily_history',
+                    (symbol.upper(), start_date, end_date, 'ibkr'),
+                    lambda: self._fetch_ibkr_daily(symbol, start_date, end_date)
+                )
+                if not data.empty or source == 'ibkr':
+                    return data
+            elif source == 'ibkr':
+                logger.warning(f"IBKR historical connection unavailable, no daily data for {symbol}")
+                return pd.DataFrame()
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, lambda: self.fetch_daily_data(symbol, start_date, end_date, 'yahoo'))
+
+    @staticmethod
+    def _ibkr_history_available() -> bool:
+        try:
+            from ibkr_service import ibkr_service
+        except Exception as e:
+            logger.debug(f"IBKR unavailable for daily history: {e}")
+            return False
+        return ibkr_service.connected and ibkr_service.pool.is_connected('historical')
+
+    async def _fetch_ibkr_daily(self, symbol: str, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """從 IBKR 歷史連線抓取日線，範圍與 Yahoo 一致（end 不含）。
+
+        與 Yahoo 相同：OHLC 取 TRADES（僅拆股調整），adjusted_close 取
+        ADJUSTED_LAST 的收盤（拆股及股息調整），兩個來源的數據可混用。
+        """
+        from ibkr_service import ibkr_service
+        start = pd.Timestamp(start_date) if start_date else pd.Timestamp.now().normalize() - pd.Timedelta(days=365)
+        end = pd.Timestamp(end_date) if end_date else None
+        days = (pd.Timestamp.now() - start).days + 1
+        # IB 的 D 單位最多一年，更長的區間以年為單位再按日期裁剪
+        duration = f"{days} D" if days <= 365 else f"{math.ceil(days / 365)} Y"
+        bars, adjusted = await asyncio.gather(
+            ibkr_service.get_historical_data(symbol, duration=duration),
+            ibkr_service.get_historical_data(symbol, duration=duration, what_to_show='ADJUSTED_LAST')
+        )
+        if not bars or not adjusted:
+            logger.warning(f"No IBKR daily data found for {symbol}")
+            return pd.DataFrame()
+
+        df = pd.DataFrame(bars)
+        df['date'] = pd.to_datetime(df['date'])
+        adjusted_close = pd.Series({pd.Timestamp(bar['date']): bar['close'] for bar in adjusted})
+        df['adjusted_close'] = df['date'].map(adjusted_close)
+        # 沒有股息調整收盤的日子不寫入，避免與 Yahoo 的 Adj Close 混淆
+        df = df[df['adjusted_close'].notna()]
+        df = df[df['date'] >= start]
+        if end is not None:
+            df = df[df['date'] < end]
+        df['symbol'] = symbol
+        df['open_price'] = df['open']
+        df['high_price'] = df['high']
+        df['low_price'] = df['low']
+        df['close_price'] = df['close']
+        df['source'] = 'ibkr'
+        return df[['symbol', 'date', 'open_price', 'high_price', 'low_price',
+                   'close_price', 'volume', 'adjusted_close', 'source']].reset_index(drop=True)
+
+    def _fetch_daily_data(self, symbol: str, start_date: str = None, end_date: str = None, source: str = 'yahoo') -> pd.DataFrame:
         try:
             if source == 'yahoo':
                 ticker = yf.Ticker(symbol)
@@ -0,0 +1,58 @@
+import os
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+os.environ.setdefault('FINNHUB_API_KEY', 'dummykey12345')
+
+import market_data
+from market_data import FinnhubSource
+from news_scheduler import news_scheduler
+
+NOW_UTC = datetime(2024, 5, 2, 3, 30)
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return NOW_UTC
+
+    @classmethod
+    def now(cls, tz=None):
+        # A host west of UTC: local wall clock is still the previous evening
+        return datetime(2024, 5, 1, 20, 30) if tz is None else super().now(tz)
+
+class _Response:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return []
+
+@pytest.fixture
+def finnhub(monkeypatch):
+    monkeypatch.setattr(market_data, 'datetime', _FrozenDatetime)
+    monkeypatch.setattr(news_scheduler, 'can_make_request', lambda name: True)
+    monkeypatch.setattr(news_scheduler, 'acquire_request', lambda name: True)
+    monkeypatch.setattr(news_scheduler, 'get_optimal_articles_per_request', lambda name: 100)
+    source = FinnhubSource('dummykey12345')
+    windows = []
+    def get(url, timeout=None):
+        query = parse_qs(urlsplit(url).query)
+        windows.append((query['from'][0], query['to'][0]))
+        return _Response()
+    monkeypatch.setattr(source, '_get', get)
+    return source, windows
+
+@pytest.mark.parametrize('since', [
+    datetime(2024, 5, 2, 3, 0),     # stored just after UTC midnight, local evening
+    datetime(2024, 5, 2, 3, 45),    # mark slightly ahead of the clock
+])
+def test_window_is_utc_and_never_inverted(finnhub, since):
+    source, windows = finnhub
+    source.get_news('AAPL', since)
+    start, end = windows[0]
+    assert end == '2024-05-02'
+    assert start <= end
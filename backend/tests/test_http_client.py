@@ -0,0 +1,60 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from http_client import HttpClient
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def do_GET(self):
+        _Handler.hits[self.path] = _Handler.hits.get(self.path, 0) + 1
+        status = int(self.path.strip('/'))
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '3600')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    _Handler.hits.clear()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('HTTP_CLIENT_RETRIES', '2')
+    monkeypatch.setenv('HTTP_CLIENT_BACKOFF', '0')
+    return HttpClient()
+
+def test_429_is_returned_without_retry_or_retry_after_sleep(server, client):
+    started = time.monotonic()
+    response = client.get(f"{server}/429")
+    assert response.status_code == 429
+    assert _Handler.hits['/429'] == 1
+    assert time.monotonic() - started < 2
+
+def test_5xx_is_retried_for_unmetered_requests(server, client):
+    assert client.get(f"{server}/503").status_code == 503
+    assert _Handler.hits['/503'] == 3
+
+def test_metered_requests_are_sent_once(server, client):
+    assert client.get(f"{server}/503", metered=True).status_code == 503
+    assert client.get(f"{server}/429", metered=True).status_code == 429
+    assert _Handler.hits == {'/503': 1, '/429': 1}
+
+def test_backoff_is_capped(client):
+    retry = client.session.get_adapter('https://').max_retries
+    assert retry.backoff_max <= 4
+    assert not retry.respect_retry_after_header
+    assert 429 not in retry.status_forcelist
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from datetime import date
+from contextlib import asynccontextmanager
+
+import pytest
+from ib_insync import IB, Option, Stock, Ticker
+
+import stock_data_service as sds
+from ibkr_service import IBKRConnectionPool, IBKRService, QuoteSubscriptionManager, ibkr_service
+
+def _fake_connections(pool, failing=()):
+    for conn in pool.all():
+        state = {'connected': False}
+
+        async def connect(*args, conn=conn, state=state, **kwargs):
+            if conn.workload in failing:
+                raise ConnectionRefusedError('refused')
+            state['connected'] = True
+
+        conn.ib.connectAsync = connect
+        conn.ib.isConnected = lambda state=state: state['connected']
+
+def test_failed_historical_connection_is_supervised():
+    async def run():
+        pool = IBKRConnectionPool('127.0.0.1', 4002, 100)
+        pool.backoff_base = 0.01
+        _fake_connections(pool, failing=('historical',))
+        assert await pool.connect_all()
+        historical = pool.connections['historical'][0]
+        assert historical.client_id in pool._reconnect_tasks
+        assert pool.reconnecting
+        _fake_connections(pool)
+        await asyncio.wait_for(pool._reconnect_tasks[historical.client_id], timeout=1)
+        assert pool.is_connected('historical')
+        pool._health_task.cancel()
+    asyncio.run(run())
+
+def test_daily_backfill_uses_historical_connection(monkeypatch):
+    acquired = []
+
+    class FakeIB:
+        async def reqHistoricalDataAsync(self, contract, whatToShow, **kwargs):
+            Bar = type('Bar', (), {})
+            bars = []
+            for day in ('2024-01-02', '2024-01-03', '2024-01-04'):
+                bar = Bar()
+                bar.date = date.fromisoformat(day)
+                bar.open = bar.high = bar.low = bar.close = 9.5 if whatToShow == 'ADJUSTED_LAST' else 10.0
+                bar.volume = 100
+                bars.append(bar)
+            return bars
+
+    @asynccontextmanager
+    async def acquire(workload):
+        acquired.append(workload)
+        yield FakeIB()
+
+    async def connected():
+        return True
+
+    monkeypatch.setattr(ibkr_service, 'ensure_connected', connected)
+    monkeypatch.setattr(ibkr_service.contracts, 'is_qualified', lambda symbol: True)
+    monkeypatch.setattr(ibkr_service.pool, 'acquire', acquire)
+    monkeypatch.setattr(sds.StockDataService, '_ibkr_history_available', staticmethod(lambda: True))
+    monkeypatch.setattr(sds.StockDataService, 'fetch_daily_data', lambda *a, **k: pytest.fail('fell back to Yahoo'))
+
+    data = asyncio.run(sds.StockDataService().fetch_daily_data_async('AAPL', '2024-01-03', '2024-01-04', source='ibkr'))
+    assert acquired == ['historical', 'historical']
+    assert list(data['date'].dt.strftime('%Y-%m-%d')) == ['2024-01-03']
+    assert set(data['source']) == {'ibkr'}
+    # Dividend-adjusted close comes from ADJUSTED_LAST, like Yahoo's Adj Close
+    assert list(data['close_price']) == [10.0] and list(data['adjusted_close']) == [9.5]
+
+def test_daily_backfill_defaults_to_yahoo(monkeypatch):
+    monkeypatch.setattr(sds.StockDataService, '_ibkr_history_available', staticmethod(lambda: True))
+    monkeypatch.setattr(sds.StockDataService, '_fetch_ibkr_daily', lambda *a, **k: pytest.fail('used IBKR'))
+    monkeypatch.setattr(sds.StockDataService, 'fetch_daily_data', lambda self, *a: sds.pd.DataFrame({'source': ['yahoo']}))
+    monkeypatch.setattr(sds, 'DAILY_HISTORY_SOURCE', 'yahoo')
+    data = asyncio.run(sds.StockDataService().fetch_daily_data_async('AAPL', '2024-01-03', '2024-01-04'))
+    assert list(data['source']) == ['yahoo']
+
+def test_loop_bound_primitives_are_created_on_the_running_loop():
+    pool = IBKRConnectionPool('127.0.0.1', 4002, 200)
+    assert pool._ready_event is None and not pool.ready
+    assert IBKRService()._connect_lock is None
+
+    async def run():
+        _fake_connections(pool)
+        assert await pool.connect_all()
+        assert await pool.wait_ready(0.1)
+        pool._health_task.cancel()
+    asyncio.run(run())
+
+def test_snapshot_prices_wake_on_ticker_updates(monkeypatch):
+    monkeypatch.setenv('IBKR_SNAPSHOT_TIMEOUT', '5')
+    ib = IB()
+    cancelled = []
+
+    def req_mkt_data(contract, *args):
+        ticker = Ticker(contract=contract)
+
+        def tick():
+            ticker.last = 10.0 + contract.conId
+            ib.pendingTickersEvent.emit({ticker})
+
+        asyncio.get_event_loop().call_later(0.05 * contract.conId, tick)
+        return ticker
+
+    ib.reqMktData = req_mkt_data
+    ib.cancelMktData = cancelled.append
+
+    @asynccontextmanager
+    async def acquire(workload):
+        yield ib
+
+    service = IBKRService()
+    monkeypatch.setattr(service.pool, 'is_connected', lambda workload: True)
+    monkeypatch.setattr(service.pool, 'acquire', acquire)
+    Item = type('Item', (), {})
+    portfolio = []
+    for con_id in (1, 2):
+        item = Item()
+        item.contract = Option(conId=con_id, exchange='SMART')
+        portfolio.append(item)
+
+    async def run():
+        started = time.monotonic()
+        prices = await service.get_snapshot_prices(portfolio)
+        return prices, time.monotonic() - started
+
+    prices, elapsed = asyncio.run(run())
+    assert prices == {1: 11.0, 2: 12.0}
+    assert elapsed < 1
+    assert len(cancelled) == 2 and len(ib.pendingTickersEvent) == 0
+
+def test_resubscribe_drops_quotes_from_before_the_disconnect(monkeypatch):
+    monkeypatch.setenv('IBKR_FIRST_TICK_TIMEOUT', '0.05')
+    ib = IB()
+    ib.reqMktData = lambda contract, *args: Ticker(contract=contract)
+
+    async def run():
+        manager = QuoteSubscriptionManager(ib, lambda symbol: Stock(symbol, 'SMART', 'USD'))
+        manager.subscribe('AAPL')
+        ticker = manager.tickers['AAPL']
+        ticker.last = 150.0
+        ib.pendingTickersEvent.emit({ticker})
+        assert (await manager.get_quote('AAPL'))['price'] == 150.0
+
+        manager.resubscribe_all()
+        assert 'AAPL' in manager.tickers and manager.tickers['AAPL'] is not ticker
+        assert await manager.get_quote('AAPL') is None
+
+        fresh = manager.tickers['AAPL']
+        fresh.last = 151.0
+        ib.pendingTickersEvent.emit({fresh})
+        assert (await manager.get_quote('AAPL'))['price'] == 151.0
+    asyncio.run(run())
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import NewsFetchState
+from news_allocator import NewsPollAllocator
+from news_scheduler import APILimits, NewsSourceConfig, news_scheduler
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine('sqlite://')
+    NewsFetchState.__table__.create(engine)
+    monkeypatch.setattr(news_scheduler, 'sources', {
+        'marketaux': NewsSourceConfig('marketaux', 'key', APILimits(daily_requests=100, articles_per_request=3)),
+        'finnhub': NewsSourceConfig('finnhub', 'key', APILimits(daily_requests=86400, articles_per_request=100))
+    })
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def test_quiet_symbol_is_fresh_after_an_empty_poll(db):
+    now = datetime.utcnow()
+    long_ago = now - timedelta(days=3)
+    db.add_all([
+        # QUIET: last article days ago, but polled by Marketaux a few minutes ago
+        NewsFetchState(source='marketaux', symbol='QUIET', last_published_at=long_ago,
+                       updated_at=long_ago, last_polled_at=now - timedelta(minutes=5)),
+        # STALE: Marketaux has not polled it for days; Finnhub polls everything every run
+        NewsFetchState(source='marketaux', symbol='STALE', last_published_at=long_ago,
+                       updated_at=long_ago, last_polled_at=long_ago),
+        NewsFetchState(source='finnhub', symbol='STALE', last_published_at=long_ago,
+                       updated_at=long_ago, last_polled_at=now),
+    ])
+    db.commit()
+    minutes = NewsPollAllocator().minutes_since_fetch(db, ['QUIET', 'STALE'])
+    assert minutes['QUIET'] < 10
+    assert minutes['STALE'] > 3 * 24 * 60 - 10
@@ -0,0 +1,48 @@
+import os
+from urllib.parse import parse_qs, urlsplit
+
+os.environ.setdefault('FINNHUB_API_KEY', 'dummykey12345')
+
+from market_data import MarketauxSource
+from news_scheduler import APILimits, NewsSourceConfig, news_scheduler
+
+class _Response:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'data': []}
+
+def _marketaux(monkeypatch, articles_per_request):
+    monkeypatch.setitem(news_scheduler.sources, 'marketaux', NewsSourceConfig(
+        name='marketaux', api_key='key',
+        limits=APILimits(daily_requests=100, articles_per_request=articles_per_request)
+    ))
+    monkeypatch.setattr(news_scheduler.ledger, 'used', lambda name: 0)
+    source = MarketauxSource.__new__(MarketauxSource)
+    source.api_key = 'key'
+    source._has_news_access = True
+    return source
+
+def test_marketaux_batches_are_capped_by_article_limit(monkeypatch):
+    source = _marketaux(monkeypatch, articles_per_request=3)
+    monkeypatch.setattr(news_scheduler, 'can_make_request', lambda name: True)
+    monkeypatch.setattr(news_scheduler, 'acquire_request', lambda name: True)
+    requests = []
+    def get(url, timeout=None):
+        requests.append(parse_qs(urlsplit(url).query))
+        return _Response()
+    monkeypatch.setattr(source, '_get', get)
+
+    symbols = [f"S{i}" for i in range(10)]
+    source.get_news_batch(symbols)
+    assert source.symbols_per_request == 3
+    assert [len(r['symbols'][0].split(',')) for r in requests] == [3, 3, 3, 1]
+    assert all(r['limit'] == ['3'] for r in requests)
+
+def test_marketaux_article_limit_follows_setting(monkeypatch):
+    source = _marketaux(monkeypatch, articles_per_request=50)
+    assert news_scheduler.get_optimal_articles_per_request('marketaux') == 50
+    assert source.symbols_per_request == source.batch_size
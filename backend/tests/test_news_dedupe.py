@@ -0,0 +1,136 @@
+from news_dedupe import NearDuplicateIndex, clean_title, jaccard, title_shingles
+
+# The same story as delivered by different providers. NewsAPI appends
+# " - <source name>" to titles, Reuters copies carry "Exclusive-"/"UPDATE n-"
+# tags, Yahoo often title-cases, and summaries differ or are missing.
+SAME_STORY = [
+    # (symbol, (title, publisher), (title, publisher))
+    ('MSFT', ("Microsoft to acquire gaming studio in $2 billion deal", "Finnhub"),
+             ("Microsoft to Acquire Gaming Studio in $2 Billion Deal - Bloomberg", "Bloomberg")),
+    ('NVDA', ("Nvidia shares hit record high on AI chip demand", "Reuters"),
+             ("Nvidia Shares Hit Record High On AI Chip Demand | Yahoo Finance", "Yahoo")),
+    ('NVDA', ("Nvidia stock jumps as AI demand fuels record revenue", "CNBC"),
+             ("Nvidia stock jumps as AI demand fuels record revenue - CNBC", "CNBC")),
+    ('AMZN', ("Amazon faces FTC lawsuit over Prime cancellation practices", "MarketWatch"),
+             ("Amazon faces FTC lawsuit over Prime cancellation practices (AMZN)", "Benzinga")),
+    ('BA', ("Exclusive-Boeing nears deal to buy Spirit AeroSystems", "Reuters"),
+           ("Boeing nears deal to buy Spirit AeroSystems -sources", "Yahoo")),
+    ('AAPL', ("UPDATE 2-Apple to pay $490 million to settle shareholder lawsuit", "Reuters"),
+             ("Apple to pay $490 million to settle shareholder lawsuit - Reuters", "Reuters")),
+    ('TSLA', ("Tesla deliveries beat expectations as Model Y demand surges in China", "Finnhub"),
+             ("Tesla deliveries beat expectations as Model Y demand surges in China, Reuters reports", "Investing.com")),
+    ('AAPL', ("Apple unveils new iPhone lineup with faster chips and improved cameras at the annual event", "Yahoo"),
+             ("Apple unveils new iPhone lineup with faster chips and improved cameras at annual event", "NewsAPI")),
+    ('META', ("Meta beats quarterly revenue estimates on strong ad demand", "Reuters"),
+             ("Meta beats quarterly revenue estimates on strong ad sales", "Yahoo")),
+]
+
+# Different stories with overlapping wording, which must keep their own sentiment
+DIFFERENT_STORIES = [
+    ('TSLA', "Tesla stock rises 3% on delivery beat", "Tesla stock falls 3% on delivery miss"),
+    ('AAPL', "Apple shares rise after earnings beat", "Apple shares fall after earnings miss"),
+    ('MSFT', "Microsoft to acquire gaming studio in $2 billion deal", "Microsoft to sell gaming studio in $2 billion deal"),
+    ('AMZN', "Amazon faces FTC lawsuit over Prime cancellation practices", "Amazon settles FTC lawsuit over Prime cancellation practices"),
+    ('TSLA', "Tesla shares fall 5% in premarket trading", "Tesla shares fall 2% in premarket trading"),
+    ('META', "Meta beats quarterly revenue estimates on strong ad demand", "Meta misses quarterly revenue estimates on weak ad demand"),
+    ('TSLA', "Tesla earnings - what to expect", "Tesla earnings - what happened"),
+]
+
+
+def test_clean_title_strips_provider_decorations():
+    assert clean_title("Microsoft to Acquire Gaming Studio - Bloomberg") == "microsoft to acquire gaming studio"
+    assert clean_title("Exclusive-Boeing nears deal -sources") == "boeing nears deal"
+    assert clean_title("Amazon faces FTC lawsuit (NASDAQ:AMZN)") == "amazon faces ftc lawsuit"
+    assert clean_title("Chip stocks rally, Reuters reports") == "chip stocks rally"
+    assert clean_title("Stocks slide - Some Blog", publisher="Some Blog") == "stocks slide"
+    # A tail that is not a publisher is part of the headline
+    assert clean_title("Tesla earnings - what to expect") == "tesla earnings what to expect"
+
+
+def test_threshold_separates_same_and_different_stories():
+    index = NearDuplicateIndex()
+    same = [jaccard(title_shingles(*a), title_shingles(*b)) for _, a, b in SAME_STORY]
+    different = [jaccard(title_shingles(a), title_shingles(b)) for _, a, b in DIFFERENT_STORIES]
+    assert min(same) >= index.threshold, same
+    assert max(different) < index.threshold, different
+
+
+def test_index_clusters_cross_provider_copies():
+    index = NearDuplicateIndex(max_entries=100)
+    for i, (symbol, first, second) in enumerate(SAME_STORY):
+        index.add(f"a{i}", symbol, title_shingles(*first), f"cluster{i}", {'score': i})
+    for i, (symbol, first, second) in enumerate(SAME_STORY):
+        match = index.find(symbol, title_shingles(*second))
+        assert match is not None and match.cluster_id == f"cluster{i}", second[0]
+
+
+def test_index_keeps_different_stories_apart():
+    index = NearDuplicateIndex(max_entries=100)
+    for i, (symbol, first, second) in enumerate(DIFFERENT_STORIES):
+        index.add(f"a{i}", symbol, title_shingles(first), f"cluster{i}", {})
+    for symbol, first, second in DIFFERENT_STORIES:
+        assert index.find(symbol, title_shingles(second)) is None, second
+
+
+def test_matches_are_per_symbol():
+    index = NearDuplicateIndex(max_entries=10)
+    index.add('a', 'AAPL', title_shingles("Apple stock: what to watch this week"), 'a', {})
+    assert index.find('AAPL', title_shingles("Apple stock: what to watch this week")) is not None
+    assert index.find('MSFT', title_shingles("Apple stock: what to watch this week")) is None
+
+
+def test_window_evicts_oldest():
+    index = NearDuplicateIndex(max_entries=2)
+    for i, title in enumerate(["alpha beta gamma", "delta epsilon zeta", "eta theta iota"]):
+        index.add(str(i), 'X', title_shingles(title), str(i), {})
+    assert index.find('X', title_shingles("alpha beta gamma")) is None
+    assert index.find('X', title_shingles("eta theta iota")).cluster_id == '2'
+    assert index.get_stats()['entries'] == 2
+
+
+def test_find_or_add_keeps_one_entry_per_story():
+    index = NearDuplicateIndex(max_entries=10)
+    symbol, first, second = SAME_STORY[0]
+    assert index.find_or_add('a', symbol, title_shingles(*first), 'a', {'score': 1}) is None
+    existing = index.find_or_add('b', symbol, title_shingles(*second), 'b', {'score': 2})
+    assert existing is not None and existing.cluster_id == 'a'
+    assert index.get_stats()['entries'] == 1
+
+
+class _NoStoredRows:
+    def query(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def __iter__(self):
+        return iter(())
+
+
+def test_prepared_rows_reach_the_index_only_once_committed(monkeypatch):
+    import news_store
+
+    index = NearDuplicateIndex(max_entries=10)
+    index.warmed = True
+    monkeypatch.setattr(news_store, 'news_dedupe_index', index)
+    scored = []
+    def analyze(text, title):
+        scored.append(title)
+        return {'score': 0.5, 'sentiment': 'positive'}
+    monkeypatch.setattr(news_store.sentiment_analyzer, 'analyze_sentiment', analyze)
+
+    symbol, (title, publisher), (copy, copy_publisher) = SAME_STORY[0]
+    items = [
+        {'title': title, 'publisher': publisher, 'source': 'finnhub'},
+        {'title': copy, 'publisher': copy_publisher, 'source': 'newsapi'},
+    ]
+    rows = news_store.prepare_news_rows(_NoStoredRows(), symbol, items)
+    # The copy clusters with the first article in the same batch, which alone is scored
+    assert scored == [title]
+    assert rows[1]['cluster_id'] == rows[0]['content_hash'] and rows[1]['score'] == 0.5
+    # A rolled-back insert leaves nothing behind in the index
+    assert index.get_stats()['entries'] == 0
+    news_store.index_news_rows(rows)
+    assert index.get_stats()['entries'] == 1
+    assert index.find(symbol, title_shingles(title, publisher)).sentiment['score'] == 0.5
@@ -0,0 +1,34 @@
+import asyncio
+import os
+from datetime import datetime
+
+os.environ.setdefault('FINNHUB_API_KEY', 'dummykey12345')
+
+from news_pipeline import NewsIngestionPipeline
+
+MARK = datetime(2024, 5, 1, 12, 0)
+
+def _pipeline(monkeypatch, queue_size):
+    pipeline = NewsIngestionPipeline()
+    pipeline._fetch_queue = asyncio.Queue(maxsize=queue_size)
+    pipeline.running = True
+    monkeypatch.setattr(pipeline, '_load_marks', lambda symbols: {'finnhub': {'AAPL': MARK}})
+    return pipeline
+
+def test_submit_reports_queued_pending_and_rejected(monkeypatch):
+    async def run():
+        pipeline = _pipeline(monkeypatch, queue_size=1)
+        assert await pipeline.submit(['aapl']) == {'AAPL': 'queued'}
+        assert await pipeline.submit(['AAPL', 'MSFT']) == {'AAPL': 'pending', 'MSFT': 'rejected'}
+        assert (pipeline.coalesced, pipeline.rejected) == (1, 1)
+        # A rejected symbol is not left marked as in flight
+        assert await pipeline.submit(['MSFT']) == {'MSFT': 'rejected'}
+    asyncio.run(run())
+
+def test_submitted_jobs_carry_fetch_marks(monkeypatch):
+    async def run():
+        pipeline = _pipeline(monkeypatch, queue_size=10)
+        await pipeline.submit(['AAPL', 'MSFT'])
+        jobs = [pipeline._fetch_queue.get_nowait() for _ in range(2)]
+        assert {job.symbol: job.since for job in jobs} == {'AAPL': {'finnhub': MARK}, 'MSFT': {}}
+    asyncio.run(run())
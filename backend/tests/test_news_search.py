@@ -0,0 +1,11 @@
+from news_store import HIGHLIGHT_START, HIGHLIGHT_STOP, highlight_to_html
+
+def test_highlight_escapes_provider_html_before_marking_matches():
+    headline = f'<img src=x onerror=alert(1)> {HIGHLIGHT_START}Apple{HIGHLIGHT_STOP} & "AT&T"'
+    assert highlight_to_html(headline) == (
+        '&lt;img src=x onerror=alert(1)&gt; <mark>Apple</mark> &amp; &quot;AT&amp;T&quot;'
+    )
+
+def test_provider_mark_tags_are_not_trusted():
+    assert highlight_to_html('<mark>fake</mark>') == '&lt;mark&gt;fake&lt;/mark&gt;'
+    assert highlight_to_html(None) is None
@@ -0,0 +1,122 @@
+import asyncio
+
+from quote_router import QuoteRouter
+
+
+def make_router(fetchers, **env):
+    router = QuoteRouter(fetchers)
+    router.default_latency_ms = env.get('default_latency_ms', 500)
+    router.min_hedge_ms = env.get('min_hedge_ms', 50)
+    return router
+
+
+def test_hanging_preferred_source_is_penalised_and_demoted():
+    calls = {'ibkr': 0, 'yahoo': 0}
+
+    async def ibkr(symbol):
+        calls['ibkr'] += 1
+        await asyncio.sleep(3600)
+
+    async def yahoo(symbol):
+        calls['yahoo'] += 1
+        await asyncio.sleep(0.08)
+        return {'symbol': symbol, 'price': 1.0}
+
+    router = make_router({'ibkr': ibkr, 'yahoo': yahoo}, default_latency_ms=50)
+
+    async def run():
+        results = []
+        for _ in range(5):
+            results.append(await router.get_quote('AAPL', preferred='ibkr'))
+        return results
+
+    results = asyncio.run(run())
+    assert all(r and r['source'] == 'yahoo' for r in results)
+    stats = router.get_stats()
+    assert stats['ibkr']['requests'] >= 1
+    assert stats['ibkr']['abandoned'] >= 1
+    assert stats['ibkr']['error_rate'] == 1.0
+    assert router.rank('ibkr')[0] == 'yahoo'
+    # Once demoted, the hanging source is only tried as a hedge, not first
+    assert calls['ibkr'] < calls['yahoo']
+
+
+def test_cancelled_caller_does_not_penalise_source():
+    async def slow(symbol):
+        await asyncio.sleep(3600)
+
+    router = make_router({'ibkr': slow})
+
+    async def run():
+        task = asyncio.ensure_future(router.get_quote('AAPL'))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert router.get_stats()['ibkr']['requests'] == 0
+
+
+def test_preferred_source_wins_over_unsampled_one():
+    calls = []
+
+    def fetch(name):
+        async def fetcher(symbol):
+            calls.append(name)
+            await asyncio.sleep(0.02)
+            return {'symbol': symbol}
+        return fetcher
+
+    async def run():
+        router = make_router({'yahoo': fetch('yahoo'), 'finnhub': fetch('finnhub')})
+        router.stats['yahoo'].record(1, True)
+        assert router.rank('yahoo')[0] == 'yahoo'
+        result = await router.get_quote('AAPL', preferred='yahoo')
+        assert result['source'] == 'yahoo'
+        # The unsampled source is measured by a background probe after the caller is answered
+        await asyncio.gather(*router._probes.values())
+        assert calls == ['yahoo', 'finnhub']
+        assert router.stats['finnhub'].sampled
+        assert router.rank('yahoo')[0] == 'yahoo'
+
+    asyncio.run(run())
+
+
+def test_demoted_source_is_reprobed_in_background_after_interval():
+    async def fast(symbol):
+        return {'symbol': symbol}
+
+    async def run():
+        router = make_router({'yahoo': fast, 'ibkr': fast})
+        router.stats['yahoo'].record(100, True)
+        router.stats['ibkr'].record_abandoned(1300)
+        router.stats['ibkr'].last_sample_at -= router.reprobe_seconds + 1
+        # A stale source is not ranked first just to be measured
+        assert router.rank('ibkr')[0] == 'yahoo'
+        assert (await router.get_quote('AAPL', preferred='ibkr'))['source'] == 'yahoo'
+        await asyncio.gather(*router._probes.values())
+        assert router.stats['ibkr'].error_rate < 1.0
+        assert not router.stats['ibkr'].needs_probe(router.reprobe_seconds)
+
+    asyncio.run(run())
+
+
+def test_open_breaker_source_is_ranked_last_and_not_probed():
+    calls = []
+
+    async def fetcher(symbol):
+        calls.append(symbol)
+        return {'symbol': symbol}
+
+    async def run():
+        router = make_router({'ibkr': fetcher, 'yahoo': fetcher})
+        router.is_available = lambda name: name != 'ibkr'
+        assert router.rank('ibkr') == ['yahoo', 'ibkr']
+        assert (await router.get_quote('AAPL', preferred='ibkr'))['source'] == 'yahoo'
+        assert 'ibkr' not in router._probes
+        assert len(calls) == 1
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+import asyncio
+import os
+
+os.environ.setdefault('FINNHUB_API_KEY', 'dummykey12345')
+
+from quote_stream import QuoteStreamHub
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+class FakeFeed:
+    def __init__(self, live):
+        self.live = live
+        self.listeners = []
+        self.held = set()
+
+    def is_live(self):
+        return self.live
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def hold(self, symbol):
+        self.held.add(symbol)
+        return {'symbol': symbol, 'price': 100.0, 'source': 'ibkr'}
+
+    def release(self, symbol):
+        self.held.discard(symbol)
+
+    def tick(self, symbol, price):
+        for listener in self.listeners:
+            listener(symbol, {'symbol': symbol, 'price': price, 'source': 'ibkr'})
+
+def _hub(feed, fetches):
+    async def fetch(symbol):
+        fetches.append(symbol)
+        return {'symbol': symbol, 'price': 50.0, 'source': 'yahoo'}
+    hub = QuoteStreamHub(fetch, feed)
+    hub.poll_interval = 0.01
+    hub.client_send_interval = 0
+    return hub
+
+def test_ticks_are_pushed_without_polling():
+    async def run():
+        feed, fetches = FakeFeed(live=True), []
+        hub = _hub(feed, fetches)
+        websocket = FakeWebSocket()
+        client = hub.connect(websocket)
+        hub.subscribe(client, ['aapl'])
+        await asyncio.sleep(0.03)
+        feed.tick('AAPL', 101.5)
+        await asyncio.sleep(0.03)
+        prices = [m['data']['AAPL']['price'] for m in websocket.sent]
+        assert prices == [100.0, 101.5]
+        assert fetches == []
+        hub.disconnect(client)
+        await asyncio.sleep(0)
+        assert feed.held == set()
+    asyncio.run(run())
+
+def test_falls_back_to_uncached_polling_when_feed_is_down():
+    async def run():
+        feed, fetches = FakeFeed(live=False), []
+        hub = _hub(feed, fetches)
+        websocket = FakeWebSocket()
+        client = hub.connect(websocket)
+        hub.subscribe(client, ['MSFT'])
+        await asyncio.sleep(0.05)
+        assert len(fetches) >= 2 and feed.held == set()
+        # Ticks for symbols the hub does not hold are ignored
+        feed.tick('MSFT', 1.0)
+        await asyncio.sleep(0.02)
+        assert all(m['data']['MSFT'].get('price', 50.0) == 50.0 for m in websocket.sent)
+        hub.disconnect(client)
+    asyncio.run(run())
@@ -0,0 +1,52 @@
+"""add_news_content_hash
+
+Revision ID: b7e2a91c4d10
+Revises: 39d0d3074478
+Create Date: 2025-07-12 10:21:37.482910
+
+"""
+import re
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2a91c4d10'
+down_revision: Union[str, None] = '39d0d3074478'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _content_hash(symbol, source, title):
+    # Must match news_store.news_content_hash
+    normalized = re.sub(r'[\W_]+', ' ', (title or '').lower()).strip()
+    key = f"{(symbol or '').upper()}|{(source or '').lower()}|{normalized}"
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column('news', sa.Column('content_hash', sa.String(), nullable=True))
+
+    # Backfill hashes for existing rows
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, symbol, source, title FROM news")).fetchall()
+    if rows:
+        conn.execute(
+            sa.text("UPDATE news SET content_hash = :content_hash WHERE id = :id"),
+            [{'content_hash': _content_hash(row.symbol, row.source, row.title), 'id': row.id} for row in rows]
+        )
+
+    # Keep the oldest row of each duplicate group so the unique index can be built
+    conn.execute(sa.text(
+        "DELETE FROM news a USING news b "
+        "WHERE a.content_hash = b.content_hash AND a.id > b.id"
+    ))
+    op.create_index(op.f('ix_news_content_hash'), 'news', ['content_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_news_content_hash'), table_name='news')
+    op.drop_column('news', 'content_hash')
@@ -0,0 +1,30 @@
+"""add_news_cluster_id
+
+Revision ID: c4d8f3a1e9b2
+Revises: b7e2a91c4d10
+Create Date: 2025-07-14 16:02:51.930214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8f3a1e9b2'
+down_revision: Union[str, None] = 'b7e2a91c4d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('news', sa.Column('cluster_id', sa.String(), nullable=True))
+    # Existing articles start out as their own cluster
+    op.execute("UPDATE news SET cluster_id = content_hash")
+    op.create_index(op.f('ix_news_cluster_id'), 'news', ['cluster_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_news_cluster_id'), table_name='news')
+    op.drop_column('news', 'cluster_id')